@@ -0,0 +1,59 @@
+
+from argparse import ArgumentParser
+from importlib import import_module
+
+from benchmarks.harness import compare, save
+
+SUITES = ('cassandra', 'elasticsearch', 'sqs')
+
+def _report(results):
+    print('{:34} {:28} {:>12} {:>10} {:>10} {:>12}'.format(
+        'benchmark', 'params', 'ops/s', 'p50 us', 'p99 us', 'peak B/op'))
+    for r in results:
+        params = ','.join('{}={}'.format(k, v) for k, v in sorted(r['params'].items()))
+        print('{:34} {:28} {:12.0f} {:10.1f} {:10.1f} {:12.0f}'.format(
+            r['name'], params, r['ops_per_sec'], r['p50_us'], r['p99_us'],
+            r.get('peak_bytes_per_op', 0)))
+
+def main(argv=None):
+    """
+    python -m benchmarks --output results.json --baseline previous.json
+    """
+    parser = ArgumentParser(description='connector overhead benchmarks')
+    parser.add_argument('suites', nargs='*', metavar='suite',
+                        help='any of {}, all if omitted'.format(', '.join(SUITES)))
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=None,
+                        help='results of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='ops/s drop reported as a regression')
+    args = parser.parse_args(argv)
+    for suite in args.suites:
+        if suite not in SUITES:
+            parser.error('unknown suite: {}'.format(suite))
+    results = []
+    for suite in args.suites or SUITES:
+        try:
+            module = import_module('benchmarks.bench_{}'.format(suite))
+        except ImportError as e:
+            print('skipping {}: {}'.format(suite, e))
+            continue
+        results.extend(module.run(args.iterations))
+    _report(results)
+    save(results, args.output)
+    print('results saved to {}'.format(args.output))
+    if args.baseline:
+        regressions = 0
+        for name, params, old, new, change, regressed in compare(results,
+                                                                 args.baseline,
+                                                                 args.threshold):
+            print('{:34} {:28} {:12.0f} -> {:12.0f} {:+7.1%}{}'.format(
+                name, ','.join('{}={}'.format(k, v) for k, v in sorted(params.items())),
+                old, new, change, '  REGRESSION' if regressed else ''))
+            regressions += regressed
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+
+from uuid import uuid4
+
+from benchmarks.fakes import FakePool, FakeSession
+from benchmarks.harness import measure
+from connectors.cassandra.my_cassandra import CQLConnector
+
+READ = 'SELECT * FROM bench.events WHERE id=%(id)s;'
+WRITE = 'INSERT INTO bench.events({}) VALUES({});'
+
+def _columns(width):
+    return ['id', 'created'] + ['c{}'.format(i) for i in range(width - 2)]
+
+def _rows(count, width):
+    return [tuple([uuid4(), uuid4()] +
+                  [i * width + c if c % 2 else 'text {}'.format(c)
+                   for c in range(width - 2)])
+            for i in range(count)]
+
+def _connector(session):
+    return CQLConnector(hosts=['127.0.0.1'],
+                        keyspace='bench',
+                        local_env=True,
+                        pool=FakePool(session))
+
+def run(iterations=1000):
+    """
+    read, columnar read and iter_rows across result sizes,
+    write and write_many across payload sizes
+    """
+    results = []
+    key = {'id': uuid4()}
+    for rows in (1, 100, 1000):
+        for width in (5, 20):
+            params = {'rows': rows, 'columns': width}
+            session = FakeSession(_columns(width), _rows(rows, width))
+            connector = _connector(session)
+            n = max(20, iterations // rows)
+            results.append(measure('cassandra.read',
+                                   lambda: connector.read(READ, key),
+                                   params, iterations=n))
+            results.append(measure('cassandra.read_columnar',
+                                   lambda: connector.read(READ, key, columnar=True),
+                                   params, iterations=n))
+            results.append(measure('cassandra.iter_rows',
+                                   lambda: list(connector.iter_rows(READ, key)),
+                                   params, iterations=n))
+    for width in (5, 50):
+        columns = _columns(width)
+        sql = WRITE.format(', '.join(columns),
+                           ', '.join('%({})s'.format(c) for c in columns))
+        values = dict(zip(columns, _rows(1, width)[0]))
+        connector = _connector(FakeSession())
+        results.append(measure('cassandra.write',
+                               lambda: connector.write(sql, values),
+                               {'columns': width}, iterations=iterations))
+        for count in (10, 100):
+            list_of_values = [values] * count
+            results.append(measure('cassandra.write_many',
+                                   lambda: connector.write_many(sql, list_of_values),
+                                   {'columns': width, 'rows': count},
+                                   iterations=max(20, iterations // count)))
+    return results
@@ -0,0 +1,70 @@
+
+from benchmarks.fakes import FakeClientPool, elasticsearch_class
+from benchmarks.harness import measure
+from connectors.elasticsearch.my_elasticsearch import ESConnector
+from connectors.elasticsearch.serializer import BACKENDS, FastJSONSerializer
+
+def _document(fields):
+    return dict(('field{}'.format(f), 'value {}'.format(f)) for f in range(fields))
+
+def _connector(hits, fields):
+    client = elasticsearch_class(hits=hits, fields=fields)()
+    return ESConnector(host='127.0.0.1', pool=FakeClientPool(client))
+
+def run(iterations=1000):
+    """
+    add_document and add_documents across payload sizes,
+    find_document and search_documents, full and slim, across result sizes,
+    serializer backends across document sizes
+    """
+    results = []
+    for backend, (_, loads) in sorted(BACKENDS.items()):
+        if loads is None:
+            continue
+        serializer = FastJSONSerializer(backend)
+        for fields in (10, 100):
+            document = _document(fields)
+            encoded = serializer.dumps(document)
+            results.append(measure('elasticsearch.serializer.dumps',
+                                   lambda: serializer.dumps(document),
+                                   {'backend': backend, 'fields': fields},
+                                   iterations=iterations))
+            results.append(measure('elasticsearch.serializer.loads',
+                                   lambda: serializer.loads(encoded),
+                                   {'backend': backend, 'fields': fields},
+                                   iterations=iterations))
+    dsl = {'query': {'match': {'field0': 'value 0'}}}
+    for fields in (10, 100):
+        connector = _connector(1, fields)
+        document = _document(fields)
+        results.append(measure('elasticsearch.add_document',
+                               lambda: connector.add_document('bench', 'doc', 1,
+                                                              values=document),
+                               {'fields': fields}, iterations=iterations))
+        results.append(measure('elasticsearch.update_document',
+                               lambda: connector.update_document('bench', 'doc', 1,
+                                                                 {'doc': document}),
+                               {'fields': fields}, iterations=iterations))
+        for count in (100, 1000):
+            documents = [(i, document) for i in range(count)]
+            results.append(measure('elasticsearch.add_documents',
+                                   lambda: connector.add_documents('bench', 'doc',
+                                                                   documents),
+                                   {'fields': fields, 'documents': count},
+                                   iterations=max(10, iterations // count)))
+    for hits in (1, 100, 1000):
+        connector = _connector(hits, 10)
+        n = max(20, iterations // hits)
+        results.append(measure('elasticsearch.find_document',
+                               lambda: connector.find_document('bench', 'doc', dsl),
+                               {'hits': hits}, iterations=n))
+        results.append(measure('elasticsearch.search_documents',
+                               lambda: connector.search_documents('bench', 'doc', dsl),
+                               {'hits': hits}, iterations=n))
+        for lazy in (False, True):
+            results.append(measure('elasticsearch.search_documents',
+                                   lambda: connector.search_documents('bench', 'doc', dsl,
+                                                                      slim=True, lazy=lazy),
+                                   {'hits': hits, 'slim': True, 'lazy': lazy},
+                                   iterations=n))
+    return results
@@ -0,0 +1,26 @@
+
+from benchmarks.fakes import sqs_resource
+from benchmarks.harness import measure, patched
+from connectors.sqs import my_sqs
+from connectors.sqs.my_sqs import SQSConnector
+
+def run(iterations=1000):
+    """
+    insert and get across message sizes
+    """
+    results = []
+    with patched(my_sqs, 'resource', sqs_resource()):
+        for size in (100, 10000):
+            connector = SQSConnector(region='us-east-1',
+                                     access_key='bench',
+                                     secret_key='bench')
+            item = {'body': 'x' * size,
+                    'metadata': {'metadata': {'StringValue': 'bench',
+                                              'DataType': 'String'}}}
+            results.append(measure('sqs.insert',
+                                   lambda: connector.insert('bench', item),
+                                   {'bytes': size}, iterations=iterations))
+            results.append(measure('sqs.get',
+                                   lambda: connector.get('bench'),
+                                   {'bytes': size}, iterations=iterations))
+    return results
@@ -0,0 +1,262 @@
+
+from hashlib import md5
+from json import dumps, loads
+from uuid import uuid4
+
+from connectors.cassandra.statements import StatementCache
+
+# in process stand-ins for the Cassandra session, the ElasticSearch client
+# and the SQS resource, answering instantly with canned results so that a
+# benchmark measures the connectors rather than the network
+
+class FakeResponseFuture:
+
+    def __init__(self, column_names, rows):
+        self._col_names = column_names
+        self._col_types = None
+        self._rows = rows
+        self.has_more_pages = False
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        callback(self._rows, *callback_args)
+
+    def clear_callbacks(self):
+        pass
+
+class FakeResultSet:
+    """
+    pages through rows page_size at a time like a driver ResultSet
+    """
+
+    def __init__(self, column_names, rows, page_size):
+        self.column_names = column_names
+        self._rows = rows
+        self._page_size = page_size
+        self._offset = 0
+        self.current_rows = rows[:page_size]
+
+    @property
+    def has_more_pages(self):
+        return self._offset + self._page_size < len(self._rows)
+
+    def fetch_next_page(self):
+        self._offset += self._page_size
+        self.current_rows = self._rows[self._offset:self._offset + self._page_size]
+
+class FakeBound:
+
+    def __init__(self, values):
+        self.values = values
+        self.fetch_size = None
+        self.routing_key = None
+
+class FakePrepared:
+
+    def __init__(self, query):
+        self.query = query
+        self.consistency_level = None
+
+    def bind(self, values):
+        return FakeBound(values)
+
+class FakeSession:
+    """
+    every statement returns the same tuple rows
+    """
+
+    def __init__(self, column_names=(), rows=(), page_size=5000):
+        self.column_names = list(column_names)
+        self.rows = list(rows)
+        self.page_size = page_size
+        self.is_shutdown = False
+        self.default_timeout = 10.0
+        self.cluster = None
+
+    def prepare(self, query):
+        return FakePrepared(query)
+
+    def execute(self, statement, timeout=None):
+        # the driver leaves fetch_size of a SimpleStatement as a sentinel
+        fetch_size = statement.fetch_size
+        if not isinstance(fetch_size, int) or not fetch_size:
+            fetch_size = self.page_size
+        return FakeResultSet(self.column_names, self.rows, fetch_size)
+
+    def execute_async(self, statement, timeout=None):
+        return FakeResponseFuture(self.column_names, self.rows)
+
+class FakePool:
+    """
+    SessionPool handing out one FakeSession
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._statements = {}
+
+    @staticmethod
+    def key(hosts, port, keyspace, local_env):
+        return (tuple(hosts), port, keyspace, local_env)
+
+    def acquire(self, key, settings, consistency):
+        return self.session
+
+    def statements(self, key, max_size=256):
+        if key not in self._statements:
+            self._statements[key] = StatementCache(max_size)
+        return self._statements[key]
+
+    def release(self, key):
+        pass
+
+class FakeIndices:
+
+    def __init__(self, indices=()):
+        self.indices = set(indices)
+
+    def stats(self, index=None, **params):
+        return {'indices': dict((name, {}) for name in self.indices)}
+
+    def get_alias(self, index=None, name=None, **params):
+        return dict((name, {'aliases': {}}) for name in self.indices)
+
+    def exists(self, index, **params):
+        return index in self.indices
+
+    def create(self, index, body=None, **params):
+        self.indices.add(index)
+        return {'acknowledged': True}
+
+    def delete(self, index, **params):
+        self.indices.discard(index)
+        return {'acknowledged': True}
+
+    def put_mapping(self, doc_type=None, body=None, index=None, **params):
+        return {'acknowledged': True}
+
+class FakeSerializer:
+
+    def dumps(self, data):
+        if isinstance(data, str):
+            return data
+        return dumps(data)
+
+    def loads(self, s):
+        return loads(s)
+
+class FakeTransport:
+
+    def __init__(self):
+        self.serializer = FakeSerializer()
+
+def hit(i, fields):
+    return {'_index': 'bench',
+            '_type': 'doc',
+            '_id': str(i),
+            '_score': 1.0,
+            '_source': dict(('field{}'.format(f), 'value {} {}'.format(i, f))
+                            for f in range(fields))}
+
+def elasticsearch_class(hits=10, fields=10, indices=('bench',)):
+    """
+    client class whose searches return hits documents of fields fields,
+    decoded from JSON on every search as the real client does
+    """
+    response = {'took': 1,
+                'timed_out': False,
+                '_shards': {'total': 1, 'successful': 1, 'failed': 0},
+                'hits': {'total': hits,
+                         'max_score': 1.0,
+                         'hits': [hit(i, fields) for i in range(hits)]}}
+    encoded = dumps(response)
+
+    class FakeElasticsearch:
+
+        def __init__(self, hosts=None, **kwargs):
+            self.indices = FakeIndices(indices=indices)
+            self.transport = FakeTransport()
+
+        def create(self, index, doc_type, body, id=None, **params):
+            return {'_index': index, '_type': doc_type, '_id': id,
+                    '_version': 1, 'created': True}
+
+        def index(self, index, doc_type, body, id=None, **params):
+            return self.create(index, doc_type, body, id)
+
+        def update(self, index, doc_type, id, body=None, **params):
+            return {'_index': index, '_type': doc_type, '_id': id, '_version': 2}
+
+        def search(self, index=None, doc_type=None, body=None, **params):
+            return self.transport.serializer.loads(encoded)
+
+        def bulk(self, body, index=None, doc_type=None, **params):
+            lines = [loads(l) for l in body.split('\n') if l]
+            items = [{op: {'_id': action[op].get('_id'), 'status': 201}}
+                     for action in lines[::2] for op in action]
+            return {'took': 1, 'errors': False, 'items': items}
+
+    return FakeElasticsearch
+
+class FakeClientPool:
+    """
+    ClientPool handing out one fake ElasticSearch client
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def key(host, port, local_env, *settings):
+        return (host, port, local_env) + settings
+
+    def acquire(self, key, settings, sniff_interval=None):
+        return self.client
+
+    def release(self, key):
+        pass
+
+class FakeMessage:
+
+    def __init__(self, body, attributes):
+        self.body = body
+        self.message_attributes = attributes
+
+    def delete(self):
+        return {}
+
+class FakeQueue:
+    """
+    receive_messages() hands back the last message sent
+    """
+
+    def __init__(self):
+        self._last = FakeMessage('', {})
+
+    def send_message(self, MessageBody, MessageAttributes=None, **kwargs):
+        self._last = FakeMessage(MessageBody, MessageAttributes or {})
+        return {'MessageId': str(uuid4()),
+                'MD5OfMessageBody': md5(MessageBody.encode('utf-8')).hexdigest()}
+
+    def receive_messages(self, **kwargs):
+        return [self._last]
+
+class FakeSQS:
+
+    def __init__(self):
+        self.queue = FakeQueue()
+
+    def get_queue_by_name(self, QueueName):
+        return self.queue
+
+    def create_queue(self, QueueName, Attributes=None):
+        return self.queue
+
+def sqs_resource():
+    """
+    stand-in for boto3.resource returning one shared fake SQS
+    """
+    sqs = FakeSQS()
+
+    def resource(service_name, **kwargs):
+        return sqs
+    return resource
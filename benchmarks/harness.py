@@ -0,0 +1,128 @@
+
+from contextlib import contextmanager
+from datetime import datetime
+from gc import collect, disable, enable, isenabled
+from json import dump, load
+from platform import platform, python_implementation, python_version
+from time import perf_counter
+from tracemalloc import get_traced_memory, is_tracing, reset_peak, start, stop
+
+@contextmanager
+def patched(module, name, value):
+    """
+    swap a module attribute for the duration of a benchmark, ie. the
+    client class a connector instantiates in _connect()
+    """
+    original = getattr(module, name)
+    setattr(module, name, value)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+def _percentile(samples, p):
+    """
+    samples must be sorted
+    """
+    if not samples:
+        return 0.0
+    i = min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))
+    return samples[i]
+
+def _allocations(fn, iterations):
+    """
+    memory allocated per call, measured apart from the timed run since
+    tracing slows every allocation down
+    peak_bytes_per_op = memory a call holds at its high water mark
+    retained_bytes_per_op = memory still held after the call, ie. caches
+    """
+    collect()
+    start()
+    try:
+        (first, _) = get_traced_memory()
+        peaks = 0
+        for _ in range(iterations):
+            (current, _) = get_traced_memory()
+            reset_peak()
+            fn()
+            (_, peak) = get_traced_memory()
+            peaks += peak - current
+        (last, _) = get_traced_memory()
+    finally:
+        stop()
+    return {'peak_bytes_per_op': peaks / float(iterations),
+            'retained_bytes_per_op': (last - first) / float(iterations)}
+
+def measure(name, fn, params=None, warmup=100, iterations=1000, alloc_iterations=100):
+    """
+    time fn() once per iteration with the garbage collector disabled
+    mandatory args:
+        name = benchmark name, ie. 'cassandra.read'
+        fn = callable running one operation
+    optional args:
+        params = dict describing the payload or result size
+        warmup = untimed calls filling caches and pools first
+        iterations = timed calls
+        alloc_iterations = calls traced by tracemalloc
+    returns dict of ops_per_sec, latency percentiles in microseconds and
+    allocations per call
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    gc_was_enabled = isenabled()
+    collect()
+    disable()
+    try:
+        for _ in range(iterations):
+            t0 = perf_counter()
+            fn()
+            samples.append(perf_counter() - t0)
+    finally:
+        if gc_was_enabled:
+            enable()
+    total = sum(samples)
+    samples.sort()
+    result = {'name': name,
+              'params': params or {},
+              'iterations': iterations,
+              'ops_per_sec': iterations / total if total else 0.0,
+              'mean_us': total / iterations * 1e6,
+              'p50_us': _percentile(samples, 50) * 1e6,
+              'p99_us': _percentile(samples, 99) * 1e6,
+              'max_us': samples[-1] * 1e6}
+    if alloc_iterations and not is_tracing():
+        result.update(_allocations(fn, alloc_iterations))
+    return result
+
+def environment():
+    return {'python': python_version(),
+            'implementation': python_implementation(),
+            'platform': platform(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z'}
+
+def save(results, path):
+    with open(path, 'w') as f:
+        dump({'environment': environment(), 'results': results},
+             f, indent=2, sort_keys=True)
+
+def compare(results, baseline_path, threshold=0.10):
+    """
+    pair results with a saved run by name and params
+    returns list of (name, params, baseline ops/s, ops/s, change, regressed)
+    where change is the relative ops/s difference, regressed when it drops
+    by more than threshold
+    """
+    with open(baseline_path) as f:
+        baseline = load(f)['results']
+    previous = dict(((r['name'], repr(sorted(r['params'].items()))), r)
+                    for r in baseline)
+    rows = []
+    for r in results:
+        old = previous.get((r['name'], repr(sorted(r['params'].items()))))
+        if old is None or not old['ops_per_sec']:
+            continue
+        change = r['ops_per_sec'] / old['ops_per_sec'] - 1.0
+        rows.append((r['name'], r['params'], old['ops_per_sec'],
+                     r['ops_per_sec'], change, change < -threshold))
+    return rows
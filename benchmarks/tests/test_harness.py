@@ -0,0 +1,60 @@
+
+from json import load
+
+from benchmarks import __main__ as benchmarks_main, harness
+from benchmarks.__main__ import main
+from benchmarks.harness import compare, measure, patched, save
+
+def test_measure_reports_latency_and_allocations():
+    calls = []
+    result = measure('noop', lambda: calls.append(bytearray(1000)), params={'size': 1},
+                     warmup=2, iterations=10, alloc_iterations=5)
+    assert len(calls) == 17
+    assert (result['name'], result['params'], result['iterations']) == ('noop', {'size': 1}, 10)
+    assert result['ops_per_sec'] > 0
+    assert result['p50_us'] <= result['p99_us'] <= result['max_us']
+    assert result['retained_bytes_per_op'] >= 1000
+
+def test_percentile():
+    assert harness._percentile([], 50) == 0.0
+    assert harness._percentile([1, 2, 3, 4, 5], 50) == 3
+    assert harness._percentile([1, 2, 3, 4, 5], 99) == 5
+
+def test_patched_restores_the_attribute():
+    with patched(harness, 'perf_counter', None):
+        assert harness.perf_counter is None
+    assert harness.perf_counter is not None
+
+def result(name, ops, **params):
+    return {'name': name, 'params': params, 'ops_per_sec': ops}
+
+def test_compare_pairs_results_by_name_and_params(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    save([result('read', 100, rows=1), result('read', 100, rows=10), result('gone', 1)], path)
+    with open(path) as f:
+        assert 'python' in load(f)['environment']
+    rows = compare([result('read', 95, rows=1), result('read', 80, rows=10),
+                    result('new', 5)], path)
+    assert [(name, params, regressed) for name, params, _, _, _, regressed in rows] == [
+        ('read', {'rows': 1}, False), ('read', {'rows': 10}, True)]
+    assert abs(rows[1][4] + 0.2) < 1e-9
+
+class Suite:
+
+    def __init__(self, ops):
+        self.ops = ops
+
+    def run(self, iterations):
+        return [dict(result('suite.op', self.ops, rows=1), iterations=iterations,
+                     p50_us=1.0, p99_us=2.0)]
+
+def test_main_saves_and_compares(tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / 'results.json')
+    monkeypatch.setattr(benchmarks_main, 'import_module', lambda name: Suite(100))
+    assert main(['cassandra', '--iterations', '5', '--output', output]) == 0
+    with open(output) as f:
+        assert load(f)['results'][0]['iterations'] == 5
+    monkeypatch.setattr(benchmarks_main, 'import_module', lambda name: Suite(50))
+    assert main(['cassandra', '--output', str(tmp_path / 'new.json'),
+                 '--baseline', output]) == 1
+    assert 'REGRESSION' in capsys.readouterr().out
@@ -0,0 +1,121 @@
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+def freeze(value):
+    """
+    hashable equivalent of query parameters, ie. dict of values or a DSL body
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    return value
+
+class ResultCache:
+    """
+    in process read-through cache shared by the connectors
+    entries expire after ttl seconds, the least recently used entry is
+    evicted once max_size is reached and every entry is tagged, ie. with
+    the table or index it was read from, so writes invalidate by tag
+    cached values are returned as is and must be treated as read only
+    optional args:
+        max_size = entries kept
+        ttl = seconds an entry stays valid
+    """
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        """
+        returns cached value or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            (value, tags, expires) = entry
+            if expires <= monotonic():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value, tags=()):
+        """
+        mandatory args:
+            key = hashable key, see freeze()
+            value = value returned by later get() calls
+        optional args:
+            tags = names invalidating this entry
+        """
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, tuple(tags), monotonic() + self.ttl)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, key):
+        """
+        lock must be held
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, tag):
+        """
+        drop every entry tagged with tag
+        """
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        """
+        counters to tune max_size and ttl
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {'size': len(self._entries),
+                    'max_size': self.max_size,
+                    'ttl': self.ttl,
+                    'hits': self._hits,
+                    'misses': self._misses,
+                    'hit_rate': float(self._hits) / lookups if lookups else 0.0,
+                    'evictions': self._evictions,
+                    'expirations': self._expirations,
+                    'invalidations': self._invalidations}
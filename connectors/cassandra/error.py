@@ -34,6 +34,15 @@ class CassandraError:
                     'status_code': 2004,
                     'reason': s}
 
+    @classmethod
+    def unknown_table(cls, keyspace, table):
+        """
+        Wrapper for a table missing from the schema metadata
+        """
+        return {'data': [],
+                'status_code': 2004,
+                'reason': 'Table: {}.{} not found'.format(keyspace, table)}
+
     @classmethod
     def unknown_exception(cls, bt, s):
         """
@@ -69,3 +78,12 @@ class CassandraWriteError:
                            'values: {}'.format(v),
                            'backtrace: {}'.format(bt),
                            'e: {}'.format(s)}}
+
+class CassandraStreamError(Exception):
+    """
+    raised by generators which cannot return an error envelope
+    envelope = the dict read() would have returned for the same failure
+    """
+    def __init__(self, envelope):
+        Exception.__init__(self, envelope['reason'])
+        self.envelope = envelope
@@ -0,0 +1,88 @@
+
+from logging import getLogger
+from threading import Condition
+from time import perf_counter
+
+from cassandra.cluster import ResultSet
+
+log = getLogger(__name__)
+
+class FanOut:
+    """
+    run many statements on the driver's ResponseFutures with a bounded
+    number in flight, so a 200 key lookup costs about one round trip
+    results are kept in input order and a failed statement, ie. a timeout,
+    is recorded for its item without aborting the others
+    mandatory args:
+        session = live Cassandra session
+    optional args:
+        concurrency = statements in flight at once
+        timeout = client side seconds allowed per statement,
+                  session default if None
+    """
+
+    def __init__(self, session, concurrency=100, timeout=None):
+        if concurrency <= 0:
+            raise ValueError('concurrency must be greater than 0')
+        self.session = session
+        self.concurrency = concurrency
+        if timeout is None:
+            timeout = session.default_timeout
+        self.timeout = timeout
+        self._condition = Condition()
+
+    def execute(self, statements):
+        """
+        mandatory args:
+            statements = list of Statement
+        returns list of (success, ResultSet or exception), in input order
+        seconds taken by each statement are left in self.seconds
+        """
+        self._results = [None] * len(statements)
+        self._started = [0.0] * len(statements)
+        self.seconds = [0.0] * len(statements)
+        self._in_flight = 0
+        self._completed = 0
+        for i, statement in enumerate(statements):
+            with self._condition:
+                while self._in_flight >= self.concurrency:
+                    self._condition.wait()
+                self._in_flight += 1
+            self._submit(i, statement)
+        with self._condition:
+            while self._completed < len(statements):
+                self._condition.wait()
+        return self._results
+
+    def _submit(self, i, statement):
+        """
+        callbacks may run right away in this thread when the future is
+        already complete, so the condition must not be held here
+        """
+        self._started[i] = perf_counter()
+        try:
+            future = self.session.execute_async(statement, timeout=self.timeout)
+            future.add_callbacks(callback=self._on_success,
+                                 callback_args=(future, i),
+                                 errback=self._on_error,
+                                 errback_args=(future, i))
+        except Exception as e:
+            self._done(i, (False, e))
+
+    def _on_success(self, result, future, i):
+        future.clear_callbacks()
+        self._done(i, (True, ResultSet(future, result)))
+
+    def _on_error(self, e, future, i):
+        self._done(i, (False, e))
+
+    def _done(self, i, result):
+        """
+        record one result and free its slot in the in flight window
+        """
+        with self._condition:
+            self._results[i] = result
+            self.seconds[i] = perf_counter() - self._started[i]
+            self._in_flight -= 1
+            self._completed += 1
+            self._condition.notify()
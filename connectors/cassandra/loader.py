@@ -0,0 +1,279 @@
+
+from argparse import ArgumentParser
+from csv import DictReader
+from datetime import date, datetime, time
+from decimal import Decimal
+from io import TextIOWrapper
+from logging import INFO, basicConfig, getLogger
+from mmap import ACCESS_READ, mmap
+from threading import Lock, Semaphore
+from time import perf_counter
+from uuid import UUID
+
+from cassandra.metadata import protect_name, protect_names
+from ujson import loads
+
+from connectors.cassandra.error import CassandraError, CassandraStreamError
+from connectors.cassandra.error import CassandraWriteError
+from connectors.cassandra.my_cassandra import CQLConnector
+from connectors.cassandra.statements import fold_name
+
+log = getLogger(__name__)
+
+def _boolean(s):
+    return s.strip().lower() in ('true', '1', 'yes')
+
+def _timestamp(s):
+    """
+    milliseconds since the epoch or ISO 8601, ie. 2016-05-01T12:00:00Z
+    """
+    s = s.strip()
+    try:
+        return int(s)
+    except ValueError:
+        pass
+    if s.endswith('Z'):
+        s = s[:-1] + '+00:00'
+    return datetime.fromisoformat(s)
+
+def _date(s):
+    return date.fromisoformat(s.strip())
+
+def _time(s):
+    return time.fromisoformat(s.strip())
+
+def _blob(s):
+    """
+    hex as written by cqlsh, ie. 0xcafe
+    """
+    s = s.strip()
+    if s[:2].lower() == '0x':
+        s = s[2:]
+    return bytes.fromhex(s)
+
+# text read from CSV or JSON converted to the type of the bound column,
+# other scalar types are bound as text
+CONVERTERS = {'int': int,
+              'bigint': int,
+              'varint': int,
+              'smallint': int,
+              'tinyint': int,
+              'counter': int,
+              'float': float,
+              'double': float,
+              'decimal': Decimal,
+              'boolean': _boolean,
+              'uuid': UUID,
+              'timeuuid': UUID,
+              'timestamp': _timestamp,
+              'date': _date,
+              'time': _time,
+              'blob': _blob}
+
+def _format(path, fmt):
+    """
+    fmt or the format guessed from the file extension
+    """
+    if fmt is None:
+        fmt = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    return fmt
+
+def read_lines(path, use_mmap=False):
+    """
+    yield the lines of path as str without loading the file
+    use_mmap = read through a memory map, the page cache serves the file
+    """
+    with open(path, 'rb') as f:
+        if use_mmap:
+            with mmap(f.fileno(), 0, access=ACCESS_READ) as m:
+                for line in iter(m.readline, b''):
+                    yield line.decode('utf-8')
+        else:
+            for line in TextIOWrapper(f, encoding='utf-8', newline=''):
+                yield line
+
+def read_records(path, fmt=None, use_mmap=False):
+    """
+    yield one dict per JSON line or CSV row of path
+    fmt = 'jsonl' or 'csv', guessed from the file extension if None
+    """
+    lines = read_lines(path, use_mmap)
+    if _format(path, fmt) == 'csv':
+        for record in DictReader(lines):
+            yield record
+    else:
+        for line in lines:
+            if line.strip():
+                yield loads(line)
+
+class BulkLoader:
+    """
+    stream JSONL or CSV records into one table through a prepared INSERT
+    at most concurrency inserts are in flight, reading blocks until one
+    completes so memory stays flat whatever the file size and throughput
+    is bound by the cluster rather than the loader
+    mandatory args:
+        connector = CQLConnector
+        table = target table, keyspace qualified or in the connector keyspace
+    optional args:
+        mapping = dict of column: record field, the keys of the first
+                  record of each file are the columns if None
+        concurrency = inserts in flight
+        report_every = seconds between progress log lines
+    unquoted table and column names are case insensitive as in CQL
+    collection, tuple and user defined type columns are only loaded from
+    JSONL, where their values are JSON arrays and objects
+    """
+
+    def __init__(self,
+                 connector,
+                 table,
+                 mapping=None,
+                 concurrency=200,
+                 report_every=10.0):
+        self.connector = connector
+        self.table = table
+        self.mapping = mapping
+        self.concurrency = concurrency
+        self.report_every = report_every
+        self._fields = None
+        self._lock = Lock()
+
+    def _prepare(self, columns, fmt):
+        """
+        prepared INSERT and converters, in the order of columns
+        raises CassandraStreamError when a column cannot be read from fmt
+        """
+        sql = 'INSERT INTO {} ({}) VALUES ({});'.format(
+            '.'.join(protect_name(fold_name(n)) for n in self.table.split('.')),
+            ', '.join(protect_names([fold_name(c) for c in columns])),
+            ', '.join('%s' for c in columns))
+        prepared = self.connector.statements.get(self.connector.session,
+                                                 sql,
+                                                 self.connector._consistency())
+        if fmt == 'csv':
+            for c in prepared.column_metadata:
+                if getattr(c.type, 'subtypes', None):
+                    raise CassandraStreamError(CassandraError.invalid_request(
+                        self.connector.keyspace,
+                        'Column: {} of type {} cannot be loaded from CSV'.format(
+                            c.name, c.type.cql_parameterized_type())))
+        converters = [CONVERTERS.get(c.type.typename) for c in prepared.column_metadata]
+        return prepared, converters
+
+    def _bind(self, prepared, converters, record):
+        values = []
+        for field, convert in zip(self._fields, converters):
+            value = record.get(field)
+            if value == '':
+                value = None
+            if convert is not None and isinstance(value, str):
+                value = convert(value)
+            values.append(value)
+        return prepared.bind(values)
+
+    def _failed(self, e):
+        with self._lock:
+            self._errors += 1
+            if self._errors <= 10:
+                log.error('Bulk load insert failed: {}'.format(e))
+
+    def _on_success(self, rows, slots):
+        slots.release()
+
+    def _on_error(self, e, slots):
+        self._failed(e)
+        slots.release()
+
+    def load(self, path, fmt=None, use_mmap=False):
+        """
+        load every record of path
+        fmt = 'jsonl' or 'csv', guessed from the file extension if None
+        use_mmap = read the file through a memory map
+        returns dict of rows loaded, errors, seconds and rows_per_sec,
+        the rate of rows loaded
+        raises CassandraStreamError when the cluster cannot be reached,
+        the INSERT cannot be prepared or a column cannot be read from fmt
+        """
+        fmt = _format(path, fmt)
+        err_msg = self.connector._connect()
+        if err_msg:
+            raise CassandraStreamError(err_msg)
+        session = self.connector.session
+        slots = Semaphore(self.concurrency)
+        (rows, self._errors) = (0, 0)
+        (prepared, converters) = (None, None)
+        start = last_report = perf_counter()
+        for record in read_records(path, fmt, use_mmap):
+            if prepared is None:
+                mapping = self.mapping
+                if mapping is None:
+                    mapping = dict((k, k) for k in record)
+                self._fields = list(mapping.values())
+                try:
+                    (prepared, converters) = self._prepare(list(mapping), fmt)
+                except Exception as e:
+                    raise CassandraStreamError(self.connector._exception_envelope(
+                        e, self.table, mapping, CassandraWriteError))
+            rows += 1
+            try:
+                bound = self._bind(prepared, converters, record)
+            except Exception as e:
+                self._failed(e)
+                continue
+            slots.acquire()
+            future = session.execute_async(bound)
+            future.add_callbacks(self._on_success, self._on_error,
+                                 callback_args=(slots,), errback_args=(slots,))
+            now = perf_counter()
+            if now - last_report >= self.report_every:
+                loaded = rows - self._errors
+                log.info('Bulk load: {} rows, {} errors, {:.0f} rows/s'.format(
+                    loaded, self._errors, loaded / (now - start)))
+                last_report = now
+        for _ in range(self.concurrency):
+            slots.acquire()
+        seconds = perf_counter() - start
+        loaded = rows - self._errors
+        stats = {'rows': loaded,
+                 'errors': self._errors,
+                 'seconds': seconds,
+                 'rows_per_sec': loaded / seconds if seconds else 0.0}
+        log.info('Bulk load of {} into {}: {}'.format(path, self.table, stats))
+        return stats
+
+def main(argv=None):
+    """
+    console script, ie.
+    cql-bulk-load --hosts 10.0.0.1 10.0.0.2 --keyspace ks --table users dump.jsonl
+    """
+    parser = ArgumentParser(description='stream JSONL or CSV into Cassandra')
+    parser.add_argument('path')
+    parser.add_argument('--hosts', nargs='+', default=['127.0.0.1'])
+    parser.add_argument('--port', type=int, default=9042)
+    parser.add_argument('--keyspace', required=True)
+    parser.add_argument('--table', required=True)
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default=None)
+    parser.add_argument('--map', nargs='*', default=None, metavar='COLUMN=FIELD',
+                        help='columns to load and their record field')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--mmap', action='store_true')
+    parser.add_argument('--local', action='store_true',
+                        help='single node cluster')
+    args = parser.parse_args(argv)
+    basicConfig(level=INFO)
+    mapping = None
+    if args.map:
+        mapping = dict(pair.split('=', 1) for pair in args.map)
+    connector = CQLConnector(hosts=args.hosts,
+                             port=args.port,
+                             keyspace=args.keyspace,
+                             local_env=args.local)
+    loader = BulkLoader(connector, args.table, mapping, args.concurrency)
+    try:
+        stats = loader.load(args.path, args.format, args.mmap)
+    except CassandraStreamError as e:
+        log.error('Bulk load failed: {}'.format(e.envelope['reason']))
+        return 1
+    print('{rows} rows loaded, {errors} errors, {rows_per_sec:.0f} rows/s'.format(**stats))
+    return 1 if stats['errors'] else 0
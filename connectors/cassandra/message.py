@@ -27,6 +27,16 @@ class CassandraWrite:
                 'reason': 'OK',
                 'status_code': 2008}
 
+    @classmethod
+    def many_rows_written(cls, results):
+        """
+        Wrapper for bulk writes, one envelope per submitted row
+        """
+        written = len([r for r in results if r['status_code'] == 2006])
+        return {'data': results,
+                'reason': '{} of {} rows written'.format(written, len(results)),
+                'status_code': 2012}
+
 class CassandraRead:
     @classmethod
     def no_rows_found(cls):
@@ -55,3 +65,13 @@ class CassandraRead:
                 'reason': 'OK',
                 'status_code': 2011}
 
+    @classmethod
+    def many_results_found(cls, results):
+        """
+        Wrapper for fan-out reads, one envelope per submitted statement
+        """
+        failed = len([r for r in results if r['status_code'] <= 2005])
+        reason = '{} of {} statements failed'.format(failed, len(results))
+        return {'data': results,
+                'reason': reason,
+                'status_code': 2013}
@@ -0,0 +1,211 @@
+
+from bisect import bisect_left
+from logging import getLogger
+from threading import Event, Lock, Thread
+
+from cassandra import OperationTimedOut, ReadTimeout, WriteTimeout
+
+log = getLogger(__name__)
+
+# upper bounds in milliseconds, the last bucket holds everything slower
+BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+DRIVER_STATS = ('connection_errors', 'write_timeouts', 'read_timeouts',
+                'unavailables', 'other_errors', 'retries', 'ignores')
+OTHER = '<other>'
+
+class Histogram:
+    """
+    fixed bucket latency histogram, recording is one bisect and a few
+    additions so it can stay on in production
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect_left(BUCKETS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        """
+        upper bound of the bucket holding the p-th percentile, in ms
+        """
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(BUCKETS[i]) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {'count': self.count,
+                'mean_ms': self.total / self.count if self.count else 0.0,
+                'p50_ms': self.percentile(50),
+                'p90_ms': self.percentile(90),
+                'p99_ms': self.percentile(99),
+                'max_ms': self.max,
+                'buckets': dict(zip([str(b) for b in BUCKETS] + ['inf'],
+                                    self.counts))}
+
+class TemplateStats:
+    """
+    counters of one query template
+    """
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.timeouts = 0
+        self.rows = 0
+        self.pages = 0
+
+    def snapshot(self):
+        stats = self.latency.snapshot()
+        stats.update({'errors': self.errors,
+                      'timeouts': self.timeouts,
+                      'rows': self.rows,
+                      'pages': self.pages})
+        return stats
+
+def log_exporter(snapshot):
+    """
+    default exporter, one log line per query template
+    """
+    for template, stats in snapshot['templates'].items():
+        log.info('CQL {}: {}'.format(template, stats))
+    if snapshot['driver']:
+        log.info('CQL driver: {}'.format(snapshot['driver']))
+
+class QueryMetrics:
+    """
+    per query template latency histograms, rows and pages fetched,
+    errors and timeouts, plus the driver's retry and timeout counters
+    pass one instance to every CQLConnector to instrument
+    optional args:
+        exporter = callable receiving snapshot() on every export()
+        interval = seconds between exports once start() is called
+        driver_metrics = enable the driver's own metrics, which need the
+                         scales package, on sessions created afterwards
+        max_templates = templates tracked before the rest are folded into
+                        '<other>', statements embedding their values would
+                        otherwise create a template per call
+    """
+
+    def __init__(self,
+                 exporter=log_exporter,
+                 interval=60.0,
+                 driver_metrics=False,
+                 max_templates=1000):
+        self.exporter = exporter
+        self.interval = interval
+        self.driver_metrics = driver_metrics
+        self.max_templates = max_templates
+        self._lock = Lock()
+        self._templates = {}
+        self._clusters = set()
+        self._stop = Event()
+        self._thread = None
+
+    def _stats(self, template):
+        """
+        lock must be held
+        """
+        stats = self._templates.get(template)
+        if stats is None:
+            if len(self._templates) >= self.max_templates:
+                template = OTHER
+            stats = self._templates.setdefault(template, TemplateStats())
+        return stats
+
+    def watch(self, cluster):
+        """
+        include the driver metrics of cluster in snapshots
+        """
+        if cluster.metrics is not None:
+            with self._lock:
+                self._clusters.add(cluster)
+
+    def record(self, template, seconds, error=None):
+        """
+        record one request of template
+        """
+        with self._lock:
+            stats = self._stats(template)
+            stats.latency.add(seconds * 1000.0)
+            if error is not None:
+                stats.errors += 1
+                if isinstance(error, (OperationTimedOut, ReadTimeout, WriteTimeout)):
+                    stats.timeouts += 1
+
+    def record_rows(self, template, rows, pages):
+        """
+        record the rows and pages consumed from one result of template
+        """
+        with self._lock:
+            stats = self._stats(template)
+            stats.rows += rows
+            stats.pages += pages
+
+    def percentile(self, template, p, min_samples=1):
+        """
+        p-th percentile latency of template in ms, None until min_samples
+        requests are recorded
+        """
+        with self._lock:
+            stats = self._templates.get(template)
+            if stats is None or stats.latency.count < min_samples:
+                return None
+            return stats.latency.percentile(p)
+
+    def snapshot(self):
+        with self._lock:
+            templates = dict((t, s.snapshot()) for t, s in self._templates.items())
+            clusters = list(self._clusters)
+        driver = {}
+        for cluster in clusters:
+            driver[','.join(cluster.contact_points)] = dict(
+                (name, getattr(cluster.metrics.stats, name)) for name in DRIVER_STATS)
+        return {'templates': templates, 'driver': driver}
+
+    def reset(self):
+        with self._lock:
+            self._templates = {}
+
+    def export(self):
+        """
+        hand the current snapshot to the exporter
+        """
+        try:
+            self.exporter(self.snapshot())
+        except Exception as e:
+            log.warning('CQL metrics export failed: {}'.format(e))
+
+    def start(self):
+        """
+        export every interval seconds from a daemon thread
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name='cql-metrics')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,261 @@
+
+from asyncio import FIRST_COMPLETED, get_running_loop, wait
+from logging import getLogger
+from time import perf_counter
+
+from cassandra.cluster import ResultSet
+
+from connectors.cache import freeze
+from connectors.cassandra.error import CassandraReadError, CassandraStreamError
+from connectors.cassandra.error import CassandraWriteError
+from connectors.cassandra.message import CassandraRead, CassandraWrite
+from connectors.cassandra.my_cassandra import CQLConnector, applied
+from connectors.cassandra.rows import ColumnCollector, compile_converter
+from connectors.cassandra.statements import tables
+
+log = getLogger(__name__)
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+def _set_exception(future, e):
+    if not future.done():
+        future.set_exception(e)
+
+def wait_for(response_future, loop):
+    """
+    asyncio future completed by the callbacks of a driver ResponseFuture,
+    callbacks run on the driver's event loop thread and hand the result
+    over with call_soon_threadsafe
+    cancelling the asyncio future, ie. the loser of a hedged request,
+    clears the callbacks so a late answer is dropped by the driver
+    """
+    future = loop.create_future()
+    future.add_done_callback(
+        lambda f: response_future.clear_callbacks() if f.cancelled() else None)
+
+    def on_success(rows):
+        response_future.clear_callbacks()
+        loop.call_soon_threadsafe(_set_result, future, rows)
+
+    def on_error(e):
+        response_future.clear_callbacks()
+        loop.call_soon_threadsafe(_set_exception, future, e)
+
+    response_future.add_callbacks(on_success, on_error)
+    return future
+
+class AsyncCQLConnector(CQLConnector):
+    """
+    asyncio flavour of CQLConnector for services running an event loop
+    read, write and iter_rows are coroutines awaiting the driver's
+    ResponseFutures directly, no executor thread is involved once the
+    session is up and the statement prepared
+    same args, shared sessions, caches and envelopes as CQLConnector
+    ie. response = await connector.read(sql, values)
+    """
+
+    async def _connect_async(self):
+        """
+        the first connection bootstraps the cluster, which blocks
+        """
+        if self.session is not None and not self.session.is_shutdown:
+            return
+        return await get_running_loop().run_in_executor(None, self._connect)
+
+    async def _statement_async(self, sql, values):
+        """
+        preparing blocks on a round trip, so a cache miss is prepared
+        in an executor thread
+        """
+        if values and (sql, self._consistency()) not in self.statements:
+            return await get_running_loop().run_in_executor(
+                None, self._statement, sql, values)
+        return self._statement(sql, values)
+
+    async def _execute_async(self, sql, values, fetch_size=None, idempotent=False):
+        """
+        see CQLConnector._execute()
+        returns ResultSet holding the first page
+        """
+        if self.metrics is None:
+            return await self._execute_statement_async(sql, values, fetch_size,
+                                                       idempotent)
+        start = perf_counter()
+        try:
+            resultset = await self._execute_statement_async(sql, values, fetch_size,
+                                                            idempotent)
+        except Exception as e:
+            self.metrics.record(sql, perf_counter() - start, e)
+            raise
+        self.metrics.record(sql, perf_counter() - start)
+        return resultset
+
+    async def _execute_statement_async(self, sql, values, fetch_size, idempotent):
+        statement = await self._statement_async(sql, values)
+        if fetch_size:
+            statement.fetch_size = fetch_size
+        return await self._send_async(sql, statement, idempotent)
+
+    async def _send_async(self, sql, statement, idempotent=False):
+        """
+        see CQLConnector._send()
+        """
+        loop = get_running_loop()
+        future = self.session.execute_async(statement)
+        if not idempotent or self.speculative is None:
+            return ResultSet(future, await wait_for(future, loop))
+        futures = [future]
+        pending = {wait_for(future, loop): 0}
+        (done, _) = await wait(list(pending), timeout=self.speculative.delay_for(sql))
+        fired = not done
+        if fired:
+            futures.append(self.session.execute_async(statement))
+            pending[wait_for(futures[1], loop)] = 1
+        error = None
+        while pending:
+            (done, _) = await wait(list(pending), return_when=FIRST_COMPLETED)
+            for waiter in done:
+                i = pending.pop(waiter)
+                if waiter.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    self.speculative.record(fired, i == 1)
+                    return ResultSet(futures[i], waiter.result())
+                error = waiter.exception()
+        self.speculative.record(fired, False)
+        raise error
+
+    async def _replicate_async(self, document):
+        """
+        see CQLConnector._replicate(), a full replication queue blocks, so
+        the document then waits for room in an executor thread rather than
+        on the event loop
+        """
+        if document is None or self.replicator is None:
+            return
+        if self.replicator.replicate(block=False, **document):
+            return
+        await get_running_loop().run_in_executor(None, self._replicate, document)
+
+    async def _next_page(self, resultset):
+        """
+        request the next page without blocking the event loop
+        """
+        future = resultset.response_future
+        future.start_fetching_next_page()
+        return ResultSet(future, await wait_for(future, get_running_loop()))
+
+    async def _pages(self, resultset):
+        """
+        yield every page of a result, starting with the current one
+        """
+        while True:
+            yield resultset
+            if not resultset.has_more_pages:
+                return
+            resultset = await self._next_page(resultset)
+
+    async def _rows(self, resultset, sql=None):
+        """
+        see CQLConnector._iter_pages()
+        """
+        convert = None
+        (rows_read, pages) = (0, 0)
+        try:
+            async for page in self._pages(resultset):
+                rows = page.current_rows
+                pages += 1
+                rows_read += len(rows)
+                if rows and convert is None:
+                    convert = compile_converter(page.column_names, rows)
+                for row in rows:
+                    yield convert(row)
+        finally:
+            if self.metrics is not None and sql is not None:
+                self.metrics.record_rows(sql, rows_read, pages)
+
+    async def iter_rows(self, sql=None, values=None, fetch_size=1000, idempotent=False):
+        """
+        see CQLConnector.iter_rows()
+        ie. async for row in connector.iter_rows(sql, values):
+        """
+        err_msg = await self._connect_async()
+        if err_msg:
+            raise CassandraStreamError(err_msg)
+        try:
+            resultset = await self._execute_async(sql, values, fetch_size, idempotent)
+            async for row in self._rows(resultset, sql):
+                yield row
+        except Exception as e:
+            raise CassandraStreamError(
+                self._exception_envelope(e, sql, values, CassandraReadError))
+
+    async def write(self, sql=None, values=None, idempotent=False, document=None):
+        """
+        see CQLConnector.write()
+        """
+        err_msg = await self._connect_async()
+        if err_msg:
+            return err_msg
+        try:
+            resultset = await self._execute_async(sql, values, idempotent=idempotent)
+            self._written(sql)
+            if len(resultset.current_rows) == 0:
+                await self._replicate_async(document)
+                return CassandraWrite.object_created()
+            rows = [row async for row in self._rows(resultset, sql)]
+            if applied(rows):
+                await self._replicate_async(document)
+            if len(rows) == 1:
+                return CassandraWrite.one_row_found(rows[0])
+            else:
+                return CassandraWrite.many_rows_found(rows)
+        except Exception as e:
+            return self._exception_envelope(e, sql, values, CassandraWriteError)
+
+    async def read(self,
+                   sql=None,
+                   values=None,
+                   columnar=False,
+                   numpy_arrays=False,
+                   idempotent=False):
+        """
+        see CQLConnector.read()
+        """
+        if self.result_cache is None:
+            return await self._read(sql, values, columnar, numpy_arrays, idempotent)
+        key = (sql, freeze(values), self._consistency(), columnar, numpy_arrays)
+        response = self.result_cache.get(key)
+        if response is None:
+            response = await self._read(sql, values, columnar, numpy_arrays,
+                                        idempotent)
+            if response['status_code'] in (2009, 2010, 2011):
+                self.result_cache.put(key, response, tables(sql, self.keyspace))
+        return response
+
+    async def _read(self, sql, values, columnar, numpy_arrays, idempotent=False):
+        err_msg = await self._connect_async()
+        if err_msg:
+            return err_msg
+        try:
+            resultset = await self._execute_async(sql, values, idempotent=idempotent)
+            if len(resultset.current_rows) == 0:
+                return CassandraRead.no_rows_found()
+            if columnar:
+                collector = ColumnCollector(resultset.column_names, numpy_arrays)
+                pages = 0
+                async for page in self._pages(resultset):
+                    collector.add(page.current_rows)
+                    pages += 1
+                if self.metrics is not None:
+                    self.metrics.record_rows(sql, collector.row_count, pages)
+                return CassandraRead.many_rows_found(collector.columns())
+            rows = [row async for row in self._rows(resultset, sql)]
+            if len(rows) == 1:
+                return CassandraRead.one_row_found(rows[0])
+            else:
+                return CassandraRead.many_rows_found(rows)
+        except Exception as e:
+            return self._exception_envelope(e, sql, values, CassandraReadError)
@@ -1,18 +1,36 @@
 
 from cassandra import ConsistencyLevel as CL, InvalidRequest, OperationTimedOut
-from cassandra.cqlengine import connection
+from cassandra.cluster import NoHostAvailable
 from cassandra.policies import ConstantReconnectionPolicy, RetryPolicy
 from cassandra.policies import DCAwareRoundRobinPolicy, RoundRobinPolicy
+from cassandra.query import BatchStatement, BatchType
+from cassandra.query import SimpleStatement
 from logging import getLogger
 from sys import exc_info
+from time import perf_counter
 from traceback import extract_tb
 
+from connectors.cache import freeze
 from connectors.cassandra.error import CassandraError, CassandraReadError
+from connectors.cassandra.error import CassandraStreamError
 from connectors.cassandra.error import CassandraWriteError
 from connectors.cassandra.message import CassandraRead, CassandraWrite
+from connectors.cassandra.fanout import FanOut
+from connectors.cassandra.pool import session_pool
+from connectors.cassandra.rows import ColumnCollector, compile_converter
+from connectors.cassandra.scan import TableScan
+from connectors.cassandra.speculative import HedgedRequest
+from connectors.cassandra.statements import is_query, is_schema_change, tables
 
 log = getLogger(__name__)
 
+def applied(rows):
+    """
+    False when a lightweight transaction was not applied, as reported by
+    the [applied] column of its first row, True for any other write
+    """
+    return not rows or rows[0].get('[applied]', True) is not False
+
 class CQLConnector:
     """
     as many MS will communicate with Cassandra, centralize access
@@ -24,6 +42,18 @@ class CQLConnector:
         cql_version = CQL language version
         local_env = True or False
         connect_timeout = seconds allowed to try connection
+    optional args:
+        pool = SessionPool sharing sessions, defaults to the process wide one
+        statement_cache_size = prepared statements kept per session
+        result_cache = ResultCache serving repeated read() calls, it may be
+                       shared by connectors and is invalidated per table by
+                       writes through any connector sharing it
+        metrics = QueryMetrics recording latency per query template
+        speculative = SpeculativePolicy hedging reads and writes called
+                      with idempotent=True
+        replicator = ESReplicator indexing the document passed to write()
+                     and write_many() in the background once the write
+                     succeeded
     """
 
     def __init__(self,
@@ -32,92 +62,119 @@ class CQLConnector:
                  keyspace=None,
                  cql_version='3.4.0',
                  local_env=False,
-                 connect_timeout=5):
+                 connect_timeout=5,
+                 pool=None,
+                 statement_cache_size=256,
+                 result_cache=None,
+                 metrics=None,
+                 speculative=None,
+                 replicator=None):
         self.hosts = hosts
         self.port = port
         self.keyspace = keyspace
         self.cql_version = cql_version
         self.local_env = local_env
         self.connect_timeout = connect_timeout
-        self.cluster = None
+        self.pool = pool or session_pool
+        self.pool_key = self.pool.key(hosts, port, keyspace, local_env)
+        self.statement_cache_size = statement_cache_size
+        self.result_cache = result_cache
+        self.metrics = metrics
+        self.speculative = speculative
+        self.replicator = replicator
         self.session = None
+        self.statements = None
 
-    def _local_connect(self):
+    def _driver_metrics(self):
+        """
+        driver metrics are only collected when asked for by QueryMetrics
+        """
+        return bool(self.metrics and self.metrics.driver_metrics)
+
+    def _local_settings(self):
         """
         assumes single node Cassandra cluster
         """
-        connection.setup(hosts=self.hosts,
-                         default_keyspace=self.keyspace,
-                         consistency=CL.ONE,
-                         port=self.port,
-                         cql_version=self.cql_version,
-                         lazy_connect=False,
-                         retry_connect=True,
-                         compression=True,
-                         auth_provider=None,
-                         load_balancing_policy=RoundRobinPolicy(),
-                         protocol_version=4,
-                         executor_threads=2,
-                         reconnection_policy=ConstantReconnectionPolicy(3.0, 5),
-                         default_retry_policy=RetryPolicy(),
-                         conviction_policy_factory=None,
-                         metrics_enabled=False,
-                         connection_class=None,
-                         ssl_options=None,
-                         sockopts=None,
-                         max_schema_agreement_wait=10,
-                         control_connection_timeout=2.0,
-                         idle_heartbeat_interval=30,
-                         schema_event_refresh_window=2,
-                         topology_event_refresh_window=10,
-                         connect_timeout=self.connect_timeout)
-        return
+        return {'contact_points': self.hosts,
+                'port': self.port,
+                'cql_version': self.cql_version,
+                'compression': True,
+                'auth_provider': None,
+                'load_balancing_policy': RoundRobinPolicy(),
+                'protocol_version': 4,
+                'executor_threads': 2,
+                'reconnection_policy': ConstantReconnectionPolicy(3.0, 5),
+                'default_retry_policy': RetryPolicy(),
+                'conviction_policy_factory': None,
+                'metrics_enabled': self._driver_metrics(),
+                'connection_class': None,
+                'ssl_options': None,
+                'sockopts': None,
+                'max_schema_agreement_wait': 10,
+                'control_connection_timeout': 2.0,
+                'idle_heartbeat_interval': 30,
+                'schema_event_refresh_window': 2,
+                'topology_event_refresh_window': 10,
+                'connect_timeout': self.connect_timeout}
 
-    def _production_connect(self):
+    def _production_settings(self):
         """
         assumes multiple node Cassandra cluster
         """
-        connection.setup(hosts=self.hosts,
-                         default_keyspace=self.keyspace,
-                         consistency=CL.LOCAL_QUORUM,
-                         port=self.port,
-                         cql_version=self.cql_version,
-                         lazy_connect=True,
-                         retry_connect=False,
-                         compression=True,
-                         auth_provider=None,
-                         load_balancing_policy=DCAwareRoundRobinPolicy(
-                             local_dc='dc1',
-                             used_hosts_per_remote_dc=0),
-                         protocol_version=4,
-                         executor_threads=2,
-                         reconnection_policy=None,
-                         default_retry_policy=None,
-                         conviction_policy_factory=None,
-                         metrics_enabled=False,
-                         connection_class=None,
-                         ssl_options=None,
-                         sockopts=None,
-                         max_schema_agreement_wait=10,
-                         control_connection_timeout=2.0,
-                         idle_heartbeat_interval=30,
-                         schema_event_refresh_window=2,
-                         topology_event_refresh_window=10,
-                         connect_timeout=self.connect_timeout)
-        return
+        return {'contact_points': self.hosts,
+                'port': self.port,
+                'cql_version': self.cql_version,
+                'compression': True,
+                'auth_provider': None,
+                'load_balancing_policy': DCAwareRoundRobinPolicy(
+                    local_dc='dc1',
+                    used_hosts_per_remote_dc=0),
+                'protocol_version': 4,
+                'executor_threads': 2,
+                'reconnection_policy': None,
+                'default_retry_policy': None,
+                'conviction_policy_factory': None,
+                'metrics_enabled': self._driver_metrics(),
+                'connection_class': None,
+                'ssl_options': None,
+                'sockopts': None,
+                'max_schema_agreement_wait': 10,
+                'control_connection_timeout': 2.0,
+                'idle_heartbeat_interval': 30,
+                'schema_event_refresh_window': 2,
+                'topology_event_refresh_window': 10,
+                'connect_timeout': self.connect_timeout}
+
+    def _consistency(self):
+        """
+        single node clusters cannot satisfy a quorum
+        """
+        if self.local_env:
+            return CL.ONE
+        return CL.LOCAL_QUORUM
 
     def _connect(self):
         """
         settings differ depending on cluster selected
+        the session is taken from the shared pool, so only the first
+        connector per cluster pays for the bootstrap and topology discovery
         """
+        if self.session is not None and not self.session.is_shutdown:
+            return
         try:
             if self.local_env:
-                self._local_connect()
+                settings = self._local_settings()
             else:
-                self._production_connect()
-            self.session = connection.get_session()
+                settings = self._production_settings()
+            self.session = self.pool.acquire(self.pool_key,
+                                             settings,
+                                             self._consistency())
+            self.statements = self.pool.statements(self.pool_key,
+                                                   self.statement_cache_size)
+            if self.metrics is not None:
+                self.metrics.watch(self.session.cluster)
             return
-        except connection.NoHostAvailable as e:
+        except NoHostAvailable as e:
             return CassandraError.no_host_available(self.hosts)
         except OperationTimedOut as e:
             return CassandraError.operation_timeout(str(e))
@@ -128,55 +185,169 @@ class CQLConnector:
             backtrace = extract_tb(traceback_prev)
             return CassandraError.unknown_exception(backtrace, str(e))
 
-    def _disconnect(self):
+    def close(self):
+        """
+        shut down the shared session of this cluster for every connector
+        only needed when a cluster is no longer used by the process
+        """
+        self.session = None
+        self.pool.release(self.pool_key)
+        return
+
+    def _statement(self, sql, values):
         """
-        despite the object names, this action truly disables only the executor
-        threads of the existing session closing the session and does not bring
-        down the Cassandra cluster itself
+        templated statements are prepared once per session and bound,
+        statements without values are sent as is since their CQL text
+        usually embeds the values and would never be reused
         """
+        if values:
+            prepared = self.statements.get(self.session, sql, self._consistency())
+            return prepared.bind(values)
+        return SimpleStatement(sql, consistency_level=self._consistency())
+
+    def _execute(self, sql, values, fetch_size=None, idempotent=False):
+        """
+        run one statement, the driver prepares a statement again when the
+        server no longer knows it, and a schema change run through write()
+        clears the statement cache
+        optional args:
+            fetch_size = rows per page, session default if None
+            idempotent = statement may be sent twice, see _send()
+        """
+        if self.metrics is None:
+            return self._execute_statement(sql, values, fetch_size, idempotent)
+        start = perf_counter()
         try:
-            self.session.cluster.shutdown()
-            self.session.shutdown()
-            return
-        except connection.NoHostAvailable as e:
+            resultset = self._execute_statement(sql, values, fetch_size, idempotent)
+        except Exception as e:
+            self.metrics.record(sql, perf_counter() - start, e)
+            raise
+        self.metrics.record(sql, perf_counter() - start)
+        return resultset
+
+    def _execute_statement(self, sql, values, fetch_size, idempotent):
+        statement = self._statement(sql, values)
+        if fetch_size:
+            statement.fetch_size = fetch_size
+        return self._send(sql, statement, idempotent)
+
+    def _send(self, sql, statement, idempotent=False):
+        """
+        with a speculative policy an idempotent statement still unanswered
+        after the policy's delay is sent again, the load balancing policy
+        routes the copy to the next coordinator and the first answer wins,
+        which cuts the tail latency of a slow or overloaded node
+        """
+        if not idempotent or self.speculative is None:
+            return self.session.execute(statement)
+        request = HedgedRequest(self.session,
+                                statement,
+                                self.speculative.delay_for(sql))
+        (resultset, fired, won) = request.execute()
+        self.speculative.record(fired, won)
+        return resultset
+
+    def speculative_stats(self):
+        """
+        how often hedged requests fired and won, None without a policy
+        """
+        if self.speculative is None:
+            return None
+        return self.speculative.stats()
+
+    def _exception_envelope(self, e, sql, values, error_cls):
+        """
+        map an exception caught outside its except clause, ie. raised by
+        a generator or returned by a future, to the matching error envelope
+        error_cls = CassandraReadError or CassandraWriteError
+        """
+        if isinstance(e, CassandraStreamError):
+            return e.envelope
+        if isinstance(e, NoHostAvailable):
             return CassandraError.no_host_available(self.hosts)
-        except OperationTimedOut as e:
+        if isinstance(e, OperationTimedOut):
             return CassandraError.operation_timeout(str(e))
-        except InvalidRequest as e:
+        if isinstance(e, InvalidRequest):
             return CassandraError.invalid_request(self.keyspace, str(e))
-        except Exception as e:
-            (type_e, value, traceback_prev) = exc_info()
-            backtrace = extract_tb(traceback_prev)
-            return CassandraError.unknown_exception(backtrace, str(e))
+        backtrace = extract_tb(e.__traceback__)
+        return error_cls.unknown_exception(sql, values, backtrace, str(e))
 
-    def _get_uuid_columns(self, values):
+    def statement_stats(self):
         """
-        walk elements of list or keys of dict identifying columns
-        with data that should be formatted as type UUID
+        hit, miss and eviction counts of the prepared statement cache
         """
-        uuid_columns = []
-        for key in values:
-            if key.endswith('_id'):
-                uuid_columns.append(key)
-        return uuid_columns
-        
-    def _format_row_data(self, resultset, uuid_columns):
+        err_msg = self._connect()
+        if err_msg:
+            return err_msg
+        return self.statements.stats()
+
+    def _written(self, sql):
         """
-        convert UUID to str(UUID) before return row
+        DDL stales every prepared statement and cached result,
+        DML stales the cached results of the tables it touched
         """
-        rows = []
-        columns = resultset.column_names
-        for i in range(len(resultset.current_rows)):
-            row = {}
-            for column in range(len(columns)):
-                if columns[column] in uuid_columns:
-                    row[columns[column]] = str(resultset[i][columns[column]])
-                else:
-                    row[columns[column]] = resultset[i][columns[column]]
-            rows.append(row)
-        return rows
-
-    def write(self, sql=None, values=None):
+        if is_schema_change(sql):
+            self.statements.clear()
+            if self.result_cache is not None:
+                self.result_cache.clear()
+        elif self.result_cache is not None:
+            for table in tables(sql, self.keyspace):
+                self.result_cache.invalidate(table)
+
+    def _iter_pages(self, resultset, sql=None):
+        """
+        yield rows of the current page as dicts with UUIDs formatted as str,
+        the next page is only requested once every row of the current page
+        has been consumed
+        the converter is compiled once from the first page of the result
+        instead of inspecting every cell of every row
+        """
+        convert = None
+        (rows_read, pages) = (0, 0)
+        try:
+            while True:
+                rows = resultset.current_rows
+                pages += 1
+                rows_read += len(rows)
+                if rows and convert is None:
+                    convert = compile_converter(resultset.column_names, rows)
+                for row in rows:
+                    yield convert(row)
+                if not resultset.has_more_pages:
+                    return
+                resultset.fetch_next_page()
+        finally:
+            if self.metrics is not None and sql is not None:
+                self.metrics.record_rows(sql, rows_read, pages)
+
+    def _collect_columns(self, resultset, arrays=False, sql=None):
+        """
+        gather every page into one list per column, see ColumnCollector
+        """
+        collector = ColumnCollector(resultset.column_names, arrays)
+        pages = 0
+        while True:
+            collector.add(resultset.current_rows)
+            pages += 1
+            if not resultset.has_more_pages:
+                break
+            resultset.fetch_next_page()
+        if self.metrics is not None and sql is not None:
+            self.metrics.record_rows(sql, collector.row_count, pages)
+        return collector
+
+    def _replicate(self, document):
+        """
+        queue the ElasticSearch copy of a written row
+        document = dict of index, doc_type, doc_id and values
+        """
+        if document is None or self.replicator is None:
+            return
+        if not self.replicator.replicate(**document):
+            log.warning('ES replication skipped: {}/{}/{}'.format(
+                document['index'], document['doc_type'], document['doc_id']))
+
+    def write(self, sql=None, values=None, idempotent=False, document=None):
         """
         process any Cassandra CQL DML statement that changes data
         ie. insert, upsert, update, delete
@@ -189,40 +360,35 @@ class CQLConnector:
         ie. if: CREATE TABLE T(id uuid, deleted boolean);
             sql = "INSERT INTO T(id, deleted) VALUES(%(id)s, %(deleted)s);"
             values = {'id': UUID(id), 'deleted': True}
+        idempotent = statement may be hedged by the speculative policy,
+                     only for writes safe to apply twice, ie. not counters
+                     or lightweight transactions
+        document = ElasticSearch copy of the row, replicated once the write
+                   succeeded when the connector has a replicator, not when
+                   a lightweight transaction, ie. IF NOT EXISTS, was not
+                   applied
+        ie. document = {'index': 'users', 'doc_type': 'user',
+                        'doc_id': str(id), 'values': {'deleted': True}}
         """
         rows = []
         err_msg = self._connect()
         if err_msg:
             return err_msg
         try:
-            if self.local_env:
-                statement = connection.SimpleStatement(
-                    sql, consistency_level=CL.ONE)
-            else:
-                statement = connection.SimpleStatement(
-                    sql, consistency_level=CL.LOCAL_QUORUM)
-            if values:
-                resultset = self.session.execute(statement, values)
-            else:
-                resultset = self.session.execute(statement)
+            resultset = self._execute(sql, values, idempotent=idempotent)
+            self._written(sql)
             if len(resultset.current_rows) == 0:
+                self._replicate(document)
                 return CassandraWrite.object_created()
             else:
-                uuid_columns = self._get_uuid_columns(values)
-                while True:
-                    if not resultset.has_more_pages:
-                        rows = self._format_row_data(resultset, uuid_columns)
-                        break
-                    rows.append(self._format_row_data(resultset, uuid_columns))
-                    resultset.next()
-            err_msg = self._disconnect()
-            if err_msg:
-                return err_msg
+                rows = list(self._iter_pages(resultset, sql))
+            if applied(rows):
+                self._replicate(document)
             if len(rows) == 1:
                 return CassandraWrite.one_row_found(rows[0])
             else:
                 return CassandraWrite.many_rows_found(rows)
-        except connection.NoHostAvailable as e:
+        except NoHostAvailable as e:
             return CassandraError.no_host_available(self.hosts)
         except OperationTimedOut as e:
             return CassandraError.operation_timeout(str(e))
@@ -233,6 +399,247 @@ class CQLConnector:
             backtrace = extract_tb(traceback_prev)
             return CassandraWriteError.unknown_exception(sql, values, backtrace, str(e))
 
+    def _batches(self, bound_rows, max_batch_rows, max_batch_bytes):
+        """
+        group bound statements sharing a partition key into UNLOGGED batches
+        limited by row count and serialized size, so every batch is applied
+        by a single replica set without the coordinator fanning it out
+        statements without a routing key are sent on their own
+        returns list of (statement, row indexes)
+        """
+        partitions = {}
+        singles = []
+        for i, bound in bound_rows:
+            key = bound.routing_key
+            if key is None:
+                singles.append((bound, [i]))
+            else:
+                partitions.setdefault(key, []).append((i, bound))
+        batches = []
+        for rows in partitions.values():
+            if len(rows) == 1:
+                batches.append((rows[0][1], [rows[0][0]]))
+                continue
+            batch, indexes, size = None, [], 0
+            for i, bound in rows:
+                row_bytes = sum(len(v) for v in bound.values
+                                if isinstance(v, bytes))
+                if batch is not None and (len(indexes) == max_batch_rows or
+                                          size + row_bytes > max_batch_bytes):
+                    batches.append((batch, indexes))
+                    batch, indexes, size = None, [], 0
+                if batch is None:
+                    batch = BatchStatement(batch_type=BatchType.UNLOGGED,
+                                           consistency_level=self._consistency())
+                batch.add(bound)
+                indexes.append(i)
+                size += row_bytes
+            batches.append((batch, indexes))
+        return batches + singles
+
+    def write_many(self,
+                   sql=None,
+                   list_of_values=None,
+                   batch=True,
+                   max_batch_rows=100,
+                   max_batch_bytes=5120,
+                   concurrency=50,
+                   documents=None):
+        """
+        process one Cassandra CQL DML statement template for many rows
+        ie. bulk insert during ingest
+        mandatory args
+        sql = Cassandra CQL statement template, see write()
+        list_of_values = list of dictionaries of values, one per row
+        optional args
+        batch = True groups rows by partition key into UNLOGGED batches,
+                False sends one statement per row
+        max_batch_rows = rows allowed in one batch
+        max_batch_bytes = serialized bytes allowed in one batch,
+                          defaults to the server's batch size warn threshold
+        concurrency = statements or batches in flight at once
+        documents = list of ElasticSearch copies, one per row or None,
+                    see write(), replicated for the rows written
+        returns envelope whose data holds one write envelope per row, in order
+        """
+        err_msg = self._connect()
+        if err_msg:
+            return err_msg
+        try:
+            list_of_values = list_of_values or []
+            results = [None] * len(list_of_values)
+            prepared = self.statements.get(self.session, sql, self._consistency())
+            bound_rows = []
+            for i, values in enumerate(list_of_values):
+                try:
+                    bound_rows.append((i, prepared.bind(values)))
+                except Exception as e:
+                    results[i] = self._exception_envelope(
+                        e, sql, values, CassandraWriteError)
+            if batch:
+                statements = self._batches(bound_rows,
+                                           max_batch_rows,
+                                           max_batch_bytes)
+            else:
+                statements = [(bound, [i]) for i, bound in bound_rows]
+            fanout = FanOut(self.session, concurrency)
+            responses = fanout.execute([s for s, _ in statements])
+            self._written(sql)
+            self._record_fanout(fanout, [sql] * len(statements), responses)
+            for (_, indexes), (success, result) in zip(statements, responses):
+                for i in indexes:
+                    if success:
+                        results[i] = CassandraWrite.object_created()
+                        if documents:
+                            self._replicate(documents[i])
+                    else:
+                        results[i] = self._exception_envelope(
+                            result, sql, list_of_values[i], CassandraWriteError)
+            return CassandraWrite.many_rows_written(results)
+        except NoHostAvailable as e:
+            return CassandraError.no_host_available(self.hosts)
+        except OperationTimedOut as e:
+            return CassandraError.operation_timeout(str(e))
+        except InvalidRequest as e:
+            return CassandraError.invalid_request(self.keyspace, str(e))
+        except Exception as e:
+            (type_e, value, traceback_prev) = exc_info()
+            backtrace = extract_tb(traceback_prev)
+            return CassandraWriteError.unknown_exception(sql, list_of_values, backtrace, str(e))
+
+    def _record_fanout(self, fanout, templates, responses):
+        """
+        record the latency of every statement of a fan-out
+        """
+        if self.metrics is None:
+            return
+        for sql, seconds, (success, result) in zip(templates, fanout.seconds, responses):
+            self.metrics.record(sql, seconds, None if success else result)
+
+    def _result_envelope(self, sql, values, resultset):
+        """
+        envelope read() or write() would return for a completed statement
+        """
+        rows = list(self._iter_pages(resultset, sql))
+        if is_query(sql):
+            if not rows:
+                return CassandraRead.no_rows_found()
+            message = CassandraRead
+        else:
+            if not rows:
+                return CassandraWrite.object_created()
+            message = CassandraWrite
+        if len(rows) == 1:
+            return message.one_row_found(rows[0])
+        return message.many_rows_found(rows)
+
+    def execute_concurrent(self,
+                           statements_and_values=None,
+                           concurrency=100,
+                           timeout=None):
+        """
+        process many independent Cassandra CQL statements at once
+        ie. multi key lookups
+        mandatory args
+        statements_and_values = list of (sql, values) as passed to read()
+                                or write(), values may be None
+        optional args
+        concurrency = statements in flight at once
+        timeout = seconds allowed per statement, session default if None
+        returns envelope whose data holds the envelope read() or write()
+        would return for each statement, in input order, a failed statement
+        never aborts the others
+        """
+        err_msg = self._connect()
+        if err_msg:
+            return err_msg
+        try:
+            statements_and_values = statements_and_values or []
+            results = [None] * len(statements_and_values)
+            pending = []
+            for i, (sql, values) in enumerate(statements_and_values):
+                try:
+                    pending.append((i, self._statement(sql, values)))
+                except Exception as e:
+                    results[i] = self._exception_envelope(
+                        e, sql, values, CassandraReadError)
+            fanout = FanOut(self.session, concurrency, timeout)
+            responses = fanout.execute([s for _, s in pending])
+            self._record_fanout(fanout,
+                                [statements_and_values[i][0] for i, _ in pending],
+                                responses)
+            for sql in set(sql for sql, _ in statements_and_values):
+                if not is_query(sql):
+                    self._written(sql)
+            for (i, _), (success, result) in zip(pending, responses):
+                (sql, values) = statements_and_values[i]
+                try:
+                    if not success:
+                        raise result
+                    results[i] = self._result_envelope(sql, values, result)
+                except Exception as e:
+                    if is_query(sql):
+                        error_cls = CassandraReadError
+                    else:
+                        error_cls = CassandraWriteError
+                    results[i] = self._exception_envelope(e, sql, values, error_cls)
+            return CassandraRead.many_results_found(results)
+        except NoHostAvailable as e:
+            return CassandraError.no_host_available(self.hosts)
+        except OperationTimedOut as e:
+            return CassandraError.operation_timeout(str(e))
+        except InvalidRequest as e:
+            return CassandraError.invalid_request(self.keyspace, str(e))
+        except Exception as e:
+            (type_e, value, traceback_prev) = exc_info()
+            backtrace = extract_tb(traceback_prev)
+            return CassandraReadError.unknown_exception(statements_and_values, None, backtrace, str(e))
+
+    def read_many(self, sql=None, list_of_values=None, concurrency=100, timeout=None):
+        """
+        process one Cassandra CQL DQL statement template for many keys
+        ie. sql = "SELECT name FROM T WHERE id=%(id)s;"
+            list_of_values = [{'id': UUID(id)} for id in ids]
+        see execute_concurrent() for optional args and the returned envelope
+        """
+        list_of_values = list_of_values or []
+        return self.execute_concurrent([(sql, values) for values in list_of_values],
+                                       concurrency,
+                                       timeout)
+
+    def scan_table(self,
+                   keyspace=None,
+                   table=None,
+                   columns=None,
+                   splits=64,
+                   workers=4,
+                   fetch_size=1000,
+                   checkpoint=None):
+        """
+        read an entire table in parallel over token ranges
+        ie. exports and backfills
+        mandatory args
+        keyspace = keyspace of the table, connector keyspace if None
+        table = table to scan, unquoted names are case insensitive as in CQL
+        optional args
+        columns = list of columns to return, all if None
+        splits = number of token ranges scanned
+        workers = ranges scanned at once
+        fetch_size = rows per page
+        checkpoint = path of a JSON file recording completed ranges,
+                     rerunning with the same path resumes the scan
+        returns TableScan, iterate it for rows or call run(callback)
+        ie. for row in connector.scan_table('ks', 'users'):
+        """
+        return TableScan(self,
+                         keyspace or self.keyspace,
+                         table,
+                         columns=columns,
+                         splits=splits,
+                         workers=workers,
+                         fetch_size=fetch_size,
+                         checkpoint=checkpoint)
+
     def new_read(self, sql=None):
         """
         because CQL table search is restricted to columns defined in the primary
@@ -242,7 +649,38 @@ class CQLConnector:
         """
         pass
 
-    def read(self, sql=None, values=None):
+    def iter_rows(self, sql=None, values=None, fetch_size=1000, idempotent=False):
+        """
+        stream the rows of any Cassandra CQL DQL statement
+        ie. select over a large partition
+        rows are yielded as their page arrives and the next page is only
+        requested once the current one is consumed, so memory stays flat and
+        a caller leaving the loop early never pulls the remaining pages
+        mandatory args
+        sql = Cassandra CQL statement or statement template, see read()
+        optional args
+        values = dictionary of non integer or string values inserted by template
+        fetch_size = rows per page requested from Cassandra
+        idempotent = first page may be hedged by the speculative policy
+        raises CassandraStreamError carrying the envelope read() would return
+        """
+        err_msg = self._connect()
+        if err_msg:
+            raise CassandraStreamError(err_msg)
+        try:
+            resultset = self._execute(sql, values, fetch_size, idempotent)
+            for row in self._iter_pages(resultset, sql):
+                yield row
+        except Exception as e:
+            raise CassandraStreamError(
+                self._exception_envelope(e, sql, values, CassandraReadError))
+
+    def read(self,
+             sql=None,
+             values=None,
+             columnar=False,
+             numpy_arrays=False,
+             idempotent=False):
         """
         process any Cassandra CQL DQL statement 
         ie. select
@@ -255,40 +693,44 @@ class CQLConnector:
         ie. if: CREATE TABLE T(id uuid, deleted boolean);
             sql = "SELECT INTO T(id, deleted) VALUES(%(id)s, %(deleted)s);"
             values = {'id': UUID(id), 'deleted': True}
+        columnar = return data as dict of column name: list of values
+        numpy_arrays = with columnar, numeric columns become NumPy arrays
+        idempotent = statement may be hedged by the speculative policy
+        with a result_cache, results are served from the cache until they
+        expire or a write touches their table
+        """
+        if self.result_cache is None:
+            return self._read(sql, values, columnar, numpy_arrays, idempotent)
+        key = (sql, freeze(values), self._consistency(), columnar, numpy_arrays)
+        response = self.result_cache.get(key)
+        if response is None:
+            response = self._read(sql, values, columnar, numpy_arrays, idempotent)
+            if response['status_code'] in (2009, 2010, 2011):
+                self.result_cache.put(key, response, tables(sql, self.keyspace))
+        return response
+
+    def _read(self, sql, values, columnar, numpy_arrays, idempotent=False):
+        """
+        read() without the result cache
         """
         rows = []
         err_msg = self._connect()
         if err_msg:
             return err_msg
         try:
-            if self.local_env:
-                statement = connection.SimpleStatement(
-                    sql, consistency_level=CL.ONE)
-            else:
-                statement = connection.SimpleStatement(
-                    sql, consistency_level=CL.LOCAL_QUORUM)
-            if values:
-                resultset = self.session.execute(statement, values)
-            else:
-                resultset = self.session.execute(statement)
+            resultset = self._execute(sql, values, idempotent=idempotent)
             if len(resultset.current_rows) == 0:
                 return CassandraRead.no_rows_found()
             else:
-                uuid_columns = self._get_uuid_columns(values)
-                while True:
-                    if not resultset.has_more_pages:
-                        rows = self._format_row_data(resultset, uuid_columns)
-                        break
-                    rows.append(self._format_row_data(resultset, uuid_columns))
-                    resultset.next()
-            err_msg = self._disconnect()
-            if err_msg:
-                return err_msg
+                if columnar:
+                    collector = self._collect_columns(resultset, numpy_arrays, sql)
+                    return CassandraRead.many_rows_found(collector.columns())
+                rows = list(self._iter_pages(resultset, sql))
             if len(rows) == 1:
                 return CassandraRead.one_row_found(rows[0])
             else:
                 return CassandraRead.many_rows_found(rows)
-        except connection.NoHostAvailable as e:
+        except NoHostAvailable as e:
             return CassandraError.no_host_available(self.hosts)
         except OperationTimedOut as e:
             return CassandraError.operation_timeout(str(e))
@@ -0,0 +1,156 @@
+
+from atexit import register
+from logging import getLogger
+from threading import RLock
+
+from cassandra.cluster import Cluster
+from cassandra.query import SimpleStatement, tuple_factory
+
+from connectors.cassandra.statements import StatementCache
+
+log = getLogger(__name__)
+
+HEALTH_CHECK = 'SELECT release_version FROM system.local;'
+
+class SessionPool:
+    """
+    process wide registry of Cassandra sessions shared by every CQLConnector
+    a session is bootstrapped once per (hosts, port, keyspace, local_env),
+    reused by all connector instances afterwards and shut down at exit
+    the cluster settings of the first connector to request a key win
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._sessions = {}
+        self._statements = {}
+        self._failures = {}
+        self._created = 0
+        self._reused = 0
+        self._evicted = 0
+
+    @staticmethod
+    def key(hosts, port, keyspace, local_env):
+        """
+        registry key, host order is irrelevant to the cluster reached
+        """
+        return (tuple(sorted(hosts)), port, keyspace, bool(local_env))
+
+    def acquire(self, key, settings, consistency):
+        """
+        return the live session registered under key, creating it if needed
+        mandatory args:
+            key = value returned by SessionPool.key()
+            settings = keyword arguments for cassandra.cluster.Cluster
+            consistency = default consistency level of the session
+        """
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and not session.is_shutdown:
+                self._reused += 1
+                return session
+            if session is not None:
+                self._evict(key)
+            cluster = Cluster(**settings)
+            try:
+                session = cluster.connect(key[2])
+            except Exception:
+                cluster.shutdown()
+                raise
+            session.default_consistency_level = consistency
+            session.row_factory = tuple_factory
+            self._sessions[key] = session
+            self._created += 1
+            log.info('Cassandra session created for {}'.format(key))
+            return session
+
+    def statements(self, key, max_size=256):
+        """
+        prepared statement cache of the session registered under key
+        prepared statements are bound to a session, so the cache is
+        dropped together with the session
+        """
+        with self._lock:
+            cache = self._statements.get(key)
+            if cache is None:
+                cache = StatementCache(max_size)
+                self._statements[key] = cache
+            return cache
+
+    def _evict(self, key):
+        """
+        remove session from the registry and release its executor threads
+        """
+        self._statements.pop(key, None)
+        self._failures.pop(key, None)
+        session = self._sessions.pop(key, None)
+        if session is None:
+            return
+        self._evicted += 1
+        try:
+            session.cluster.shutdown()
+        except Exception as e:
+            log.warning('Cassandra shutdown of {} failed: {}'.format(key, e))
+
+    def release(self, key):
+        """
+        shut down the session registered under key, next acquire() rebuilds it
+        """
+        with self._lock:
+            self._evict(key)
+
+    def health_check(self, timeout=2.0, evict=False, max_failures=3):
+        """
+        run a cheap query against every registered session
+        optional args:
+            timeout = seconds allowed per session
+            evict = drop sessions failing max_failures checks in a row so
+                    they are rebuilt on next use, eviction shuts the cluster
+                    down and aborts the queries in flight of every connector
+                    sharing it, so a single slow probe never evicts
+            max_failures = consecutive failed checks before eviction
+        returns dict of key: True if healthy else False
+        """
+        with self._lock:
+            sessions = list(self._sessions.items())
+        health = {}
+        statement = SimpleStatement(HEALTH_CHECK)
+        for key, session in sessions:
+            try:
+                session.execute(statement, timeout=timeout)
+                health[key] = True
+                with self._lock:
+                    self._failures.pop(key, None)
+            except Exception as e:
+                log.warning('Cassandra health check of {} failed: {}'.format(key, e))
+                health[key] = False
+                with self._lock:
+                    failures = self._failures.get(key, 0) + 1
+                    self._failures[key] = failures
+                    if evict and failures >= max_failures and \
+                            self._sessions.get(key) is session:
+                        self._evict(key)
+        return health
+
+    def stats(self):
+        """
+        counters describing registry usage
+        """
+        with self._lock:
+            return {'live_sessions': len(self._sessions),
+                    'created': self._created,
+                    'reused': self._reused,
+                    'evicted': self._evicted,
+                    'statements': dict((key, cache.stats()) for key, cache
+                                       in self._statements.items())}
+
+    def shutdown_all(self):
+        """
+        shut down every registered session, called at interpreter exit
+        """
+        with self._lock:
+            for key in list(self._sessions.keys()):
+                self._evict(key)
+
+session_pool = SessionPool()
+register(session_pool.shutdown_all)
@@ -0,0 +1,249 @@
+
+from atexit import register
+from collections import OrderedDict
+from logging import getLogger
+from threading import Condition, Thread
+from time import monotonic
+
+from elasticsearch.helpers import streaming_bulk
+
+from connectors.elasticsearch.serializer import as_text
+
+log = getLogger(__name__)
+
+# bulk item statuses worth another attempt, anything else is a bad document
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def _retryable(item):
+    status = item.get('status')
+    return not isinstance(status, int) or status in RETRY_STATUSES
+
+class ESReplicator:
+    """
+    write-behind replication of Cassandra writes into ElasticSearch
+    documents are queued by replicate() and indexed in bulk by a background
+    thread, so callers never wait for ElasticSearch
+    a document queued again before it is flushed replaces the pending one,
+    only the latest version of each (index, doc_type, doc_id) is sent
+    failed documents are retried on later flushes unless a newer version
+    was queued meanwhile, every pending document is flushed by close(),
+    which also runs at interpreter exit
+    mandatory args:
+        connector = ESConnector of the target cluster
+    optional args:
+        max_queue = documents pending before replicate() blocks
+        batch_size = documents per bulk request, reaching it flushes early
+        flush_interval = seconds between flushes
+        max_retries = attempts per document before it is dropped
+        block_timeout = seconds replicate() waits for room, None waits forever
+    """
+
+    def __init__(self,
+                 connector,
+                 max_queue=10000,
+                 batch_size=500,
+                 flush_interval=1.0,
+                 max_retries=3,
+                 block_timeout=None):
+        self.connector = connector
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.block_timeout = block_timeout
+        self._condition = Condition()
+        self._pending = OrderedDict()
+        self._attempts = {}
+        self._flushing = False
+        self._closed = False
+        self._thread = None
+        self._queued = 0
+        self._coalesced = 0
+        self._indexed = 0
+        self._retried = 0
+        self._failed = 0
+        self._rejected = 0
+        self._flushes = 0
+
+    def start(self):
+        """
+        start the background flush thread, called by the first replicate()
+        """
+        with self._condition:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = Thread(target=self._run, name='es-replicator')
+            self._thread.daemon = True
+            self._thread.start()
+        register(self.close)
+
+    def replicate(self, index, doc_type, doc_id, values, block=True):
+        """
+        queue a full document for indexing, same args as
+        ESConnector.add_document()
+        optional args:
+            block = False returns False at once rather than wait for room,
+                    without counting the document as rejected, for callers
+                    which cannot block, ie. an event loop, and retry elsewhere
+        returns False when the queue stayed full for block_timeout seconds
+        or the replicator is closed, the document is then not replicated
+        """
+        self.start()
+        key = (index, doc_type, doc_id)
+        with self._condition:
+            if self._closed:
+                if block:
+                    self._rejected += 1
+                return False
+            if key not in self._pending:
+                room = self._condition.wait_for(
+                    lambda: self._closed or len(self._pending) < self.max_queue,
+                    self.block_timeout if block else 0)
+                if not room or self._closed:
+                    if block:
+                        self._rejected += 1
+                    return False
+            if key in self._pending:
+                self._coalesced += 1
+                del self._pending[key]
+            self._pending[key] = values
+            self._attempts.pop(key, None)
+            self._queued += 1
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                deadline = monotonic() + self.flush_interval
+                self._condition.wait_for(
+                    lambda: (self._closed or
+                             len(self._pending) >= self.batch_size or
+                             monotonic() >= deadline),
+                    self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _take(self):
+        """
+        lock must be held, remove the next batch from the queue
+        """
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            (key, document) = self._pending.popitem(last=False)
+            batch.append((key, document, self._attempts.pop(key, 0)))
+        self._condition.notify_all()
+        return batch
+
+    def _requeue(self, key, document, attempts):
+        """
+        lock must be held, a newer version queued meanwhile wins
+        """
+        if key in self._pending:
+            return
+        if attempts >= self.max_retries:
+            self._failed += 1
+            return
+        self._pending[key] = document
+        self._attempts[key] = attempts
+        self._retried += 1
+
+    def _actions(self, batch):
+        for (index, doc_type, doc_id), document, _ in batch:
+            yield {'_op_type': 'index',
+                   '_index': index,
+                   '_type': doc_type,
+                   '_id': doc_id,
+                   '_source': as_text(document)}
+
+    def _send(self, batch):
+        """
+        index one batch, returns list of (key, document, attempts) to retry
+        """
+        err_msg = self.connector._connect()
+        if err_msg:
+            log.warning('ES replication deferred: {}'.format(err_msg['reason']))
+            return [(k, d, a + 1) for k, d, a in batch]
+        retry = []
+        results = streaming_bulk(self.connector.es,
+                                 self._actions(batch),
+                                 chunk_size=self.batch_size,
+                                 raise_on_error=False,
+                                 raise_on_exception=False)
+        try:
+            results = list(results)
+        finally:
+            for index in set(key[0] for key, _, _ in batch):
+                self.connector._written(index)
+        for (key, document, attempts), (ok, result) in zip(batch, results):
+            if ok:
+                with self._condition:
+                    self._indexed += 1
+                continue
+            item = list(result.values())[0]
+            if _retryable(item):
+                retry.append((key, document, attempts + 1))
+            else:
+                with self._condition:
+                    self._failed += 1
+                log.error('ES replication of {} failed: {}'.format(key, item.get('error')))
+        return retry
+
+    def flush(self):
+        """
+        index every document pending now, failed ones are queued again
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self._flushing)
+            self._flushing = True
+            batches = []
+            while self._pending:
+                batches.append(self._take())
+        try:
+            for batch in batches:
+                try:
+                    retry = self._send(batch)
+                except Exception as e:
+                    log.warning('ES replication bulk failed: {}'.format(e))
+                    retry = [(k, d, a + 1) for k, d, a in batch]
+                with self._condition:
+                    for key, document, attempts in retry:
+                        self._requeue(key, document, attempts)
+        finally:
+            with self._condition:
+                self._flushing = False
+                if batches:
+                    self._flushes += 1
+                self._condition.notify_all()
+
+    def close(self, timeout=None):
+        """
+        stop the background thread and flush, retrying failed documents
+        until they succeed or run out of attempts
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        while True:
+            self.flush()
+            with self._condition:
+                if not self._pending:
+                    return
+
+    def stats(self):
+        with self._condition:
+            return {'pending': len(self._pending),
+                    'queued': self._queued,
+                    'coalesced': self._coalesced,
+                    'indexed': self._indexed,
+                    'retried': self._retried,
+                    'failed': self._failed,
+                    'rejected': self._rejected,
+                    'flushes': self._flushes}
@@ -0,0 +1,100 @@
+
+from uuid import UUID
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def _uuid_indexes(rows, width):
+    """
+    detect UUID and TIMEUUID columns by the type of their values, rows are
+    only scanned until every column has shown a value
+    returns (indexes holding UUIDs, indexes holding only nulls so far)
+    """
+    uuid_indexes = []
+    unknown = set(range(width))
+    for row in rows:
+        for i in list(unknown):
+            if row[i] is None:
+                continue
+            unknown.discard(i)
+            if isinstance(row[i], UUID):
+                uuid_indexes.append(i)
+        if not unknown:
+            break
+    return uuid_indexes, sorted(unknown)
+
+def compile_converter(column_names, rows):
+    """
+    build the function turning one tuple row of a result into a dict with
+    UUIDs formatted as str, compiled once from the first page and reused
+    for every following page of the same result
+    mandatory args:
+        column_names = column names of the result
+        rows = first non empty page of tuple rows
+    """
+    names = tuple(column_names)
+    uuid_indexes, unknown = _uuid_indexes(rows, len(names))
+    uuid_fields = [(names[i], i) for i in uuid_indexes]
+    unknown_fields = [(names[i], i) for i in unknown]
+    if not uuid_fields and not unknown_fields:
+        def convert(row):
+            return dict(zip(names, row))
+        return convert
+
+    def convert(row):
+        result = dict(zip(names, row))
+        for name, i in uuid_fields:
+            if row[i] is not None:
+                result[name] = str(row[i])
+        for name, i in unknown_fields:
+            if isinstance(row[i], UUID):
+                result[name] = str(row[i])
+        return result
+    return convert
+
+class ColumnCollector:
+    """
+    accumulate tuple rows page by page into one list per column
+    for analytics consumers reading large results
+    optional args:
+        arrays = numeric columns become NumPy arrays when NumPy is installed
+    """
+
+    def __init__(self, column_names, arrays=False):
+        self.column_names = list(column_names)
+        self.arrays = arrays
+        self._columns = [[] for _ in self.column_names]
+        self.row_count = 0
+
+    def add(self, rows):
+        """
+        append one page of tuple rows
+        """
+        if not rows:
+            return
+        for column, values in zip(self._columns, zip(*rows)):
+            column.extend(values)
+        self.row_count += len(rows)
+
+    def _finish(self, values):
+        """
+        format UUID columns as str, convert numeric columns to arrays
+        """
+        first = next((v for v in values if v is not None), None)
+        if isinstance(first, UUID):
+            return [str(v) if v is not None else None for v in values]
+        if self.arrays and numpy is not None and \
+           isinstance(first, (int, float)) and None not in values:
+            array = numpy.asarray(values)
+            if array.dtype.kind in 'iufb':
+                return array
+        return values
+
+    def columns(self):
+        """
+        returns dict of column name: list or array of values
+        """
+        return dict((name, self._finish(values)) for name, values
+                    in zip(self.column_names, self._columns))
@@ -0,0 +1,226 @@
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from json import dump, load
+from logging import getLogger
+from os import replace
+from os.path import exists
+from queue import Full, Queue
+from threading import Event, Lock
+
+from cassandra.metadata import protect_name, protect_names
+
+from connectors.cassandra.error import CassandraError, CassandraStreamError
+from connectors.cassandra.statements import fold_name
+
+log = getLogger(__name__)
+
+MIN_TOKEN = -2 ** 63
+MAX_TOKEN = 2 ** 63 - 1
+
+def token_ranges(splits, ring=None):
+    """
+    split the Murmur3 token ring into (start, end] ranges
+    mandatory args:
+        splits = number of evenly sized ranges
+    optional args:
+        ring = token values owned by the nodes, ranges are also cut on them
+               so each range is held by a single replica set
+    """
+    step = (MAX_TOKEN - MIN_TOKEN) // splits
+    bounds = set(MIN_TOKEN + step * i for i in range(splits))
+    bounds.update(t for t in ring or [] if MIN_TOKEN < t < MAX_TOKEN)
+    bounds = sorted(bounds) + [MAX_TOKEN]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+class ScanStopped(Exception):
+    """
+    raised inside workers once the consumer of a scan went away
+    """
+    pass
+
+class TableScan:
+    """
+    read an entire table by splitting the token ring into ranges scanned
+    in parallel by a pool of threads, each range streams its pages through
+    CQLConnector.iter_rows so memory stays bounded by the pages in flight
+    iterate the scan to receive rows as a generator, or call run() to have
+    the workers hand every row to a callback
+    completed ranges are recorded in the checkpoint file so an interrupted
+    scan resumes with the ranges left, rows of ranges interrupted midway
+    are read again
+    mandatory args:
+        connector = CQLConnector
+        keyspace = keyspace of the table
+        table = table to scan
+        unquoted keyspace, table and column names are case insensitive as
+        in CQL, double quote them to match a case sensitive name
+    optional args:
+        columns = list of columns to return, all if None
+        splits = number of token ranges, at least
+        workers = ranges scanned at once
+        fetch_size = rows per page
+        checkpoint = path of a JSON file tracking completed ranges
+        align = also cut ranges on node tokens
+    """
+
+    def __init__(self,
+                 connector,
+                 keyspace,
+                 table,
+                 columns=None,
+                 splits=64,
+                 workers=4,
+                 fetch_size=1000,
+                 checkpoint=None,
+                 align=True):
+        self.connector = connector
+        self.keyspace = keyspace
+        self.table = table
+        self.columns = columns
+        self.splits = splits
+        self.workers = workers
+        self.fetch_size = fetch_size
+        self.checkpoint = checkpoint
+        self.align = align
+        self._lock = Lock()
+        self._done = set()
+
+    def _prepare(self):
+        """
+        build the range query and the list of ranges still to scan
+        """
+        err_msg = self.connector._connect()
+        if err_msg:
+            raise CassandraStreamError(err_msg)
+        metadata = self.connector.session.cluster.metadata
+        (keyspace, table) = (fold_name(self.keyspace), fold_name(self.table))
+        try:
+            table_meta = metadata.keyspaces[keyspace].tables[table]
+        except KeyError:
+            raise CassandraStreamError(CassandraError.unknown_table(keyspace, table))
+        partition_key = ', '.join(protect_names(
+            [c.name for c in table_meta.partition_key]))
+        if self.columns:
+            columns = ', '.join(protect_names([fold_name(c) for c in self.columns]))
+        else:
+            columns = '*'
+        sql = 'SELECT {} FROM {}.{} WHERE token({}) > %s AND token({}) <= %s;'
+        self._sql = sql.format(columns,
+                               protect_name(keyspace),
+                               protect_name(table),
+                               partition_key,
+                               partition_key)
+        ring = []
+        if self.align and metadata.token_map:
+            ring = [token.value for token in metadata.token_map.ring]
+        self._done = self._load_checkpoint()
+        return [r for r in token_ranges(self.splits, ring) if r not in self._done]
+
+    def _load_checkpoint(self):
+        if not self.checkpoint or not exists(self.checkpoint):
+            return set()
+        with open(self.checkpoint) as f:
+            state = load(f)
+        if state.get('table') != [self.keyspace, self.table]:
+            log.warning('Ignoring checkpoint {} of another table'.format(self.checkpoint))
+            return set()
+        return set(tuple(r) for r in state['done'])
+
+    def _range_done(self, token_range):
+        """
+        record a completed range, the file is replaced atomically
+        """
+        with self._lock:
+            self._done.add(token_range)
+            if not self.checkpoint:
+                return
+            tmp = '{}.tmp'.format(self.checkpoint)
+            with open(tmp, 'w') as f:
+                dump({'table': [self.keyspace, self.table],
+                      'done': sorted(self._done)}, f)
+            replace(tmp, self.checkpoint)
+
+    def _scan_range(self, token_range, emit):
+        """
+        stream one range into emit, returns rows read
+        """
+        count = 0
+        for row in self.connector.iter_rows(self._sql,
+                                            token_range,
+                                            self.fetch_size):
+            emit(row)
+            count += 1
+        self._range_done(token_range)
+        return count
+
+    def run(self, callback):
+        """
+        scan the table handing every row to callback from the worker
+        threads, callback must therefore be thread safe
+        returns number of rows read
+        raises CassandraStreamError on the first failing range
+        """
+        ranges = self._prepare()
+        count = 0
+        with ThreadPoolExecutor(self.workers) as executor:
+            futures = [executor.submit(self._scan_range, r, callback)
+                       for r in ranges]
+            try:
+                for future in as_completed(futures):
+                    count += future.result()
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+        log.info('Scanned {} rows of {}.{}'.format(count, self.keyspace, self.table))
+        return count
+
+    def __iter__(self):
+        """
+        yield rows as the workers read them, leaving the loop early stops
+        every worker at its next row
+        raises CassandraStreamError on the first failing range
+        """
+        ranges = self._prepare()
+        rows = Queue(maxsize=self.workers * self.fetch_size)
+        stop = Event()
+        finished = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    rows.put(item, timeout=0.1)
+                    return
+                except Full:
+                    continue
+            raise ScanStopped()
+
+        def work(token_range):
+            try:
+                self._scan_range(token_range, put)
+                put(finished)
+            except ScanStopped:
+                pass
+            except Exception as e:
+                try:
+                    put(e)
+                except ScanStopped:
+                    pass
+
+        executor = ThreadPoolExecutor(self.workers)
+        futures = [executor.submit(work, r) for r in ranges]
+        try:
+            remaining = len(ranges)
+            while remaining:
+                item = rows.get()
+                if item is finished:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stop.set()
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
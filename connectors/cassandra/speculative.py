@@ -0,0 +1,138 @@
+
+from logging import getLogger
+from threading import Condition, Lock
+
+from cassandra import OperationTimedOut
+from cassandra.cluster import ResultSet
+
+log = getLogger(__name__)
+
+class SpeculativePolicy:
+    """
+    opt-in hedging of idempotent statements: when the first request has
+    not answered after a delay the same statement is sent again, the load
+    balancing policy picks the next coordinator for it, and whichever
+    answers first successfully wins
+    optional args:
+        delay = seconds before hedging, None derives it from metrics
+        percentile = latency percentile of the template used as delay
+        metrics = QueryMetrics providing observed latencies
+        min_samples = requests of a template needed before trusting metrics
+        default_delay = seconds used until enough samples are recorded
+        min_delay, max_delay = bounds of a derived delay, in seconds
+    """
+
+    def __init__(self,
+                 delay=None,
+                 percentile=99,
+                 metrics=None,
+                 min_samples=100,
+                 default_delay=0.05,
+                 min_delay=0.002,
+                 max_delay=1.0):
+        self.delay = delay
+        self.percentile = percentile
+        self.metrics = metrics
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._lock = Lock()
+        self._executions = 0
+        self._fired = 0
+        self._won = 0
+
+    def delay_for(self, template):
+        """
+        seconds to wait for the first request of template before hedging
+        """
+        if self.delay is not None:
+            return self.delay
+        if self.metrics is not None:
+            ms = self.metrics.percentile(template, self.percentile, self.min_samples)
+            if ms is not None:
+                return min(max(ms / 1000.0, self.min_delay), self.max_delay)
+        return self.default_delay
+
+    def record(self, fired, won):
+        with self._lock:
+            self._executions += 1
+            if fired:
+                self._fired += 1
+            if won:
+                self._won += 1
+
+    def stats(self):
+        """
+        how often hedges fired and how often the hedge answered first
+        """
+        with self._lock:
+            return {'executions': self._executions,
+                    'hedges_fired': self._fired,
+                    'hedges_won': self._won}
+
+class HedgedRequest:
+    """
+    run one statement with a speculative second request
+    mandatory args:
+        session = live Cassandra session
+        statement = idempotent Statement
+        delay = seconds before the second request is sent
+    optional args:
+        timeout = seconds allowed overall, session default if None
+    """
+
+    def __init__(self, session, statement, delay, timeout=None):
+        self.session = session
+        self.statement = statement
+        self.delay = delay
+        if timeout is None:
+            timeout = session.default_timeout
+        self.timeout = timeout
+        self._condition = Condition()
+        self._winner = None
+        self._errors = []
+        self._sent = 0
+
+    def _send(self, i):
+        future = self.session.execute_async(self.statement, timeout=self.timeout)
+        self._sent += 1
+        future.add_callbacks(callback=self._on_success,
+                             callback_args=(future, i),
+                             errback=self._on_error,
+                             errback_args=(i,))
+
+    def _on_success(self, rows, future, i):
+        future.clear_callbacks()
+        with self._condition:
+            if self._winner is None:
+                self._winner = (ResultSet(future, rows), i)
+            self._condition.notify()
+
+    def _on_error(self, e, i):
+        with self._condition:
+            self._errors.append(e)
+            self._condition.notify()
+
+    def execute(self):
+        """
+        returns (ResultSet of the first successful answer, hedge fired,
+        hedge won), raises the last error when every request failed
+        """
+        self._send(0)
+        with self._condition:
+            self._condition.wait_for(lambda: self._winner or self._errors,
+                                     self.delay)
+            fired = self._winner is None and not self._errors
+        if fired:
+            self._send(1)
+        with self._condition:
+            answered = self._condition.wait_for(
+                lambda: self._winner or len(self._errors) == self._sent,
+                self.timeout)
+            if self._winner is not None:
+                (resultset, i) = self._winner
+                return resultset, fired, i == 1
+            if not answered:
+                raise OperationTimedOut('no answer within {}s'.format(self.timeout))
+            raise self._errors[-1]
@@ -0,0 +1,131 @@
+
+from collections import OrderedDict
+from logging import getLogger
+from re import IGNORECASE, compile
+from threading import Lock
+
+log = getLogger(__name__)
+
+NAMED_MARKER = compile(r'%\((\w+)\)s')
+SCHEMA_CHANGE = compile(r'^\s*(CREATE|ALTER|DROP)\s', IGNORECASE)
+QUERY = compile(r'^\s*SELECT\s', IGNORECASE)
+TABLE = compile(r'\b(?:FROM|INTO|UPDATE|TRUNCATE(?:\s+TABLE)?)\s+'
+                r'((?:"?\w+"?\.)?"?\w+"?)', IGNORECASE)
+
+def to_bind_markers(sql):
+    """
+    convert driver side templates into server side bind markers
+    ie. "... VALUES(%(id)s, %s);" becomes "... VALUES(:id, ?);"
+    """
+    sql = NAMED_MARKER.sub(r':\1', sql)
+    return sql.replace('%s', '?').replace('%%', '%')
+
+def fold_name(name):
+    """
+    identifier as Cassandra stores it in the schema metadata, unquoted
+    names are case insensitive and folded to lower case, double quoted
+    names keep their case
+    ie. 'T' becomes 't', '"T"' becomes 'T'
+    """
+    if len(name) > 1 and name.startswith('"') and name.endswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name.lower()
+
+def is_schema_change(sql):
+    """
+    True when sql is DDL altering the result metadata of prepared statements
+    """
+    return SCHEMA_CHANGE.match(sql) is not None
+
+def is_query(sql):
+    """
+    True when sql is DQL, ie. select
+    """
+    return QUERY.match(sql) is not None
+
+def tables(sql, keyspace=None):
+    """
+    keyspace qualified tables read or written by sql
+    ie. "UPDATE T SET ..." with keyspace ks returns ['ks.t']
+    """
+    names = []
+    for name in TABLE.findall(sql):
+        if '.' not in name:
+            name = '{}.{}'.format(keyspace, name)
+        names.append(name.replace('"', '').lower())
+    return names
+
+class StatementCache:
+    """
+    bounded LRU of prepared statements for one session
+    keyed by (CQL text, consistency level)
+    mandatory args:
+        max_size = number of prepared statements kept before evicting
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._lock = Lock()
+        self._statements = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, session, sql, consistency):
+        """
+        return the prepared statement for sql, preparing it on a miss
+        mandatory args:
+            session = session the statement is prepared against
+            sql = CQL statement template, %(name)s and %s markers allowed
+            consistency = consistency level bound statements inherit
+        """
+        key = (sql, consistency)
+        with self._lock:
+            prepared = self._statements.get(key)
+            if prepared is not None:
+                self._statements.move_to_end(key)
+                self._hits += 1
+                return prepared
+            self._misses += 1
+        prepared = session.prepare(to_bind_markers(sql))
+        prepared.consistency_level = consistency
+        with self._lock:
+            self._statements[key] = prepared
+            self._statements.move_to_end(key)
+            while len(self._statements) > self.max_size:
+                self._statements.popitem(last=False)
+                self._evictions += 1
+        return prepared
+
+    def __contains__(self, key):
+        """
+        True when (sql, consistency) is prepared, without counting a lookup
+        """
+        with self._lock:
+            return key in self._statements
+
+    def invalidate(self, sql, consistency):
+        """
+        forget one statement so the next get() prepares it again
+        """
+        with self._lock:
+            self._statements.pop((sql, consistency), None)
+
+    def clear(self):
+        """
+        forget every statement, ie. after a schema change
+        """
+        with self._lock:
+            self._statements.clear()
+        log.info('Prepared statement cache cleared')
+
+    def stats(self):
+        """
+        counters describing cache usage
+        """
+        with self._lock:
+            return {'size': len(self._statements),
+                    'max_size': self.max_size,
+                    'hits': self._hits,
+                    'misses': self._misses,
+                    'evictions': self._evictions}
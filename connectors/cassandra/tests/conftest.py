@@ -0,0 +1,17 @@
+
+import pytest
+
+from benchmarks.fakes import FakePool
+from connectors.cassandra.my_cassandra import CQLConnector
+
+@pytest.fixture
+def cql_connector():
+    """
+    factory of connectors to keyspace ks whose pool serves session,
+    cql_connector(session, cls=CQLConnector, **kwargs)
+    """
+
+    def build(session, cls=CQLConnector, **kwargs):
+        return cls(hosts=['127.0.0.1'], keyspace='ks', local_env=True,
+                   pool=FakePool(session), **kwargs)
+    return build
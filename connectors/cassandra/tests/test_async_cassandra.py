@@ -0,0 +1,180 @@
+
+from asyncio import run
+from threading import Event, Timer, current_thread
+
+from benchmarks.fakes import FakeResponseFuture, FakeSession
+from connectors.cassandra import my_async_cassandra
+from connectors.cassandra.my_async_cassandra import AsyncCQLConnector
+from connectors.cassandra.speculative import SpeculativePolicy
+
+class FullReplicator:
+    """
+    ESReplicator stand-in whose queue is always full
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def replicate(self, index, doc_type, doc_id, values, block=True):
+        self.calls.append((block, current_thread()))
+        return block
+
+def test_read_many_rows(cql_connector):
+    session = FakeSession(['id', 'name'], [(1, 'a'), (2, 'b')])
+    response = run(cql_connector(session, AsyncCQLConnector).read('SELECT id, name FROM t;'))
+    assert response['status_code'] == 2011
+    assert response['data'] == [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}]
+
+def test_iter_rows(cql_connector):
+    session = FakeSession(['id'], [(i,) for i in range(5)])
+    cqlconnector = cql_connector(session, AsyncCQLConnector)
+
+    async def rows():
+        return [row async for row in cqlconnector.iter_rows('SELECT id FROM t;')]
+    assert run(rows()) == [{'id': i} for i in range(5)]
+
+def test_full_replication_queue_waits_off_the_event_loop(cql_connector):
+    replicator = FullReplicator()
+    document = {'index': 'users', 'doc_type': 'user', 'doc_id': 1, 'values': {'id': 1}}
+    cqlconnector = cql_connector(FakeSession(), AsyncCQLConnector, replicator=replicator)
+    response = run(cqlconnector.write('INSERT INTO t (id) VALUES (1);', document=document))
+    assert response['status_code'] == 2006
+    ((first_block, loop_thread), (second_block, thread)) = replicator.calls
+    assert (first_block, second_block) == (False, True)
+    assert thread is not loop_thread
+
+class Replicator:
+
+    def __init__(self):
+        self.documents = []
+
+    def replicate(self, block=True, **document):
+        self.documents.append(document)
+        return True
+
+def test_write_not_applied_is_not_replicated(cql_connector):
+    document = {'index': 'users', 'doc_type': 'user', 'doc_id': 1, 'values': {'id': 1}}
+    replicator = Replicator()
+    session = FakeSession(['[applied]', 'id'], [(False, 1)])
+    cqlconnector = cql_connector(session, AsyncCQLConnector, replicator=replicator)
+    response = run(cqlconnector.write('INSERT INTO t (id) VALUES (1) IF NOT EXISTS;',
+                                      document=document))
+    assert response['data'] == {'[applied]': False, 'id': 1}
+    assert replicator.documents == []
+    session.rows = [(True, 1)]
+    run(cqlconnector.write('INSERT INTO t (id) VALUES (1) IF NOT EXISTS;', document=document))
+    assert replicator.documents == [document]
+
+class PagedFuture(FakeResponseFuture):
+    """
+    ResponseFuture handing out pages one at a time
+    """
+
+    def __init__(self, pages):
+        FakeResponseFuture.__init__(self, ['id'], pages[0])
+        self.pages = pages
+        self.fetched = 0
+
+    @property
+    def has_more_pages(self):
+        return self.fetched < len(self.pages) - 1
+
+    @has_more_pages.setter
+    def has_more_pages(self, value):
+        pass
+
+    def start_fetching_next_page(self):
+        self.fetched += 1
+        self._rows = self.pages[self.fetched]
+
+class PagedSession(FakeSession):
+
+    def __init__(self, pages):
+        FakeSession.__init__(self, ['id'])
+        self.future = PagedFuture(pages)
+
+    def execute_async(self, statement, timeout=None):
+        return self.future
+
+def test_iter_rows_fetches_pages_as_they_are_consumed(cql_connector):
+    session = PagedSession([[(0,), (1,)], [(2,), (3,)], [(4,)]])
+    cqlconnector = cql_connector(session, AsyncCQLConnector)
+
+    async def rows():
+        fetched = []
+        async for row in cqlconnector.iter_rows('SELECT id FROM t;', fetch_size=2):
+            fetched.append((row['id'], session.future.fetched))
+        return fetched
+    assert run(rows()) == [(0, 0), (1, 0), (2, 1), (3, 1), (4, 2)]
+
+def test_iter_rows_left_early_fetches_no_more_pages(cql_connector):
+    session = PagedSession([[(0,), (1,)], [(2,), (3,)]])
+    cqlconnector = cql_connector(session, AsyncCQLConnector)
+
+    async def first():
+        rows = cqlconnector.iter_rows('SELECT id FROM t;', fetch_size=2)
+        async for row in rows:
+            await rows.aclose()
+            return row
+    assert run(first()) == {'id': 0}
+    assert session.future.fetched == 0
+
+class DelayedFuture(FakeResponseFuture):
+    """
+    answers rows after delay seconds from another thread unless its
+    callbacks were cleared meanwhile
+    """
+
+    def __init__(self, rows, delay):
+        FakeResponseFuture.__init__(self, ['id'], rows)
+        self.delay = delay
+        self.callback = None
+        self.answered = Event()
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        self.callback = callback
+        Timer(self.delay, self._answer).start()
+
+    def _answer(self):
+        if self.callback is not None:
+            self.callback(self._rows)
+        self.answered.set()
+
+    def clear_callbacks(self):
+        self.callback = None
+
+class HedgedSession(FakeSession):
+
+    def __init__(self, *futures):
+        FakeSession.__init__(self, ['id'])
+        self.futures = list(futures)
+
+    def execute_async(self, statement, timeout=None):
+        return self.futures.pop(0)
+
+def test_slow_idempotent_read_is_hedged_and_the_loser_cancelled(monkeypatch, cql_connector):
+    waiters = []
+    wait_for = my_async_cassandra.wait_for
+
+    def recording_wait_for(response_future, loop):
+        waiters.append(wait_for(response_future, loop))
+        return waiters[-1]
+    monkeypatch.setattr(my_async_cassandra, 'wait_for', recording_wait_for)
+    (slow, fast) = (DelayedFuture([(1,)], 0.2), DelayedFuture([(2,)], 0))
+    session = HedgedSession(slow, fast)
+    policy = SpeculativePolicy(delay=0.01)
+    cqlconnector = cql_connector(session, AsyncCQLConnector, speculative=policy)
+    response = run(cqlconnector.read('SELECT id FROM t;', idempotent=True))
+    assert response['data'] == {'id': 2}
+    assert policy.stats() == {'executions': 1, 'hedges_fired': 1, 'hedges_won': 1}
+    (first, second) = waiters
+    assert first.cancelled() and second.result() == [(2,)]
+    assert slow.callback is None
+    assert slow.answered.wait(1)
+
+def test_fast_idempotent_read_is_not_hedged(cql_connector):
+    session = HedgedSession(DelayedFuture([(1,)], 0))
+    policy = SpeculativePolicy(delay=0.5)
+    cqlconnector = cql_connector(session, AsyncCQLConnector, speculative=policy)
+    assert run(cqlconnector.read('SELECT id FROM t;', idempotent=True))['data'] == {'id': 1}
+    assert policy.stats()['hedges_fired'] == 0
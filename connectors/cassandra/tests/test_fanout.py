@@ -0,0 +1,89 @@
+
+from threading import Lock, Timer
+
+import pytest
+
+from benchmarks.fakes import FakeResponseFuture, FakeSession
+from connectors.cassandra.fanout import FanOut
+
+class DelayedFuture(FakeResponseFuture):
+    """
+    completes from another thread after delay seconds, fails when error
+    """
+
+    def __init__(self, session, rows, delay, error=None):
+        FakeResponseFuture.__init__(self, ['id'], rows)
+        self.session = session
+        self.delay = delay
+        self.error = error
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        def complete():
+            self.session.finished()
+            if self.error is not None:
+                errback(self.error, *errback_args)
+            else:
+                callback(self._rows, *callback_args)
+        Timer(self.delay, complete).start()
+
+class SlowSession(FakeSession):
+    """
+    answers statement i with row (i,) after a delay decreasing with i,
+    statements whose value is negative fail
+    """
+
+    def __init__(self):
+        FakeSession.__init__(self)
+        self._lock = Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def execute_async(self, statement, timeout=None):
+        i = statement.values
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        error = ValueError('bad key {}'.format(i)) if i < 0 else None
+        return DelayedFuture(self, [(i,)], 0.001 * (10 - abs(i) % 10), error)
+
+    def finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+class Statement:
+
+    def __init__(self, values):
+        self.values = values
+
+def test_results_keep_input_order_within_the_concurrency_bound():
+    session = SlowSession()
+    results = FanOut(session, concurrency=3).execute([Statement(i) for i in range(20)])
+    assert [r.current_rows for _, r in results] == [[(i,)] for i in range(20)]
+    assert all(success for success, _ in results)
+    assert session.max_in_flight <= 3
+
+def test_failures_are_recorded_per_statement():
+    fanout = FanOut(SlowSession(), concurrency=2)
+    results = fanout.execute([Statement(1), Statement(-2), Statement(3)])
+    assert [success for success, _ in results] == [True, False, True]
+    assert isinstance(results[1][1], ValueError)
+    assert all(seconds > 0 for seconds in fanout.seconds)
+
+def test_concurrency_must_be_positive():
+    with pytest.raises(ValueError):
+        FanOut(FakeSession(), concurrency=0)
+
+def test_read_many_returns_one_envelope_per_key(cql_connector):
+    session = FakeSession(['id', 'name'], [(1, 'a')])
+    connector = cql_connector(session)
+    response = connector.read_many('SELECT id, name FROM t WHERE id = %(id)s;',
+                                   [{'id': i} for i in range(3)])
+    assert response['status_code'] == 2013
+    assert [r['data'] for r in response['data']] == [{'id': 1, 'name': 'a'}] * 3
+
+def test_execute_concurrent_mixes_reads_and_writes(cql_connector):
+    session = FakeSession(['id'], [])
+    connector = cql_connector(session)
+    response = connector.execute_concurrent([('SELECT id FROM t;', None),
+                                             ('INSERT INTO t (id) VALUES (1);', None)])
+    assert [r['status_code'] for r in response['data']] == [2009, 2006]
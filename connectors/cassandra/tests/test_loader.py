@@ -0,0 +1,106 @@
+
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from cassandra.cqltypes import DateType, Int32Type, ListType, SimpleDateType, UTF8Type
+
+from benchmarks.fakes import FakePrepared, FakeSession
+from connectors.cassandra.error import CassandraStreamError
+from connectors.cassandra.loader import BulkLoader, read_records
+
+class TablePrepared(FakePrepared):
+
+    def __init__(self, query, columns):
+        FakePrepared.__init__(self, query)
+        self.column_metadata = [SimpleNamespace(name=name, type=cql_type)
+                                for name, cql_type in columns]
+
+class TableSession(FakeSession):
+    """
+    prepares INSERTs into one table of columns, keeps every bound statement
+    """
+
+    def __init__(self, columns):
+        FakeSession.__init__(self)
+        self.columns = columns
+        self.queries = []
+        self.bound = []
+
+    def prepare(self, query):
+        self.queries.append(query)
+        return TablePrepared(query, self.columns)
+
+    def execute_async(self, statement, timeout=None):
+        self.bound.append(statement)
+        return FakeSession.execute_async(self, statement, timeout)
+
+@pytest.fixture
+def loader(cql_connector):
+    """
+    factory of loaders into table of keyspace ks through a connector to session
+    """
+
+    def build(session, table='Users'):
+        return BulkLoader(cql_connector(session), table, concurrency=4)
+    return build
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def test_read_records_guesses_the_format(tmp_path):
+    csv = write(tmp_path, 'a.csv', 'id,name\n1,x\n')
+    jsonl = write(tmp_path, 'a.jsonl', '{"id": 1}\n\n{"id": 2}\n')
+    assert list(read_records(csv)) == [{'id': '1', 'name': 'x'}]
+    assert list(read_records(jsonl, use_mmap=True)) == [{'id': 1}, {'id': 2}]
+
+def test_csv_values_are_converted_to_column_types(tmp_path, loader):
+    session = TableSession([('id', Int32Type), ('created', DateType),
+                            ('day', SimpleDateType), ('name', UTF8Type)])
+    path = write(tmp_path, 'users.csv',
+                 'ID,Created,Day,Name\n'
+                 '1,2016-05-01T12:00:00Z,2016-05-01,a\n'
+                 '2,1462104000000,2016-05-02,\n')
+    stats = loader(session).load(path)
+    assert session.queries == ['INSERT INTO users (id, created, day, name) '
+                               'VALUES (?, ?, ?, ?);']
+    assert [b.values for b in session.bound] == [
+        [1, datetime(2016, 5, 1, 12, tzinfo=timezone.utc), date(2016, 5, 1), 'a'],
+        [2, 1462104000000, date(2016, 5, 2), None]]
+    assert (stats['rows'], stats['errors']) == (2, 0)
+
+def test_failed_rows_are_not_counted_as_throughput(tmp_path, loader):
+    session = TableSession([('id', Int32Type)])
+    path = write(tmp_path, 'ids.csv', 'id\n1\nnot a number\n3\n')
+    stats = loader(session, 'ids').load(path)
+    assert (stats['rows'], stats['errors']) == (2, 1)
+    assert stats['rows_per_sec'] == pytest.approx(2 / stats['seconds'])
+
+def test_collection_columns_are_rejected_for_csv(tmp_path, loader):
+    session = TableSession([('id', Int32Type),
+                            ('tags', ListType.apply_parameters([UTF8Type]))])
+    path = write(tmp_path, 'tags.csv', 'id,tags\n1,a\n')
+    with pytest.raises(CassandraStreamError) as e:
+        loader(session, 'tags').load(path)
+    assert 'list<text>' in e.value.envelope['reason']
+    assert session.bound == []
+
+def test_collection_columns_load_from_jsonl(tmp_path, loader):
+    session = TableSession([('id', Int32Type),
+                            ('tags', ListType.apply_parameters([UTF8Type]))])
+    path = write(tmp_path, 'tags.jsonl', '{"id": 1, "tags": ["a", "b"]}\n')
+    stats = loader(session, 'tags').load(path)
+    assert [b.values for b in session.bound] == [[1, ['a', 'b']]]
+    assert stats['rows'] == 1
+
+def test_each_file_maps_its_own_columns(tmp_path, loader):
+    session = TableSession([('id', Int32Type), ('name', UTF8Type)])
+    bulk_loader = loader(session)
+    bulk_loader.load(write(tmp_path, 'a.csv', 'id,name\n1,a\n'))
+    bulk_loader.load(write(tmp_path, 'b.csv', 'id\n2\n'))
+    assert session.queries == ['INSERT INTO users (id, name) VALUES (?, ?);',
+                               'INSERT INTO users (id) VALUES (?);']
+    assert [b.values for b in session.bound] == [[1, 'a'], [2]]
+    assert bulk_loader.mapping is None
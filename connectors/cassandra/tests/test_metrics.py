@@ -0,0 +1,59 @@
+
+from cassandra import OperationTimedOut
+
+from benchmarks.fakes import FakeSession
+from connectors.cassandra.metrics import OTHER, Histogram, QueryMetrics
+
+def test_histogram_percentiles_are_bucket_upper_bounds():
+    histogram = Histogram()
+    for ms in [0.1] * 50 + [3] * 40 + [15000] * 10:
+        histogram.add(ms)
+    assert histogram.percentile(50) == 0.25
+    assert histogram.percentile(90) == 5.0
+    assert histogram.percentile(99) == 15000
+    snapshot = histogram.snapshot()
+    assert (snapshot['count'], snapshot['max_ms'], snapshot['buckets']['inf']) == (100, 15000, 10)
+
+def test_record_counts_errors_and_timeouts():
+    metrics = QueryMetrics()
+    metrics.record('SELECT 1', 0.002)
+    metrics.record('SELECT 1', 0.004, RuntimeError('boom'))
+    metrics.record('SELECT 1', 0.004, OperationTimedOut('slow'))
+    metrics.record_rows('SELECT 1', 10, 2)
+    stats = metrics.snapshot()['templates']['SELECT 1']
+    assert (stats['count'], stats['errors'], stats['timeouts']) == (3, 2, 1)
+    assert (stats['rows'], stats['pages']) == (10, 2)
+    assert metrics.percentile('SELECT 1', 50) == 5.0
+    assert metrics.percentile('SELECT 1', 50, min_samples=4) is None
+    assert metrics.percentile('SELECT 2', 50) is None
+
+def test_templates_beyond_the_limit_are_folded():
+    metrics = QueryMetrics(max_templates=2)
+    for i in range(4):
+        metrics.record('SELECT {}'.format(i), 0.001)
+    assert sorted(metrics.snapshot()['templates']) == [OTHER, 'SELECT 0', 'SELECT 1']
+    assert metrics.snapshot()['templates'][OTHER]['count'] == 2
+
+def test_export_survives_a_failing_exporter():
+    exported = []
+    metrics = QueryMetrics(exporter=exported.append)
+    metrics.record('SELECT 1', 0.001)
+    metrics.export()
+    assert list(exported[0]['templates']) == ['SELECT 1']
+
+    def fail(snapshot):
+        raise RuntimeError('down')
+    metrics.exporter = fail
+    metrics.export()
+
+class Cluster:
+    metrics = None
+
+def test_connector_records_reads_and_rows(cql_connector):
+    metrics = QueryMetrics()
+    session = FakeSession(['id'], [(i,) for i in range(5)], page_size=2)
+    session.cluster = Cluster()
+    connector = cql_connector(session, metrics=metrics)
+    connector.read('SELECT id FROM t;')
+    stats = metrics.snapshot()['templates']['SELECT id FROM t;']
+    assert (stats['count'], stats['rows'], stats['pages']) == (1, 5, 3)
@@ -0,0 +1,150 @@
+
+import pytest
+
+from benchmarks.fakes import FakeBound, FakePrepared, FakeSession
+from connectors.cache import ResultCache
+from connectors.cassandra import my_cassandra
+from connectors.cassandra.error import CassandraStreamError
+
+class PagingSession(FakeSession):
+    """
+    keeps the result sets it returns to check which pages were fetched
+    """
+
+    def __init__(self, *args, **kwargs):
+        FakeSession.__init__(self, *args, **kwargs)
+        self.resultsets = []
+
+    def execute(self, statement, timeout=None):
+        resultset = FakeSession.execute(self, statement, timeout)
+        self.resultsets.append(resultset)
+        return resultset
+
+def test_iter_rows_streams_every_page(cql_connector):
+    session = PagingSession(['id'], [(i,) for i in range(5)])
+    rows = list(cql_connector(session).iter_rows('SELECT id FROM t;', fetch_size=2))
+    assert rows == [{'id': i} for i in range(5)]
+    assert session.resultsets[0]._offset == 4
+
+def test_iter_rows_stops_fetching_when_left_early(cql_connector):
+    session = PagingSession(['id'], [(i,) for i in range(5)])
+    for row in cql_connector(session).iter_rows('SELECT id FROM t;', fetch_size=2):
+        break
+    assert session.resultsets[0]._offset == 0
+
+def test_iter_rows_raises_stream_error(cql_connector):
+    session = FakeSession()
+
+    def fail(statement, timeout=None):
+        raise RuntimeError('boom')
+    session.execute = fail
+    with pytest.raises(CassandraStreamError) as e:
+        list(cql_connector(session).iter_rows('SELECT id FROM t;'))
+    assert e.value.envelope['status_code'] == 2005
+
+class KeyedPrepared(FakePrepared):
+    """
+    bound statements routed on their pk value, binding fails without one
+    """
+
+    def bind(self, values):
+        bound = FakeBound(values)
+        bound.routing_key = values['pk']
+        return bound
+
+class KeyedSession(FakeSession):
+
+    def __init__(self):
+        FakeSession.__init__(self)
+        self.sent = []
+
+    def prepare(self, query):
+        return KeyedPrepared(query)
+
+    def execute_async(self, statement, timeout=None):
+        self.sent.append(statement)
+        return FakeSession.execute_async(self, statement, timeout)
+
+class FakeBatch:
+
+    def __init__(self, batch_type=None, consistency_level=None):
+        self.statements = []
+
+    def add(self, statement):
+        self.statements.append(statement)
+
+class Replicator:
+
+    def __init__(self):
+        self.documents = []
+
+    def replicate(self, **document):
+        self.documents.append(document)
+        return True
+
+def test_write_many_batches_rows_by_partition(monkeypatch, cql_connector):
+    monkeypatch.setattr(my_cassandra, 'BatchStatement', FakeBatch)
+    session = KeyedSession()
+    rows = [{'pk': b'a', 'v': 1}, {'pk': b'b', 'v': 2}, {'pk': b'a', 'v': 3},
+            {'pk': b'a', 'v': 4}, {'v': 5}]
+    response = cql_connector(session).write_many(
+        'INSERT INTO t (pk, v) VALUES (%(pk)s, %(v)s);', rows, max_batch_rows=2)
+    assert response['status_code'] == 2012
+    assert [r['status_code'] for r in response['data']] == [2006, 2006, 2006, 2006, 2005]
+    batches = [[b.values['v'] for b in s.statements] for s in session.sent
+               if isinstance(s, FakeBatch)]
+    assert batches == [[1, 3], [4]]
+    assert [s.values['v'] for s in session.sent if not isinstance(s, FakeBatch)] == [2]
+
+def test_write_many_without_batches_replicates_written_rows(cql_connector):
+    session = KeyedSession()
+    replicator = Replicator()
+    rows = [{'pk': b'a', 'v': 1}, {'v': 2}, {'pk': b'b', 'v': 3}]
+    documents = [{'index': 'i', 'doc_type': 't', 'doc_id': r['v'], 'values': r} for r in rows]
+    response = cql_connector(session, replicator=replicator).write_many(
+        'INSERT INTO t (pk, v) VALUES (%(pk)s, %(v)s);', rows, batch=False,
+        documents=documents)
+    assert [r['status_code'] for r in response['data']] == [2006, 2005, 2006]
+    assert len(session.sent) == 2
+    assert [d['doc_id'] for d in replicator.documents] == [1, 3]
+
+class CountingSession(FakeSession):
+
+    def __init__(self, *args):
+        FakeSession.__init__(self, *args)
+        self.executed = 0
+
+    def execute(self, statement, timeout=None):
+        self.executed += 1
+        return FakeSession.execute(self, statement, timeout)
+
+def test_read_cache_is_invalidated_by_writes_to_the_table(cql_connector):
+    session = CountingSession(['id'], [(1,)])
+    cqlconnector = cql_connector(session, result_cache=ResultCache())
+    for i in range(2):
+        assert cqlconnector.read('SELECT id FROM t WHERE id = %(id)s;', {'id': 1})['data'] == {'id': 1}
+    cqlconnector.read('SELECT id FROM t WHERE id = %(id)s;', {'id': 2})
+    assert session.executed == 2
+    cqlconnector.write('INSERT INTO other (id) VALUES (1);')
+    cqlconnector.read('SELECT id FROM t WHERE id = %(id)s;', {'id': 1})
+    assert session.executed == 3
+    cqlconnector.write('UPDATE t SET v = 1 WHERE id = 1;')
+    cqlconnector.read('SELECT id FROM t WHERE id = %(id)s;', {'id': 1})
+    assert session.executed == 5
+
+def test_failed_reads_are_not_cached(cql_connector):
+    session = CountingSession(['id'], [])
+    cqlconnector = cql_connector(session, result_cache=ResultCache())
+    session.execute = lambda statement, timeout=None: 1 / 0
+    assert cqlconnector.read('SELECT id FROM t;')['status_code'] == 2005
+    assert cqlconnector.result_cache.stats()['size'] == 0
+
+def test_write_not_applied_is_not_replicated(cql_connector):
+    document = {'index': 'users', 'doc_type': 'user', 'doc_id': 1, 'values': {'id': 1}}
+    sql = 'INSERT INTO t (id) VALUES (1) IF NOT EXISTS;'
+    for applied, replicated in ((False, 0), (True, 1)):
+        replicator = Replicator()
+        session = FakeSession(['[applied]', 'id'], [(applied, 1)])
+        response = cql_connector(session, replicator=replicator).write(sql, document=document)
+        assert response['data']['[applied]'] is applied
+        assert len(replicator.documents) == replicated
@@ -0,0 +1,60 @@
+
+from uuid import UUID
+
+import pytest
+
+from benchmarks.fakes import FakeSession
+from connectors.cassandra import rows as rows_module
+from connectors.cassandra.rows import ColumnCollector, compile_converter
+
+ID = UUID('12345678-1234-5678-1234-567812345678')
+
+def test_converter_formats_uuid_columns():
+    convert = compile_converter(['id', 'n'], [(ID, 1)])
+    assert convert((ID, 1)) == {'id': str(ID), 'n': 1}
+    assert convert((None, 2)) == {'id': None, 'n': 2}
+
+def test_converter_checks_columns_null_on_the_first_page():
+    convert = compile_converter(['id', 'n'], [(None, 1)])
+    assert convert((ID, 2)) == {'id': str(ID), 'n': 2}
+    assert convert((None, 3)) == {'id': None, 'n': 3}
+
+def test_plain_columns_are_zipped():
+    convert = compile_converter(['a', 'b'], [(1, 'x')])
+    assert convert((2, 'y')) == {'a': 2, 'b': 'y'}
+
+def test_collector_gathers_pages_per_column():
+    collector = ColumnCollector(['id', 'n', 'name'])
+    collector.add([(ID, 1, 'a')])
+    collector.add([])
+    collector.add([(None, 2, 'b')])
+    assert collector.row_count == 2
+    assert collector.columns() == {'id': [str(ID), None], 'n': [1, 2], 'name': ['a', 'b']}
+
+def test_collector_builds_numeric_arrays():
+    numpy = pytest.importorskip('numpy')
+    collector = ColumnCollector(['n', 'x', 'name', 'gap'], arrays=True)
+    collector.add([(1, 0.5, 'a', None), (2, 1.5, 'b', 3)])
+    columns = collector.columns()
+    assert isinstance(columns['n'], numpy.ndarray) and columns['n'].tolist() == [1, 2]
+    assert columns['x'].dtype.kind == 'f'
+    assert columns['name'] == ['a', 'b']
+    assert columns['gap'] == [None, 3]
+
+def test_collector_without_numpy_returns_lists(monkeypatch):
+    monkeypatch.setattr(rows_module, 'numpy', None)
+    collector = ColumnCollector(['n'], arrays=True)
+    collector.add([(1,), (2,)])
+    assert collector.columns() == {'n': [1, 2]}
+
+def test_columnar_read_spans_every_page(cql_connector):
+    session = FakeSession(['id', 'n'], [(ID, i) for i in range(5)], page_size=2)
+    response = cql_connector(session).read('SELECT id, n FROM t;', columnar=True)
+    assert response['status_code'] == 2011
+    assert response['data'] == {'id': [str(ID)] * 5, 'n': [0, 1, 2, 3, 4]}
+
+def test_row_read_converts_uuids_on_later_pages(cql_connector):
+    session = FakeSession(['id', 'n'], [(None, 0), (ID, 1), (ID, 2)], page_size=1)
+    response = cql_connector(session).read('SELECT id, n FROM t;')
+    assert response['data'] == [{'id': None, 'n': 0}, {'id': str(ID), 'n': 1},
+                                {'id': str(ID), 'n': 2}]
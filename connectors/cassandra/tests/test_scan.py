@@ -0,0 +1,130 @@
+
+from json import load
+from threading import Lock, active_count
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.fakes import FakeResultSet, FakeSession
+from connectors.cassandra.error import CassandraStreamError
+from connectors.cassandra.scan import MAX_TOKEN, MIN_TOKEN, TableScan, token_ranges
+
+def connector(tables):
+    """
+    CQLConnector stand-in whose schema holds tables of keyspace ks,
+    tables = dict of table name: partition key column names
+    """
+    metadata = SimpleNamespace(
+        keyspaces={'ks': SimpleNamespace(tables=dict(
+            (name, SimpleNamespace(partition_key=[SimpleNamespace(name=c) for c in key]))
+            for name, key in tables.items()))},
+        token_map=None)
+    session = SimpleNamespace(cluster=SimpleNamespace(metadata=metadata))
+    return SimpleNamespace(_connect=lambda: None, session=session)
+
+def test_token_ranges_cover_the_ring():
+    ranges = token_ranges(4, ring=[0, 10])
+    assert ranges[0][0] == MIN_TOKEN
+    assert ranges[-1][1] == MAX_TOKEN
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert (0, 10) in ranges
+
+def test_unknown_table_raises_stream_error():
+    scan = TableScan(connector({'users': ['id']}), 'ks', 'missing')
+    with pytest.raises(CassandraStreamError) as e:
+        scan._prepare()
+    assert e.value.envelope['status_code'] == 2004
+    assert 'ks.missing' in e.value.envelope['reason']
+
+def test_unquoted_names_are_case_insensitive():
+    scan = TableScan(connector({'users': ['id']}), 'KS', 'Users', columns=['Name'], splits=2)
+    ranges = scan._prepare()
+    assert len(ranges) == 2
+    assert scan._sql == ('SELECT name FROM ks.users '
+                         'WHERE token(id) > %s AND token(id) <= %s;')
+
+def test_quoted_names_keep_their_case():
+    scan = TableScan(connector({'Users': ['id']}), 'ks', '"Users"')
+    scan._prepare()
+    assert 'FROM ks."Users"' in scan._sql
+
+class RingSession(FakeSession):
+    """
+    table of rows (token, id) answering each token range with the rows
+    it holds, ranges listed in fail raise instead
+    """
+
+    def __init__(self, tokens, fail=()):
+        FakeSession.__init__(self, ['token', 'id'])
+        self.table = [(token, i) for i, token in enumerate(tokens)]
+        self.fail = set(fail)
+        self.scanned = []
+        self._lock = Lock()
+        self.cluster = SimpleNamespace(metadata=connector({'t': ['id']}).session.cluster.metadata)
+
+    def execute(self, statement, timeout=None):
+        (start, end) = statement.values
+        with self._lock:
+            self.scanned.append((start, end))
+        if (start, end) in self.fail:
+            raise RuntimeError('range {} unavailable'.format((start, end)))
+        rows = [row for row in self.table if start < row[0] <= end]
+        return FakeResultSet(self.column_names, rows, statement.fetch_size)
+
+@pytest.fixture
+def table_scan(cql_connector):
+    """
+    factory of scans of table ks.t through a connector to session
+    """
+
+    def build(session, **kwargs):
+        return TableScan(cql_connector(session), 'ks', 't', **kwargs)
+    return build
+
+TOKENS = [MIN_TOKEN + 1 + i * (2 ** 59) for i in range(32)]
+
+def test_rows_of_every_range_are_returned(table_scan):
+    session = RingSession(TOKENS)
+    rows = list(table_scan(session, splits=8, workers=3, fetch_size=2))
+    assert sorted(row['id'] for row in rows) == list(range(32))
+    assert sorted(session.scanned) == token_ranges(8)
+    session.scanned = []
+    ids = []
+    assert table_scan(session, splits=8, workers=3).run(lambda row: ids.append(row['id'])) == 32
+    assert sorted(ids) == list(range(32))
+
+def test_interrupted_scan_resumes_from_its_checkpoint(tmp_path, table_scan):
+    checkpoint = str(tmp_path / 'scan.json')
+    ranges = token_ranges(8)
+    session = RingSession(TOKENS, fail=[ranges[3]])
+    with pytest.raises(CassandraStreamError):
+        table_scan(session, splits=8, workers=1, checkpoint=checkpoint).run(lambda row: None)
+    with open(checkpoint) as f:
+        done = set(tuple(r) for r in load(f)['done'])
+    assert ranges[3] not in done and ranges[0] in done
+    session = RingSession(TOKENS)
+    rows = list(table_scan(session, splits=8, workers=2, checkpoint=checkpoint))
+    assert sorted(session.scanned) == sorted(set(ranges) - done)
+    assert sorted(row['id'] for row in rows) == sorted(
+        i for i, token in enumerate(TOKENS)
+        if not any(start < token <= end for start, end in done))
+    with open(checkpoint) as f:
+        assert len(load(f)['done']) == 8
+
+def test_leaving_the_loop_stops_the_workers(table_scan):
+    tokens = [MIN_TOKEN + 1 + i * (2 ** 57) for i in range(128)]
+    session = RingSession(tokens)
+    threads = active_count()
+    rows = iter(table_scan(session, splits=16, workers=2, fetch_size=1))
+    next(rows)
+    rows.close()
+    assert active_count() == threads
+    assert len(session.scanned) < 16
+
+def test_worker_errors_reach_the_caller(table_scan):
+    ranges = token_ranges(4)
+    session = RingSession(TOKENS, fail=[ranges[2]])
+    with pytest.raises(CassandraStreamError) as e:
+        list(table_scan(session, splits=4, workers=2))
+    assert e.value.envelope['status_code'] == 2005
+    assert 'unavailable' in str(e.value.envelope['reason'])
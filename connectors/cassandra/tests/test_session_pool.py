@@ -0,0 +1,105 @@
+
+import pytest
+
+from benchmarks.fakes import FakeSession
+from connectors.cassandra import pool as pool_module
+from connectors.cassandra.my_cassandra import CQLConnector
+from connectors.cassandra.pool import SessionPool
+
+class FakeCluster:
+    """
+    Cluster stand-in connecting to a FakeSession, failing when asked to
+    """
+    created = []
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self.is_shutdown = False
+        FakeCluster.created.append(self)
+
+    def connect(self, keyspace=None):
+        if self.settings.get('contact_points') == ['unreachable']:
+            raise RuntimeError('unreachable')
+        session = FakeSession()
+        session.cluster = self
+        session.keyspace = keyspace
+        return session
+
+    def shutdown(self):
+        self.is_shutdown = True
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeCluster.created = []
+    monkeypatch.setattr(pool_module, 'Cluster', FakeCluster)
+    pool = SessionPool()
+    yield pool
+    pool.shutdown_all()
+
+def connector(pool, hosts=('127.0.0.2', '127.0.0.1')):
+    return CQLConnector(hosts=list(hosts), keyspace='ks', local_env=True, pool=pool)
+
+def test_key_ignores_host_order():
+    assert SessionPool.key(['b', 'a'], 9042, 'ks', 1) == SessionPool.key(['a', 'b'], 9042, 'ks', True)
+
+def test_connectors_share_one_session(pool):
+    (a, b) = (connector(pool), connector(pool, hosts=('127.0.0.1', '127.0.0.2')))
+    assert a._connect() is None and b._connect() is None
+    assert a.session is b.session
+    assert a.statements is b.statements
+    assert a.session.keyspace == 'ks'
+    stats = pool.stats()
+    assert (stats['live_sessions'], stats['created'], stats['reused']) == (1, 1, 1)
+
+def test_shut_down_session_is_rebuilt(pool):
+    a = connector(pool)
+    a._connect()
+    first = a.session
+    first.is_shutdown = True
+    a.session = None
+    a._connect()
+    assert a.session is not first
+    assert FakeCluster.created[0].is_shutdown
+    assert pool.stats()['evicted'] == 1
+
+def test_failed_connect_shuts_the_cluster_down(pool):
+    response = connector(pool, hosts=('unreachable',))._connect()
+    assert response['status_code'] == 2005
+    assert FakeCluster.created[0].is_shutdown
+    assert pool.stats()['live_sessions'] == 0
+
+def test_health_check_does_not_evict_by_default(pool):
+    a = connector(pool)
+    a._connect()
+
+    def fail(statement, timeout=None):
+        raise RuntimeError('timed out')
+    a.session.execute = fail
+    for i in range(5):
+        assert pool.health_check() == {a.pool_key: False}
+    assert pool.stats()['live_sessions'] == 1
+    assert not FakeCluster.created[0].is_shutdown
+
+def test_health_check_evicts_after_consecutive_failures(pool):
+    a = connector(pool)
+    a._connect()
+    answers = [False, False, True, False, False, False]
+
+    def probe(statement, timeout=None):
+        if not answers.pop(0):
+            raise RuntimeError('timed out')
+    a.session.execute = probe
+    for i in range(5):
+        pool.health_check(evict=True, max_failures=3)
+    assert pool.stats()['live_sessions'] == 1
+    assert pool.health_check(evict=True, max_failures=3) == {a.pool_key: False}
+    assert pool.stats()['live_sessions'] == 0
+    assert FakeCluster.created[0].is_shutdown
+
+def test_close_releases_for_every_connector(pool):
+    a = connector(pool)
+    a._connect()
+    a.close()
+    assert a.session is None
+    assert FakeCluster.created[0].is_shutdown
+    assert pool.stats()['live_sessions'] == 0
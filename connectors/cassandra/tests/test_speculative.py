@@ -0,0 +1,96 @@
+
+from threading import Timer
+
+import pytest
+from cassandra import OperationTimedOut
+
+from benchmarks.fakes import FakeResponseFuture, FakeSession
+from connectors.cassandra.metrics import QueryMetrics
+from connectors.cassandra.speculative import HedgedRequest, SpeculativePolicy
+
+class ScriptedFuture(FakeResponseFuture):
+    """
+    answers after delay seconds with rows, or error when it is an exception,
+    never answers when delay is None
+    """
+
+    def __init__(self, delay, answer):
+        FakeResponseFuture.__init__(self, ['id'], answer)
+        self.delay = delay
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        if self.delay is None:
+            return
+        if isinstance(self._rows, Exception):
+            complete = lambda: errback(self._rows, *errback_args)
+        else:
+            complete = lambda: callback(self._rows, *callback_args)
+        Timer(self.delay, complete).start()
+
+class ScriptedSession(FakeSession):
+    """
+    the n-th request sent gets the n-th (delay, answer) of script
+    """
+
+    def __init__(self, *script):
+        FakeSession.__init__(self, ['id'])
+        self.script = list(script)
+        self.sent = 0
+        self.default_timeout = 1.0
+
+    def execute_async(self, statement, timeout=None):
+        (delay, answer) = self.script[self.sent]
+        self.sent += 1
+        return ScriptedFuture(delay, answer)
+
+def test_fast_answer_is_not_hedged():
+    session = ScriptedSession((0, [(1,)]))
+    (resultset, fired, won) = HedgedRequest(session, 'SELECT', 0.2).execute()
+    assert resultset.current_rows == [(1,)]
+    assert (fired, won, session.sent) == (False, False, 1)
+
+def test_slow_answer_is_hedged_and_the_hedge_wins():
+    session = ScriptedSession((None, [(1,)]), (0, [(2,)]))
+    (resultset, fired, won) = HedgedRequest(session, 'SELECT', 0.01).execute()
+    assert resultset.current_rows == [(2,)]
+    assert (fired, won, session.sent) == (True, True, 2)
+
+def test_failed_hedge_leaves_the_first_answer():
+    session = ScriptedSession((0.05, [(1,)]), (0, RuntimeError('down')))
+    (resultset, fired, won) = HedgedRequest(session, 'SELECT', 0.01).execute()
+    assert resultset.current_rows == [(1,)]
+    assert (fired, won) == (True, False)
+
+def test_error_raised_once_every_request_failed():
+    session = ScriptedSession((0.02, RuntimeError('first')), (0, RuntimeError('second')))
+    with pytest.raises(RuntimeError):
+        HedgedRequest(session, 'SELECT', 0.01).execute()
+
+def test_no_answer_times_out():
+    session = ScriptedSession((None, [(1,)]), (None, [(2,)]))
+    with pytest.raises(OperationTimedOut):
+        HedgedRequest(session, 'SELECT', 0.01, timeout=0.05).execute()
+
+def test_delay_comes_from_metrics_within_bounds():
+    metrics = QueryMetrics()
+    policy = SpeculativePolicy(metrics=metrics, min_samples=2, percentile=50,
+                               default_delay=0.05, min_delay=0.002, max_delay=0.1)
+    assert policy.delay_for('SELECT 1') == 0.05
+    for i in range(2):
+        metrics.record('SELECT 1', 0.0015)
+    assert policy.delay_for('SELECT 1') == 0.002
+    for i in range(4):
+        metrics.record('SELECT 1', 0.5)
+    assert policy.delay_for('SELECT 1') == 0.1
+    assert SpeculativePolicy(delay=0.3, metrics=metrics).delay_for('SELECT 1') == 0.3
+
+def test_connector_hedges_only_idempotent_reads(cql_connector):
+    policy = SpeculativePolicy(delay=0.01)
+    session = ScriptedSession((None, [(1,)]), (0, [(2,)]))
+    connector = cql_connector(session, speculative=policy)
+    assert connector.read('SELECT id FROM t;', idempotent=True)['data'] == {'id': 2}
+    assert connector.speculative_stats() == {'executions': 1, 'hedges_fired': 1,
+                                             'hedges_won': 1}
+    session.rows = [(3,)]
+    assert connector.read('SELECT id FROM t;')['data'] == {'id': 3}
+    assert session.sent == 2
@@ -0,0 +1,84 @@
+
+from cassandra import InvalidRequest
+
+from benchmarks.fakes import FakeSession
+from connectors.cassandra.statements import StatementCache, fold_name, is_query
+from connectors.cassandra.statements import is_schema_change, tables, to_bind_markers
+
+class PreparingSession(FakeSession):
+
+    def __init__(self, *args):
+        FakeSession.__init__(self, *args)
+        self.prepared = []
+
+    def prepare(self, query):
+        self.prepared.append(query)
+        return FakeSession.prepare(self, query)
+
+def test_to_bind_markers():
+    assert to_bind_markers('INSERT INTO t (a, b) VALUES (%(a)s, %s);') == \
+        'INSERT INTO t (a, b) VALUES (:a, ?);'
+    assert to_bind_markers("SELECT * FROM t WHERE a LIKE '10%%';") == \
+        "SELECT * FROM t WHERE a LIKE '10%';"
+
+def test_statement_kinds():
+    assert is_schema_change('  alter TABLE t ADD c int;')
+    assert not is_schema_change('SELECT * FROM t;')
+    assert is_query('select * from t;')
+    assert not is_query('INSERT INTO t (a) VALUES (1);')
+
+def test_tables():
+    assert tables('UPDATE T SET a = 1;', 'ks') == ['ks.t']
+    assert tables('SELECT * FROM other."Users" WHERE a = 1;', 'ks') == ['other.users']
+    assert tables('TRUNCATE TABLE t;', 'ks') == ['ks.t']
+
+def test_fold_name():
+    assert fold_name('Users') == 'users'
+    assert fold_name('"Users"') == 'Users'
+    assert fold_name('"a""b"') == 'a"b'
+
+def test_statement_cache_is_a_bounded_lru():
+    session = PreparingSession()
+    cache = StatementCache(max_size=2)
+    first = cache.get(session, 'SELECT a FROM t WHERE id = %s;', 1)
+    assert cache.get(session, 'SELECT a FROM t WHERE id = %s;', 1) is first
+    assert first.consistency_level == 1
+    cache.get(session, 'SELECT b FROM t WHERE id = %s;', 1)
+    cache.get(session, 'SELECT a FROM t WHERE id = %s;', 1)
+    cache.get(session, 'SELECT c FROM t WHERE id = %s;', 1)
+    assert ('SELECT a FROM t WHERE id = %s;', 1) in cache
+    assert ('SELECT b FROM t WHERE id = %s;', 1) not in cache
+    assert cache.stats() == {'size': 2, 'max_size': 2, 'hits': 2, 'misses': 3,
+                             'evictions': 1}
+    cache.invalidate('SELECT a FROM t WHERE id = %s;', 1)
+    assert ('SELECT a FROM t WHERE id = %s;', 1) not in cache
+
+def test_templated_statements_are_prepared_once(cql_connector):
+    session = PreparingSession(['a'], [(1,)])
+    connector = cql_connector(session)
+    for i in range(3):
+        connector.read('SELECT a FROM t WHERE id = %(id)s;', {'id': i})
+    connector.read('SELECT a FROM t;')
+    assert session.prepared == ['SELECT a FROM t WHERE id = :id;']
+
+def test_schema_change_clears_prepared_statements(cql_connector):
+    session = PreparingSession()
+    connector = cql_connector(session)
+    connector.write('INSERT INTO t (a) VALUES (%(a)s);', {'a': 1})
+    connector.write('ALTER TABLE t ADD b int;')
+    connector.write('INSERT INTO t (a) VALUES (%(a)s);', {'a': 2})
+    assert len(session.prepared) == 2
+    assert connector.statement_stats()['misses'] == 2
+
+def test_rejected_statement_is_sent_once(cql_connector):
+    session = PreparingSession()
+    sent = []
+
+    def reject(statement, timeout=None):
+        sent.append(statement)
+        raise InvalidRequest('unconfigured column b')
+    session.execute = reject
+    connector = cql_connector(session)
+    response = connector.write('INSERT INTO t (b) VALUES (%(b)s);', {'b': 1})
+    assert response['status_code'] == 2004
+    assert (len(sent), len(session.prepared)) == (1, 1)
@@ -0,0 +1,105 @@
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def composite_sources(sources):
+    """
+    sources of a composite aggregation, field names are shorthand for a
+    terms source named after the field
+    ie. ['country', {'day': {'date_histogram': {...}}}]
+    """
+    return [{source: {'terms': {'field': source}}} if isinstance(source, str) else source
+            for source in sources]
+
+def composite_pages(es, index, doc_type, body, name, sources, aggs, page_size):
+    """
+    yield the buckets of a composite aggregation page by page, each page
+    requested after the key of the previous one, so neither the cluster
+    nor the client ever holds more than page_size buckets
+    no hits are fetched, only the aggregation
+    needs ElasticSearch 6.1 or later
+    """
+    composite = {'size': page_size, 'sources': sources}
+    aggregation = {'composite': composite}
+    if aggs:
+        aggregation['aggs'] = aggs
+    body = dict(body or {}, size=0, aggs={name: aggregation})
+    while True:
+        response = es.search(index=index, doc_type=doc_type, body=body)
+        result = response['aggregations'][name]
+        buckets = result['buckets']
+        if not buckets:
+            return
+        yield buckets
+        if len(buckets) < page_size:
+            return
+        # after_key is only returned from 6.3, the last key is the same
+        composite['after'] = result.get('after_key') or buckets[-1]['key']
+
+class BucketCollector:
+    """
+    accumulate composite aggregation buckets page by page into one list per
+    column: one per source, doc_count, one per single value sub aggregation
+    and one per statistic, ie. 'price.avg', of multi value ones
+    optional args:
+        arrays = numeric columns become NumPy arrays when NumPy is installed
+    """
+
+    def __init__(self, source_names, aggs=None, arrays=False):
+        self.source_names = list(source_names)
+        self.agg_names = list(aggs or ())
+        self.arrays = arrays
+        self._columns = dict((name, []) for name in self.source_names + ['doc_count'])
+        self.bucket_count = 0
+
+    def _column(self, name):
+        """
+        a column first seen after some buckets is padded with None
+        """
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = [None] * self.bucket_count
+        return column
+
+    def add(self, buckets):
+        """
+        append one page of buckets
+        """
+        for bucket in buckets:
+            key = bucket['key']
+            for name in self.source_names:
+                self._columns[name].append(key.get(name))
+            self._columns['doc_count'].append(bucket['doc_count'])
+            for name in self.agg_names:
+                result = bucket.get(name) or {}
+                if 'value' in result:
+                    self._column(name).append(result['value'])
+                    continue
+                for stat, value in result.items():
+                    if isinstance(value, (int, float)) or value is None:
+                        self._column('{}.{}'.format(name, stat)).append(value)
+            self.bucket_count += 1
+            for column in self._columns.values():
+                if len(column) < self.bucket_count:
+                    column.append(None)
+
+    def _finish(self, values):
+        """
+        convert numeric columns to arrays
+        """
+        first = next((v for v in values if v is not None), None)
+        if self.arrays and numpy is not None and \
+           isinstance(first, (int, float)) and None not in values:
+            array = numpy.asarray(values)
+            if array.dtype.kind in 'iufb':
+                return array
+        return values
+
+    def columns(self):
+        """
+        returns dict of column name: list or array of values
+        """
+        return dict((name, self._finish(values)) for name, values
+                    in self._columns.items())
@@ -0,0 +1,189 @@
+
+from atexit import register
+from collections import OrderedDict
+from logging import getLogger
+from threading import Condition, Thread
+from time import monotonic
+
+log = getLogger(__name__)
+
+def _copy(value):
+    """
+    copy nested dicts so later merges never modify the caller's values
+    """
+    if isinstance(value, dict):
+        return dict((k, _copy(v)) for k, v in value.items())
+    return value
+
+def merge(into, update):
+    """
+    merge the partial document update into into, in place
+    updates are applied in the order they were received: nested objects
+    are merged field by field and any other value, lists included, is
+    replaced by the later one, as ElasticSearch merges a partial 'doc'
+    """
+    for key, value in update.items():
+        current = into.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            merge(current, value)
+        else:
+            into[key] = _copy(value)
+    return into
+
+class UpdateBuffer:
+    """
+    coalesce partial updates of the same document and send them in bulk
+    updates of one (index, doc_type, doc_id) received within window seconds
+    are merged, see merge(), into a single bulk 'update' so bursts of
+    updates cost one request and one version bump instead of conflicting
+    with each other
+    pending updates are flushed by close(), which also runs at
+    interpreter exit
+    mandatory args:
+        connector = ESConnector sending the updates
+    optional args:
+        window = seconds an update may wait before it is sent
+        max_pending = documents pending before a flush starts early
+        retry_on_conflict = times ElasticSearch retries a conflicting update
+        doc_as_upsert = create documents missing from the index
+    """
+
+    def __init__(self,
+                 connector,
+                 window=1.0,
+                 max_pending=1000,
+                 retry_on_conflict=3,
+                 doc_as_upsert=False):
+        self.connector = connector
+        self.window = window
+        self.max_pending = max_pending
+        self.retry_on_conflict = retry_on_conflict
+        self.doc_as_upsert = doc_as_upsert
+        self._condition = Condition()
+        self._pending = OrderedDict()
+        self._flushing = False
+        self._closed = False
+        self._thread = None
+        self._updates = 0
+        self._coalesced = 0
+        self._sent = 0
+        self._failed = 0
+        self._flushes = 0
+
+    def start(self):
+        """
+        start the background flush thread, called by the first update()
+        """
+        with self._condition:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = Thread(target=self._run, name='es-update-buffer')
+            self._thread.daemon = True
+            self._thread.start()
+        register(self.close)
+
+    def update(self, index, doc_type, doc_id, fields):
+        """
+        queue a partial update, fields = dict of fields and values, ie. the
+        'doc' of update_document()
+        returns False once the buffer is closed, the update is then not sent
+        """
+        self.start()
+        key = (index, doc_type, doc_id)
+        with self._condition:
+            if self._closed:
+                return False
+            self._updates += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = _copy(fields)
+            else:
+                self._coalesced += 1
+                merge(pending, fields)
+            if len(self._pending) >= self.max_pending:
+                self._condition.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                deadline = monotonic() + self.window
+                self._condition.wait_for(
+                    lambda: (self._closed or
+                             len(self._pending) >= self.max_pending or
+                             monotonic() >= deadline),
+                    self.window)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _body(self, fields):
+        body = {'doc': fields}
+        if self.doc_as_upsert:
+            body['doc_as_upsert'] = True
+        return body
+
+    def flush(self):
+        """
+        send every pending update now
+        returns list of the per document errors of the bulk requests
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self._flushing)
+            self._flushing = True
+            (pending, self._pending) = (self._pending, OrderedDict())
+        errors = []
+        try:
+            groups = OrderedDict()
+            for (index, doc_type, doc_id), fields in pending.items():
+                groups.setdefault((index, doc_type), []).append(
+                    (doc_id, self._body(fields)))
+            for (index, doc_type), updates in groups.items():
+                response = self.connector.update_documents(
+                    index, doc_type, updates,
+                    retry_on_conflict=self.retry_on_conflict)
+                if response['status_code'] == 3010:
+                    errors.extend(response['data']['errors'])
+                    failed = response['data']['failed']
+                else:
+                    log.error('ES buffered updates of {} failed: {}'.format(
+                        index, response['reason']))
+                    errors.extend({'doc_id': doc_id,
+                                   'op_type': 'update',
+                                   'status': response['status_code'],
+                                   'error': str(response['reason'])}
+                                  for doc_id, _ in updates)
+                    failed = len(updates)
+                with self._condition:
+                    self._sent += len(updates) - failed
+                    self._failed += failed
+        finally:
+            with self._condition:
+                self._flushing = False
+                if pending:
+                    self._flushes += 1
+                self._condition.notify_all()
+        return errors
+
+    def close(self, timeout=None):
+        """
+        stop the background thread and flush pending updates
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._condition:
+            return {'pending': len(self._pending),
+                    'updates': self._updates,
+                    'coalesced': self._coalesced,
+                    'sent': self._sent,
+                    'failed': self._failed,
+                    'flushes': self._flushes}
@@ -0,0 +1,94 @@
+
+from logging import getLogger
+from threading import Condition, Event, Lock
+
+log = getLogger(__name__)
+
+class _Pending:
+    __slots__ = ('search', 'done', 'response')
+
+    def __init__(self, search):
+        self.search = search
+        self.done = Event()
+        self.response = None
+
+class SearchCoalescer:
+    """
+    gather searches issued concurrently by many threads into one _msearch
+    request, each caller receives its own envelope
+    the first search of a batch waits up to window seconds for others to
+    join, then sends the batch on behalf of all of them, no thread of its
+    own is needed
+    mandatory args:
+        connector = ESConnector
+    optional args:
+        window = seconds a batch stays open, adds at most this much latency
+        max_batch = searches sending a batch before the window closes
+    ie. coalescer = SearchCoalescer(connector)
+        response = coalescer.search(index, doc_type, dsl, fields)
+    """
+
+    def __init__(self, connector, window=0.002, max_batch=100):
+        self.connector = connector
+        self.window = window
+        self.max_batch = max_batch
+        self._condition = Condition()
+        self._batch = []
+        self._stats_lock = Lock()
+        self._searches = 0
+        self._requests = 0
+
+    def search(self, index, doc_type, dsl=None, fields=None):
+        """
+        index, doc_type, dsl and fields as for ESConnector.search_documents(),
+        which returns the same envelope
+        """
+        pending = _Pending((index, doc_type, dsl, fields))
+        with self._condition:
+            self._batch.append(pending)
+            leader = len(self._batch) == 1
+            if len(self._batch) >= self.max_batch:
+                self._condition.notify_all()
+        if not leader:
+            pending.done.wait()
+            return pending.response
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._batch) >= self.max_batch,
+                                     self.window)
+            (batch, self._batch) = (self._batch, [])
+        self._send(batch)
+        return pending.response
+
+    def _send(self, batch):
+        """
+        run one batch and hand every caller its envelope
+        """
+        try:
+            response = self.connector.msearch([p.search for p in batch])
+            if response['status_code'] == 3011:
+                for p, result in zip(batch, response['data']):
+                    p.response = result
+            else:
+                for p in batch:
+                    p.response = response
+        except Exception as e:
+            log.error('ES coalesced msearch failed: {}'.format(e))
+            envelope = self.connector._exception_envelope(e, None, None, None)
+            for p in batch:
+                p.response = envelope
+        finally:
+            with self._stats_lock:
+                self._searches += len(batch)
+                self._requests += 1
+            for p in batch:
+                p.done.set()
+
+    def stats(self):
+        """
+        searches received, _msearch requests sent and their mean size
+        """
+        with self._stats_lock:
+            return {'searches': self._searches,
+                    'requests': self._requests,
+                    'mean_batch': (float(self._searches) / self._requests
+                                   if self._requests else 0.0)}
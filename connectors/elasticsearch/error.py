@@ -53,4 +53,11 @@ class ElasticSearchWriteError:
                            'backtrace: {}'.format(bt),
                            'e: {}'.format(s)}}
 
-
+class ElasticSearchStreamError(Exception):
+    """
+    raised by generators which cannot return an error envelope
+    envelope = the dict search_documents() would have returned for the same failure
+    """
+    def __init__(self, envelope):
+        Exception.__init__(self, envelope['reason'])
+        self.envelope = envelope
@@ -0,0 +1,62 @@
+
+from collections.abc import Sequence
+
+# the parts of a search response read by slim_response()
+SLIM_FILTER_PATH = ('hits.total', 'hits.hits._id', 'hits.hits._source')
+
+def filter_paths(filter_path, slim):
+    """
+    filter_path parameter of a search, the paths slim_response() reads are
+    added in slim mode
+    """
+    if isinstance(filter_path, str):
+        filter_path = filter_path.split(',')
+    paths = list(filter_path or ())
+    if slim:
+        paths.extend(path for path in SLIM_FILTER_PATH if path not in paths)
+    return ','.join(paths) or None
+
+def slim_hit(hit):
+    """
+    the fields returned of a hit, as _source holds them, and its _id
+    """
+    document = dict(hit.get('_source') or {})
+    document['_id'] = hit['_id']
+    return document
+
+class LazyHits(Sequence):
+    """
+    hits of a search response turned into slim_hit() dicts one by one
+    when first read, so a caller reading a few hits of a large page does
+    not copy the others
+    the response is already decoded by the client, only the copies are
+    deferred, decoding is saved by filter_path and fields instead
+    """
+
+    def __init__(self, hits):
+        self._hits = hits
+        self._documents = [None] * len(hits)
+
+    def __len__(self):
+        return len(self._hits)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        document = self._documents[i]
+        if document is None:
+            document = self._documents[i] = slim_hit(self._hits[i])
+        return document
+
+    def __repr__(self):
+        return 'LazyHits({} hits)'.format(len(self))
+
+def slim_response(response, lazy=False):
+    """
+    a search response reduced to the total and the slim_hit() of its hits
+    with lazy, hits are a LazyHits sequence rather than a list
+    """
+    found = response.get('hits', {})
+    hits = found.get('hits', [])
+    return {'total': found.get('total', 0),
+            'hits': LazyHits(hits) if lazy else [slim_hit(hit) for hit in hits]}
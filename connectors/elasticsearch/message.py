@@ -12,6 +12,19 @@ class ElasticSearchWrite:
                 'status_code': 3007,
                 'reason': 'object updated successfully'}
 
+    @classmethod
+    def objects_indexed(cls, obj):
+        return {'data': obj,
+                'status_code': 3010,
+                'reason': '{} objects indexed, {} failed'.format(obj['indexed'],
+                                                                obj['failed'])}
+
+    @classmethod
+    def update_queued(cls, doc_id):
+        return {'data': {'_id': doc_id},
+                'status_code': 3012,
+                'reason': 'object update queued'}
+
 class ElasticSearchRead:
     @classmethod
     def object_found(cls, obj):
@@ -24,3 +37,14 @@ class ElasticSearchRead:
         return {'data': obj,
                 'status_code': 3009,
                 'reason': 'objects found'}
+
+    @classmethod
+    def many_results_found(cls, results):
+        """
+        Wrapper for multi searches, one envelope per submitted search
+        """
+        failed = len([r for r in results if r['status_code'] <= 3005])
+        reason = '{} of {} searches failed'.format(failed, len(results))
+        return {'data': results,
+                'status_code': 3011,
+                'reason': reason}
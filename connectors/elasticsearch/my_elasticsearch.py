@@ -1,53 +1,128 @@
 
-from json import dumps
+from contextlib import contextmanager
+from itertools import islice
 from logging import getLogger
 from sys import exc_info
+from threading import Lock
 from traceback import extract_tb
 
-from elasticsearch.client import Elasticsearch, IndicesClient
 from elasticsearch.exceptions import ConnectionError, NotFoundError
 from elasticsearch.exceptions import RequestError
+from elasticsearch.helpers import parallel_bulk
 
+from connectors.cache import freeze
+from connectors.elasticsearch.aggregation import BucketCollector
+from connectors.elasticsearch.aggregation import composite_pages, composite_sources
+from connectors.elasticsearch.buffer import UpdateBuffer
 from connectors.elasticsearch.error import ElasticSearchError
 from connectors.elasticsearch.error import ElasticSearchReadError
+from connectors.elasticsearch.error import ElasticSearchStreamError
 from connectors.elasticsearch.error import ElasticSearchWriteError
+from connectors.elasticsearch.hits import filter_paths, slim_response
 from connectors.elasticsearch.message import ElasticSearchRead
 from connectors.elasticsearch.message import ElasticSearchWrite
+from connectors.elasticsearch.pool import client_pool
+from connectors.elasticsearch.scroll import scroll_pages, search_after_pages
+from connectors.elasticsearch.scroll import search_params, sliced_pages
+from connectors.elasticsearch.serializer import FastJSONSerializer, as_text
 
 log = getLogger(__name__)
 
+# ElasticSearch 2.x defaults, put back by bulk_load() for settings an index
+# left unset
+BULK_LOAD_DEFAULTS = {'index.refresh_interval': '1s',
+                      'index.number_of_replicas': '1',
+                      'index.translog.durability': 'request',
+                      'index.translog.flush_threshold_size': '512mb'}
+
+def _check_lazy(slim, lazy):
+    """
+    lazy only applies to the hits of a slim response
+    """
+    if lazy and not slim:
+        raise ValueError('lazy=True needs slim=True')
+
 class ESConnector:
     """
     as many MS will communicate with ElasticSearch, centralize access
     with this library
+    optional args:
+        pool = ClientPool sharing clients, defaults to the process wide one
+        maxsize = HTTP connections kept alive per node, size it to the
+                  number of threads sharing the client
+        sniff_interval = seconds between background sniffs of the cluster
+                         nodes in production, None disables them
+        result_cache = ResultCache serving repeated find_document() and
+                       search_documents() calls, invalidated per index by
+                       writes through this connector
+        serializer = serializer encoding requests and decoding responses,
+                     FastJSONSerializer() if None
+    documents, DSL and settings may be passed as dicts or as JSON already
+    encoded to str or bytes, which is sent without encoding it again
     """
 
     def __init__(self,
                  host=None,
                  port=9200,
                  timeout=10,
-                 local_env=False):
+                 local_env=False,
+                 pool=None,
+                 maxsize=10,
+                 sniff_interval=60.0,
+                 result_cache=None,
+                 serializer=None):
         self.host = host
         self.port = port
         self.timeout = timeout
         self.local_env = local_env
+        self.pool = pool or client_pool
+        self.maxsize = maxsize
+        self.sniff_interval = sniff_interval
+        self.result_cache = result_cache
+        self.serializer = serializer or FastJSONSerializer()
+        self.pool_key = self.pool.key(host, port, local_env, timeout, maxsize,
+                                      self.serializer)
         self.es = None
+        self._indices = None
+        self._indices_lock = Lock()
+        self.update_buffer = None
+
+    def _local_settings(self):
+        """
+        assumes single node ElasticSearch cluster
+        """
+        return {'hosts': [{'host': self.host, 'port': self.port}],
+                'timeout': self.timeout,
+                'maxsize': self.maxsize,
+                'serializer': self.serializer}
+
+    def _production_settings(self):
+        """
+        assumes multiple node ElasticSearch cluster, nodes are sniffed once
+        at start and then by the pool's background thread
+        """
+        return {'hosts': [{'host': self.host, 'port': self.port}],
+                'timeout': self.timeout,
+                'maxsize': self.maxsize,
+                'serializer': self.serializer,
+                'sniff_on_start': True,
+                'sniff_on_connection_fail': True}
 
     def _connect(self):
         """
         connect to a member of the ElasticSearch cluster
+        the client is taken from the shared pool, so only the first
+        connector per cluster pays for the sniff and its connections are
+        kept alive for every later request
         """
         try:
             if self.local_env:
-                self.es = Elasticsearch([{'host': self.host,
-                                          'port': self.port}])
+                client = self.pool.acquire(self.pool_key, self._local_settings())
             else:
-                self.es = Elasticsearch([{'host': self.host,
-                                          'port': self.port}],
-                                        sniff_on_start=True,
-                                        sniff_on_connection_fail=True,
-                                        sniffer_timeout=self.timeout)
-            self.idx = IndicesClient(self.es)
+                client = self.pool.acquire(self.pool_key,
+                                           self._production_settings(),
+                                           self.sniff_interval)
+            self.es = client
             return
         except ConnectionError as e:
             return ElasticSearchError.no_host_available(self.host, self.port)
@@ -56,9 +131,137 @@ class ESConnector:
             backtrace = extract_tb(traceback_prev)
             return ElasticSearchError.unknown_exception(backtrace, str(e))
 
+    def close(self):
+        """
+        close the shared client of this cluster for every connector
+        only needed when a cluster is no longer used by the process
+        buffered updates are sent first
+        """
+        if self.update_buffer is not None:
+            self.update_buffer.close()
+            self.update_buffer = None
+        self.es = None
+        self.pool.release(self.pool_key)
+        return
+
+    def buffer_updates(self,
+                       window=1.0,
+                       max_pending=1000,
+                       retry_on_conflict=3,
+                       doc_as_upsert=False):
+        """
+        coalesce partial updates sent by update_document(), see UpdateBuffer
+        for the args, updates are merged in the order received and sent in
+        bulk every window seconds, by flush_updates() and by close()
+        returns the UpdateBuffer
+        """
+        if self.update_buffer is not None:
+            self.update_buffer.close()
+        self.update_buffer = UpdateBuffer(self,
+                                          window=window,
+                                          max_pending=max_pending,
+                                          retry_on_conflict=retry_on_conflict,
+                                          doc_as_upsert=doc_as_upsert)
+        return self.update_buffer
+
+    def flush_updates(self):
+        """
+        send buffered updates now
+        returns list of the per document errors
+        """
+        if self.update_buffer is None:
+            return []
+        return self.update_buffer.flush()
+
+    def pool_stats(self):
+        """
+        client registry, node and HTTP connection counters of the pool
+        """
+        return self.pool.stats()
+
+    def _tags(self, index):
+        """
+        cache tags of a search, one per index searched, searches over
+        every index or a wildcard are also tagged '*' which every write
+        invalidates, searches through an alias are only invalidated by
+        writes addressing the alias
+        """
+        if not index:
+            return ('*',)
+        if isinstance(index, str):
+            index = index.split(',')
+        tags = tuple(index)
+        if any('*' in name or name == '_all' for name in tags):
+            tags += ('*',)
+        return tags
+
+    def _written(self, index):
+        """
+        stale the cached searches of an index written to
+        """
+        if self.result_cache is None:
+            return
+        for tag in self._tags(index) + ('*',):
+            self.result_cache.invalidate(tag)
+
+    def _cached(self, method, index, doc_type, dsl, fields, filter_path, slim, lazy):
+        """
+        serve method from the result cache, successful responses are kept
+        until they expire or a write touches their index
+        """
+        key = (method.__name__, freeze(index), freeze(doc_type), freeze(dsl),
+               freeze(fields), freeze(filter_path), slim, lazy)
+        response = self.result_cache.get(key)
+        if response is None:
+            response = method(index, doc_type, dsl, fields, filter_path, slim, lazy)
+            if response['status_code'] in (3008, 3009):
+                self.result_cache.put(key, response, self._tags(index))
+        return response
+
+    def cache_stats(self):
+        """
+        hit rate and size of the result cache, None without one
+        """
+        if self.result_cache is None:
+            return None
+        return self.result_cache.stats()
+
+    def _known_indices(self):
+        """
+        names of the indices and aliases of the cluster, listed once and
+        then maintained by _create_index() and drop_index(), so writes do
+        not pay for a cluster wide request
+        """
+        with self._indices_lock:
+            if self._indices is None:
+                indices = set()
+                for name, info in self.es.indices.get_alias().items():
+                    indices.add(name)
+                    indices.update(info.get('aliases', {}))
+                self._indices = indices
+            return self._indices
+
+    def _forget_index(self, index):
+        """
+        an index reported missing by the cluster, ie. dropped by another
+        service, is created again on next write
+        """
+        with self._indices_lock:
+            if self._indices is not None:
+                self._indices.discard(index)
+
+    def _ensure_index(self, index, doc_type, settings=None, mappings=None):
+        """
+        create index unless already known
+        """
+        if index in self._known_indices():
+            return
+        return self._create_index(index, doc_type, settings, mappings)
+
     def _create_index(self, index, doc_type, settings=None, mappings=None):
         """
-        create a new empty index
+        create a new empty index, an index created meanwhile by another
+        connector counts as created
         mandatory args:
             index = index name 
             doc_type = document type, ie. any valid string
@@ -69,48 +272,135 @@ class ESConnector:
             settings = {'index': {'number_of_shards': '1',
                                   'number_of_replicas': '0'}}
         if not mappings:
-            mappings = {'property': {'id': {'type': 'string',
-                                           'index': 'not_analyzed'}}} 
+            mappings = {'properties': {'id': {'type': 'string',
+                                             'index': 'not_analyzed'}}}
         try:
-            response = self.es.create(index=index,
-                                      doc_type=doc_type,
-                                      body=dumps(settings))
-            self.idx.put_mapping(index=index,
-                                 doc_type=doc_type,
-                                 body=dumps(mappings))
-            if not 'created' in response or not response['created']:
-                return ElasticSearchError.unable_to_create_index(index)                                                                                                            
+            response = self.es.indices.create(index=index,
+                                              body={'settings': settings,
+                                                    'mappings': {doc_type: mappings}})
+            if not response.get('acknowledged'):
+                return ElasticSearchError.unable_to_create_index(index)
             log.info('Index: {} created'.format(index))
-            log.info('ES create(): response: {}'.format(response))
-            return
+            log.info('ES indices.create(): response: {}'.format(response))
+        except RequestError as e:
+            if 'already_exists' not in str(e):
+                return ElasticSearchError.invalid_request(str(e))
         except ConnectionError as e:
             return ElasticSearchError.no_host_available(self.host, self.port)
-        except NotFoundError as e:
-            return ElasticSearchError.missing_index(self.index)
-        except RequestError as e:
-            return ElasticSearchError.invalid_request(str(e))
         except Exception as e:
             (type_e, value, traceback_prev) = exc_info()
             backtrace = extract_tb(traceback_prev)
             return ElasticSearchError.unknown_exception(backtrace, str(e))
+        with self._indices_lock:
+            if self._indices is not None:
+                self._indices.add(index)
+        return
 
     def drop_index(self, index):
         try:
-            if index in self.es.indices.stats()['indices'].keys():
-                self.es.indices.delete(index=index, ignore=[400, 404])
+            err_msg = self._connect()
+            if err_msg:
+                return err_msg
+            self.es.indices.delete(index=index, ignore=[400, 404])
+            self._forget_index(index)
+            self._written(index)
             log.info('Index: {} deleted'.format(index))
             return
         except ConnectionError as e:
             return ElasticSearchError.no_host_available(self.host, self.port)
         except NotFoundError as e:
-            return ElasticSearcheError.missing_index(self.index)
+            self._forget_index(index)
+            return ElasticSearchError.missing_index(index)
         except RequestError as e:
-            return ElasticSearcheError.invalid_request(str(e))
+            return ElasticSearchError.invalid_request(str(e))
         except Exception as e:
             (type_e, value, traceback_prev) = exc_info()
             backtrace = extract_tb(traceback_prev)
             return ElasticSearchError.unknown_exception(backtrace, str(e))
 
+    @contextmanager
+    def bulk_load(self,
+                  index,
+                  doc_type=None,
+                  settings=None,
+                  mappings=None,
+                  replicas=0,
+                  translog_flush_threshold='1gb',
+                  force_merge=False,
+                  max_num_segments=1,
+                  merge_timeout=3600):
+        """
+        tune an index for the writes of a with block, ie. backfills
+        refresh is turned off, replicas are dropped and the translog is
+        synced asynchronously and flushed less often; on exit the settings
+        the index had are put back, replicas are then copied from the
+        primaries rather than indexing every document again, and the index
+        is refreshed
+        mandatory args:
+            index = index name
+        optional args:
+            doc_type = create the index first, see add_document() for
+                       settings and mappings
+            replicas = replicas kept during the load
+            translog_flush_threshold = translog size triggering a flush
+            force_merge = merge the index down to max_num_segments segments
+                          on exit, worth it for indices no longer written
+            merge_timeout = seconds allowed for the merge
+        raises ElasticSearchStreamError carrying the error envelope when the
+        index cannot be tuned, or restored after the block succeeded
+        ie.
+            with es.bulk_load('events', 'event'):
+                es.add_documents('events', 'event', documents)
+        """
+        err_msg = self._connect()
+        if err_msg:
+            raise ElasticSearchStreamError(err_msg)
+        if doc_type is not None:
+            err_msg = self._ensure_index(index, doc_type, settings, mappings)
+            if err_msg:
+                raise ElasticSearchStreamError(err_msg)
+        tuned = {'index.refresh_interval': '-1',
+                 'index.number_of_replicas': replicas,
+                 'index.translog.durability': 'async',
+                 'index.translog.flush_threshold_size': translog_flush_threshold}
+        try:
+            response = self.es.indices.get_settings(index=index, flat_settings=True)
+            originals = dict((name, dict((key, current['settings'].get(key, BULK_LOAD_DEFAULTS[key]))
+                                         for key in tuned))
+                             for name, current in response.items())
+            self.es.indices.put_settings(index=index, body=tuned)
+        except Exception as e:
+            raise ElasticSearchStreamError(self._exception_envelope(e, index, tuned, None))
+        log.info('Index: {} tuned for bulk load'.format(index))
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            try:
+                self._restore(index, originals, force_merge, max_num_segments, merge_timeout)
+            except Exception as e:
+                envelope = self._exception_envelope(e, index, originals, None)
+                log.error('Index: {} settings not restored: {}'.format(index, envelope['reason']))
+                if not failed:
+                    raise ElasticSearchStreamError(envelope)
+
+    def _restore(self, index, originals, force_merge, max_num_segments, merge_timeout):
+        """
+        put back the settings bulk_load() changed, per concrete index
+        """
+        for name, settings in originals.items():
+            self.es.indices.put_settings(index=name, body=settings)
+        self.es.indices.refresh(index=index)
+        self._written(index)
+        if force_merge:
+            # forcemerge is named optimize before ElasticSearch 2.1
+            merge = getattr(self.es.indices, 'forcemerge', None) or self.es.indices.optimize
+            merge(index=index,
+                  max_num_segments=max_num_segments,
+                  request_timeout=merge_timeout)
+        log.info('Index: {} settings restored after bulk load'.format(index))
+
     def add_document(self, index=None, doc_type=None, doc_id=0, settings={}, mappings={}, values={}):
         """
         add a new document to an existing index
@@ -125,14 +415,25 @@ class ESConnector:
             err_msg = self._connect()
             if err_msg:
                 return err_msg
-            if index not in self.es.indices.stats()['indices'].keys():
+            err_msg = self._ensure_index(index, doc_type, settings, mappings)
+            if err_msg:
+                return err_msg
+            try:
+                response = self.es.create(index=index,
+                                          doc_type=doc_type,
+                                          id=doc_id,
+                                          body=values)
+            except NotFoundError:
+                log.info('Index: {} missing, creating it'.format(index))
+                self._forget_index(index)
                 err_msg = self._create_index(index, doc_type, settings, mappings)
                 if err_msg:
                     return err_msg
-            response = self.es.create(index=index,
-                                      doc_type=doc_type,
-                                      id=doc_id,
-                                      body=dumps(values))
+                response = self.es.create(index=index,
+                                          doc_type=doc_type,
+                                          id=doc_id,
+                                          body=values)
+            self._written(index)
             log.info('ES create(): response: {}'.format(response))
             return ElasticSearchWrite.object_created(response)
         except ConnectionError as e:
@@ -140,12 +441,154 @@ class ESConnector:
         except RequestError as e:
             return ElasticSearchError.invalid_request(str(e))
         except NotFoundError as e:
+            self._forget_index(index)
             return ElasticSearchError.missing_index(index)
         except Exception as e:
             (type_e, value, traceback_prev) = exc_info()
             backtrace = extract_tb(traceback_prev)
             return ElasticSearchWriteError.unknown_exception(doc_id, values, backtrace, str(e))
 
+    def _bulk(self, actions, chunk_size, max_chunk_bytes, thread_count):
+        """
+        send actions through the _bulk endpoint, chunks run in parallel
+        parallel_bulk queues every chunk of its input up front, so the input
+        is fed a window of chunks at a time to keep memory flat whatever
+        the number of documents
+        returns dict of indexed and failed counts and the per document errors
+        """
+        (indexed, errors) = (0, [])
+        window = chunk_size * thread_count * 2
+        while True:
+            batch = list(islice(actions, window))
+            if not batch:
+                break
+            for ok, result in parallel_bulk(self.es,
+                                            batch,
+                                            thread_count=thread_count,
+                                            chunk_size=chunk_size,
+                                            max_chunk_bytes=max_chunk_bytes,
+                                            raise_on_error=False,
+                                            raise_on_exception=False):
+                if ok:
+                    indexed += 1
+                    continue
+                (op_type, item) = result.popitem()
+                errors.append({'doc_id': item.get('_id'),
+                               'op_type': op_type,
+                               'status': item.get('status'),
+                               'error': str(item.get('error'))})
+        return {'indexed': indexed, 'failed': len(errors), 'errors': errors}
+
+    def add_documents(self,
+                      index=None,
+                      doc_type=None,
+                      documents=None,
+                      settings={},
+                      mappings={},
+                      op_type='create',
+                      chunk_size=500,
+                      max_chunk_bytes=10 * 1024 * 1024,
+                      thread_count=4):
+        """
+        add many documents to an index in bulk
+        ie. backfills
+        mandatory args:
+            index = index name
+            doc_type = document type, ie. any valid string
+            documents = iterable of (doc_id, values), consumed lazily so a
+                        generator streams any number of documents
+        optional args:
+            settings, mappings = used to create a missing index
+            op_type = 'create' fails on existing ids as add_document() does,
+                      'index' replaces them
+            chunk_size = documents per bulk request
+            max_chunk_bytes = serialized bytes per bulk request
+            thread_count = bulk requests in flight
+        returns envelope whose data holds indexed and failed counts and the
+        doc_id, status and error of every failed document
+        """
+        try:
+            err_msg = self._connect()
+            if err_msg:
+                return err_msg
+            err_msg = self._ensure_index(index, doc_type, settings, mappings)
+            if err_msg:
+                return err_msg
+            actions = ({'_op_type': op_type,
+                        '_index': index,
+                        '_type': doc_type,
+                        '_id': doc_id,
+                        '_source': as_text(values)} for doc_id, values in documents or ())
+            try:
+                response = self._bulk(actions, chunk_size, max_chunk_bytes, thread_count)
+            finally:
+                self._written(index)
+            log.info('ES bulk {}: {} indexed, {} failed'.format(
+                op_type, response['indexed'], response['failed']))
+            return ElasticSearchWrite.objects_indexed(response)
+        except ConnectionError as e:
+            return ElasticSearchError.no_host_available(self.host, self.port)
+        except RequestError as e:
+            return ElasticSearchError.invalid_request(str(e))
+        except NotFoundError as e:
+            self._forget_index(index)
+            return ElasticSearchError.missing_index(index)
+        except Exception as e:
+            (type_e, value, traceback_prev) = exc_info()
+            backtrace = extract_tb(traceback_prev)
+            return ElasticSearchWriteError.unknown_exception(None, index, backtrace, str(e))
+
+    def update_documents(self,
+                         index=None,
+                         doc_type=None,
+                         updates=None,
+                         chunk_size=500,
+                         max_chunk_bytes=10 * 1024 * 1024,
+                         thread_count=4,
+                         retry_on_conflict=None):
+        """
+        update many existing documents in bulk
+        mandatory args:
+            index = index name
+            doc_type = document type, ie. any valid string
+            updates = iterable of (doc_id, values), values as passed to
+                      update_document(), ie. {'doc': {'deleted': True}}
+        optional args:
+            retry_on_conflict = times ElasticSearch retries an update whose
+                                document changed concurrently
+        see add_documents() for other optional args and the returned envelope
+        """
+        try:
+            err_msg = self._connect()
+            if err_msg:
+                return err_msg
+            actions = ({'_op_type': 'update',
+                        '_index': index,
+                        '_type': doc_type,
+                        '_id': doc_id,
+                        '_source': as_text(values)} for doc_id, values in updates or ())
+            if retry_on_conflict:
+                actions = (dict(action, _retry_on_conflict=retry_on_conflict)
+                           for action in actions)
+            try:
+                response = self._bulk(actions, chunk_size, max_chunk_bytes, thread_count)
+            finally:
+                self._written(index)
+            log.info('ES bulk update: {} updated, {} failed'.format(
+                response['indexed'], response['failed']))
+            return ElasticSearchWrite.objects_indexed(response)
+        except ConnectionError as e:
+            return ElasticSearchError.no_host_available(self.host, self.port)
+        except RequestError as e:
+            return ElasticSearchError.invalid_request(str(e))
+        except NotFoundError as e:
+            self._forget_index(index)
+            return ElasticSearchError.missing_index(index)
+        except Exception as e:
+            (type_e, value, traceback_prev) = exc_info()
+            backtrace = extract_tb(traceback_prev)
+            return ElasticSearchWriteError.unknown_exception(None, index, backtrace, str(e))
+
     def update_document(self, index, doc_type, doc_id, values):
         """
         update an existing document in an existing index
@@ -154,7 +597,13 @@ class ESConnector:
             doc_type = document type, ie. any valid string
             doc_id = document_id
             values = dictionary of fields and values
+        with buffer_updates() on, partial updates, ie. {'doc': {...}}, are
+        queued and merged with others of the same document rather than sent
         """
+        if self.update_buffer is not None and isinstance(values, dict) and \
+                list(values.keys()) == ['doc'] and isinstance(values['doc'], dict):
+            if self.update_buffer.update(index, doc_type, doc_id, values['doc']):
+                return ElasticSearchWrite.update_queued(doc_id)
         try:
             err_msg = self._connect()
             if err_msg:
@@ -163,7 +612,8 @@ class ESConnector:
             response = self.es.update(index=index,
                                       doc_type=doc_type,
                                       id=doc_id,
-                                      body=dumps(values))
+                                      body=values)
+            self._written(index)
             log.info('ES update(): response: {}'.format(response))
             return ElasticSearchWrite.object_updated(response)
         except ConnectionError as e:
@@ -171,13 +621,21 @@ class ESConnector:
         except RequestError as e:
             return ElasticSearchError.invalid_request(str(e))
         except NotFoundError as e:
+            self._forget_index(index)
             return ElasticSearchError.missing_index(index)
         except Exception as e:
             (type_e, value, traceback_prev) = exc_info()
             backtrace = extract_tb(traceback_prev)
             return ElasticSearchWriteError.unknown_exception(doc_id, values, backtrace, str(e))
 
-    def find_document(self, index, doc_type, dsl=None, fields=None):
+    def find_document(self,
+                      index,
+                      doc_type,
+                      dsl=None,
+                      fields=None,
+                      filter_path=None,
+                      slim=False,
+                      lazy=False):
         """
         find an existing document in an existing index
         mandatory args:
@@ -185,28 +643,66 @@ class ESConnector:
             doc_type = document type, ie. any valid string
             dsl = query parameters in DSL format
             fields = list of fields to return
+        optional args:
+            filter_path = list of response paths the cluster returns, the
+                          rest is never sent, ie. ['hits.hits._source']
+            slim = data is only {'total': n, 'hits': [...]}, each hit the
+                   fields returned and its _id, ie. {'_id': '1', 'name': 'x'}
+            lazy = with slim, each hit is copied into its slim dict when
+                   first read rather than all at once, see LazyHits,
+                   ValueError without slim
+        with a result_cache, responses are served from the cache until they
+        expire or a write through this connector touches the index
+        """
+        _check_lazy(slim, lazy)
+        if self.result_cache is None:
+            return self._find_document(index, doc_type, dsl, fields, filter_path, slim, lazy)
+        return self._cached(self._find_document, index, doc_type, dsl, fields,
+                            filter_path, slim, lazy)
+
+    def _search(self, index, doc_type, dsl, fields, filter_path, slim, lazy):
+        """
+        search with the response reduced as asked by filter_path and slim
+        """
+        response = self.es.search(index=index,
+                                  doc_type=doc_type,
+                                  body=dsl,
+                                  **search_params(fields, filter_paths(filter_path, slim)))
+        if slim:
+            return slim_response(response, lazy)
+        return response
+
+    def _find_document(self, index, doc_type, dsl, fields,
+                       filter_path=None, slim=False, lazy=False):
+        """
+        find_document() without the result cache
         """
         try:
             err_msg = self._connect()
             if err_msg:
                 return err_msg
-            response = self.es.search(index=index,
-                                      doc_type=doc_type,
-                                      body=dumps(dsl),
-                                      _source=fields)
+            response = self._search(index, doc_type, dsl, fields, filter_path, slim, lazy)
             return ElasticSearchRead.object_found(response)
         except ConnectionError as e:
             return ElasticSearchError.no_host_available(self.host, self.port)
         except RequestError as e:
             return ElasticSearchError.invalid_request(str(e))
         except NotFoundError as e:
+            self._forget_index(index)
             return ElasticSearchError.missing_index(index)
         except Exception as e:
             (type_e, value, traceback_prev) = exc_info()
             backtrace = extract_tb(traceback_prev)
             return ElasticSearchReadError.unknown_exception(dsl, fields, backtrace, str(e))
 
-    def search_documents(self, index, doc_type, dsl, fields=None):
+    def search_documents(self,
+                         index,
+                         doc_type,
+                         dsl,
+                         fields=None,
+                         filter_path=None,
+                         slim=False,
+                         lazy=False):
         """
         find an existing document in an existing index
         mandatory args:
@@ -214,23 +710,248 @@ class ESConnector:
             doc_type = document type, ie. any valid string
             dsl = query parameters in DSL format
             fields = list of fields to return
+        see find_document() for optional args and the result_cache
+        """
+        _check_lazy(slim, lazy)
+        if self.result_cache is None:
+            return self._search_documents(index, doc_type, dsl, fields, filter_path, slim, lazy)
+        return self._cached(self._search_documents, index, doc_type, dsl, fields,
+                            filter_path, slim, lazy)
+
+    def _search_documents(self, index, doc_type, dsl, fields,
+                          filter_path=None, slim=False, lazy=False):
+        """
+        search_documents() without the result cache
         """
         try:
             err_msg = self._connect()
             if err_msg:
                 return err_msg
-            response = self.es.search(index=index,
-                                      doc_type=doc_type,
-                                      body=dumps(dsl),
-                                      _source=fields)
+            response = self._search(index, doc_type, dsl, fields, filter_path, slim, lazy)
             return ElasticSearchRead.objects_found(response)
         except ConnectionError as e:
             return ElasticSearchError.no_host_available(self.host, self.port)
         except RequestError as e:
             return ElasticSearchError.invalid_request(str(e))
         except NotFoundError as e:
+            self._forget_index(index)
             return ElasticSearchError.missing_index(index)
         except Exception as e:
             (type_e, value, traceback_prev) = exc_info()
             backtrace = extract_tb(traceback_prev)
             return ElasticSearchReadError.unknown_exception(dsl, fields, backtrace, str(e))
+
+    def _msearch_envelope(self, index, response):
+        """
+        envelope of one response of a multi search
+        """
+        error = response.get('error')
+        if error is None:
+            return ElasticSearchRead.objects_found(response)
+        if 'index_not_found' in str(error):
+            self._forget_index(index)
+            return ElasticSearchError.missing_index(index)
+        return ElasticSearchError.invalid_request(str(error))
+
+    def msearch(self, searches=None):
+        """
+        run many independent searches in one _msearch request
+        ie. the lookups of one API call
+        mandatory args:
+            searches = list of (index, doc_type, dsl, fields) as passed to
+                       search_documents(), fields may be None
+        returns envelope whose data holds the envelope search_documents()
+        would return for each search, in order, a failed search never
+        fails the others
+        """
+        try:
+            err_msg = self._connect()
+            if err_msg:
+                return err_msg
+            searches = searches or []
+            if not searches:
+                return ElasticSearchRead.many_results_found([])
+            body = []
+            for index, doc_type, dsl, fields in searches:
+                header = {'index': index}
+                if doc_type:
+                    header['type'] = doc_type
+                if isinstance(dsl, (str, bytes)):
+                    if fields is None:
+                        body.append(header)
+                        body.append(as_text(dsl))
+                        continue
+                    dsl = self.serializer.loads(dsl)
+                dsl = dict(dsl or {})
+                if fields is not None:
+                    dsl['_source'] = fields
+                body.append(header)
+                body.append(dsl)
+            response = self.es.msearch(body=body)
+            results = [self._msearch_envelope(search[0], r)
+                       for search, r in zip(searches, response['responses'])]
+            return ElasticSearchRead.many_results_found(results)
+        except ConnectionError as e:
+            return ElasticSearchError.no_host_available(self.host, self.port)
+        except RequestError as e:
+            return ElasticSearchError.invalid_request(str(e))
+        except Exception as e:
+            (type_e, value, traceback_prev) = exc_info()
+            backtrace = extract_tb(traceback_prev)
+            return ElasticSearchReadError.unknown_exception(searches, None, backtrace, str(e))
+
+    def _exception_envelope(self, e, index, dsl, fields):
+        """
+        map an exception caught outside its except clause, ie. raised by
+        a generator, to the envelope search_documents() would return
+        """
+        if isinstance(e, ElasticSearchStreamError):
+            return e.envelope
+        if isinstance(e, ConnectionError):
+            return ElasticSearchError.no_host_available(self.host, self.port)
+        if isinstance(e, RequestError):
+            return ElasticSearchError.invalid_request(str(e))
+        if isinstance(e, NotFoundError):
+            self._forget_index(index)
+            return ElasticSearchError.missing_index(index)
+        backtrace = extract_tb(e.__traceback__)
+        return ElasticSearchReadError.unknown_exception(dsl, fields, backtrace, str(e))
+
+    def iter_documents(self,
+                       index=None,
+                       doc_type=None,
+                       dsl=None,
+                       fields=None,
+                       page_size=1000,
+                       method='scroll',
+                       slices=None,
+                       scroll='1m'):
+        """
+        stream every hit of a search, however many match
+        ie. exports and reindexing
+        pages are requested as the previous one is consumed, so memory
+        stays flat, and a scroll context is cleared once exhausted or when
+        the caller leaves the loop early
+        mandatory args:
+            index = index name
+            doc_type = document type, ie. any valid string
+        optional args:
+            dsl = query parameters in DSL format, ie. {'query': {...}}
+            fields = list of fields to return
+            page_size = hits per request
+            method = 'scroll' or 'search_after', the latter keeps no context
+                     on the cluster but needs a sort unique per document
+            slices = scroll this many slices in parallel threads
+            scroll = how long the cluster keeps a scroll context between pages
+        search_after and slices need ElasticSearch 5.0 or later
+        yields hits as found in search responses, ie. hit['_source']
+        raises ElasticSearchStreamError carrying the envelope
+        search_documents() would return
+        """
+        err_msg = self._connect()
+        if err_msg:
+            raise ElasticSearchStreamError(err_msg)
+        try:
+            if slices:
+                pages = sliced_pages(self.es, index, doc_type, dsl, fields,
+                                     page_size, slices, scroll)
+            elif method == 'search_after':
+                pages = search_after_pages(self.es, index, doc_type, dsl, fields,
+                                           page_size)
+            else:
+                pages = scroll_pages(self.es, index, doc_type, dsl, fields,
+                                     page_size, scroll)
+            try:
+                for hits in pages:
+                    for hit in hits:
+                        yield hit
+            finally:
+                pages.close()
+        except Exception as e:
+            raise ElasticSearchStreamError(
+                self._exception_envelope(e, index, dsl, fields))
+
+    def iter_buckets(self,
+                     index=None,
+                     doc_type=None,
+                     sources=None,
+                     dsl=None,
+                     aggs=None,
+                     page_size=1000,
+                     name='buckets'):
+        """
+        stream every bucket of a composite aggregation, however many there
+        are, rather than a terms aggregation with a huge size
+        pages of buckets are requested as the previous one is consumed
+        mandatory args:
+            index = index name
+            doc_type = document type, ie. any valid string
+            sources = list of composite sources or field names, field names
+                      are terms sources named after the field
+        optional args:
+            dsl = query restricting the documents aggregated, ie. {'query': {...}}
+            aggs = sub aggregations computed per bucket, ie.
+                   {'revenue': {'sum': {'field': 'price'}}}
+            page_size = buckets per request
+            name = name of the composite aggregation in the request
+        needs ElasticSearch 6.1 or later
+        yields buckets as found in search responses, ie. bucket['key']
+        raises ElasticSearchStreamError carrying the envelope
+        search_documents() would return
+        """
+        err_msg = self._connect()
+        if err_msg:
+            raise ElasticSearchStreamError(err_msg)
+        try:
+            pages = composite_pages(self.es, index, doc_type, dsl, name,
+                                    composite_sources(sources), aggs, page_size)
+            try:
+                for buckets in pages:
+                    for bucket in buckets:
+                        yield bucket
+            finally:
+                pages.close()
+        except Exception as e:
+            raise ElasticSearchStreamError(
+                self._exception_envelope(e, index, dsl, sources))
+
+    def aggregate_columns(self,
+                          index=None,
+                          doc_type=None,
+                          sources=None,
+                          dsl=None,
+                          aggs=None,
+                          page_size=1000,
+                          numpy_arrays=False):
+        """
+        every bucket of a composite aggregation collected as columns
+        see iter_buckets() for args
+        optional args:
+            numpy_arrays = numeric columns become NumPy arrays
+        data = dict of column name: list or array of values, one column per
+        source, doc_count and per sub aggregation value, ie. 'revenue', or
+        statistic, ie. 'price.avg'
+        """
+        try:
+            err_msg = self._connect()
+            if err_msg:
+                return err_msg
+            sources = composite_sources(sources)
+            collector = BucketCollector([list(source.keys())[0] for source in sources],
+                                        aggs,
+                                        numpy_arrays)
+            for buckets in composite_pages(self.es, index, doc_type, dsl, 'buckets',
+                                           sources, aggs, page_size):
+                collector.add(buckets)
+            return ElasticSearchRead.objects_found(collector.columns())
+        except ConnectionError as e:
+            return ElasticSearchError.no_host_available(self.host, self.port)
+        except RequestError as e:
+            return ElasticSearchError.invalid_request(str(e))
+        except NotFoundError as e:
+            self._forget_index(index)
+            return ElasticSearchError.missing_index(index)
+        except Exception as e:
+            (type_e, value, traceback_prev) = exc_info()
+            backtrace = extract_tb(traceback_prev)
+            return ElasticSearchReadError.unknown_exception(dsl, sources, backtrace, str(e))
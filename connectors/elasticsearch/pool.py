@@ -0,0 +1,163 @@
+
+from atexit import register
+from logging import getLogger
+from threading import Event, RLock, Thread
+
+from elasticsearch.client import Elasticsearch
+
+log = getLogger(__name__)
+
+class ClientPool:
+    """
+    process wide registry of ElasticSearch clients shared by every ESConnector
+    a client, and the HTTP connection pools it keeps alive per node, is
+    created once per cluster and client settings, see key(), and reused by
+    all connector instances and threads afterwards
+    nodes are sniffed from a background thread rather than in band, so no
+    request waits for a sniff
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._clients = {}
+        self._sniffers = {}
+        self._created = 0
+        self._reused = 0
+        self._evicted = 0
+        self._sniffs = 0
+        self._sniff_failures = 0
+
+    @staticmethod
+    def key(host, port, local_env, timeout=None, maxsize=None, serializer=None):
+        """
+        connectors asking for different client settings get different
+        clients, serializers are compared with ==, so equal serializers,
+        ie. FastJSONSerializer of the same backend, share a client
+        """
+        return (host, port, bool(local_env), timeout, maxsize, serializer)
+
+    def acquire(self, key, settings, sniff_interval=None):
+        """
+        return the client registered under key, creating it if needed
+        mandatory args:
+            key = value returned by ClientPool.key()
+            settings = keyword arguments for elasticsearch.Elasticsearch
+        optional args:
+            sniff_interval = seconds between background sniffs, None never
+        """
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._reused += 1
+                return client
+            client = Elasticsearch(**settings)
+            self._clients[key] = client
+            self._created += 1
+            if sniff_interval:
+                stop = Event()
+                thread = Thread(target=self._sniff,
+                                args=(key, client, sniff_interval, stop),
+                                name='es-sniffer-{}:{}'.format(key[0], key[1]))
+                thread.daemon = True
+                self._sniffers[key] = (thread, stop)
+                thread.start()
+            log.info('ES client created for {}'.format(key))
+            return client
+
+    def _sniff(self, key, client, interval, stop):
+        while not stop.wait(interval):
+            try:
+                client.transport.sniff_hosts()
+                with self._lock:
+                    self._sniffs += 1
+            except Exception as e:
+                log.warning('ES sniff of {} failed: {}'.format(key, e))
+                with self._lock:
+                    self._sniff_failures += 1
+
+    def _evict(self, key):
+        """
+        lock must be held
+        """
+        client = self._clients.pop(key, None)
+        sniffer = self._sniffers.pop(key, None)
+        if sniffer is not None:
+            sniffer[1].set()
+        if client is None:
+            return
+        self._evicted += 1
+        try:
+            client.transport.close()
+        except Exception as e:
+            log.warning('ES close of {} failed: {}'.format(key, e))
+
+    def release(self, key):
+        """
+        close the client registered under key, next acquire() rebuilds it
+        """
+        with self._lock:
+            self._evict(key)
+
+    def health_check(self, timeout=2.0, evict=True):
+        """
+        ping every registered client
+        optional args:
+            timeout = seconds allowed per client
+            evict = drop unreachable clients so they are rebuilt on next use
+        returns dict of key: True if healthy else False
+        """
+        with self._lock:
+            clients = list(self._clients.items())
+        health = {}
+        for key, client in clients:
+            try:
+                health[key] = bool(client.ping(request_timeout=timeout))
+            except Exception as e:
+                log.warning('ES health check of {} failed: {}'.format(key, e))
+                health[key] = False
+            if not health[key] and evict:
+                self.release(key)
+        return health
+
+    def _connections(self, client):
+        """
+        live and dead nodes of one client and the use of their HTTP pools
+        """
+        pool = client.transport.connection_pool
+        nodes = []
+        for connection in getattr(pool, 'connections', ()):
+            http = getattr(connection, 'pool', None)
+            nodes.append({'host': connection.host,
+                          'http_connections': getattr(http, 'num_connections', None),
+                          'requests': getattr(http, 'num_requests', None)})
+        dead = getattr(pool, 'dead', None)
+        return {'live_nodes': len(nodes),
+                'dead_nodes': dead.qsize() if dead is not None else 0,
+                'nodes': nodes}
+
+    def stats(self):
+        """
+        counters describing registry and connection pool usage
+        """
+        with self._lock:
+            clients = list(self._clients.items())
+            stats = {'live_clients': len(clients),
+                     'created': self._created,
+                     'reused': self._reused,
+                     'evicted': self._evicted,
+                     'sniffs': self._sniffs,
+                     'sniff_failures': self._sniff_failures}
+        stats['clients'] = dict((key, self._connections(client))
+                                for key, client in clients)
+        return stats
+
+    def shutdown_all(self):
+        """
+        close every registered client, called at interpreter exit
+        """
+        with self._lock:
+            for key in list(self._clients.keys()):
+                self._evict(key)
+
+client_pool = ClientPool()
+register(client_pool.shutdown_all)
@@ -0,0 +1,133 @@
+
+from logging import getLogger
+from queue import Full, Queue
+from threading import Event, Thread
+
+log = getLogger(__name__)
+
+DONE = object()
+
+def search_params(fields=None, filter_path=None):
+    """
+    optional query parameters of a search, the client sends a parameter
+    passed as None as the text 'None', so unset ones are left out
+    """
+    params = {}
+    if fields is not None:
+        params['_source'] = fields
+    if filter_path is not None:
+        params['filter_path'] = filter_path
+    return params
+
+def scroll_pages(es, index, doc_type, body, fields, page_size, scroll='1m'):
+    """
+    yield the hits of a search page by page through a scroll context,
+    which is cleared once exhausted or when the caller stops early
+    unsorted searches are sorted by _doc, the cheapest order to scroll
+    """
+    body = dict(body or {})
+    body.setdefault('sort', ['_doc'])
+    response = es.search(index=index,
+                         doc_type=doc_type,
+                         body=body,
+                         scroll=scroll,
+                         size=page_size,
+                         **search_params(fields))
+    scroll_id = response.get('_scroll_id')
+    try:
+        while True:
+            hits = response['hits']['hits']
+            if not hits:
+                return
+            yield hits
+            response = es.scroll(scroll_id=scroll_id, scroll=scroll)
+            scroll_id = response.get('_scroll_id', scroll_id)
+    finally:
+        if scroll_id:
+            try:
+                es.clear_scroll(scroll_id=scroll_id, ignore=(404,))
+            except Exception as e:
+                log.warning('ES clear_scroll failed: {}'.format(e))
+
+def search_after_pages(es, index, doc_type, body, fields, page_size):
+    """
+    yield the hits of a search page by page, each page requested with the
+    sort values of the previous page's last hit, no context is kept on the
+    cluster between pages
+    the sort must be unique per document, _uid is used when dsl has none
+    needs ElasticSearch 5.0 or later
+    """
+    body = dict(body or {})
+    body.setdefault('sort', [{'_uid': 'asc'}])
+    body['size'] = page_size
+    while True:
+        response = es.search(index=index,
+                             doc_type=doc_type,
+                             body=body,
+                             **search_params(fields))
+        hits = response['hits']['hits']
+        if not hits:
+            return
+        yield hits
+        if len(hits) < page_size:
+            return
+        body['search_after'] = hits[-1]['sort']
+
+def _put(pages, stop, item):
+    """
+    block until the consumer takes item or stops reading
+    """
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except Full:
+            continue
+    return False
+
+def _scroll_slice(es, index, doc_type, body, fields, page_size, scroll, i, slices,
+                  pages, stop):
+    sliced = dict(body or {}, slice={'id': i, 'max': slices})
+    source = scroll_pages(es, index, doc_type, sliced, fields, page_size, scroll)
+    try:
+        for hits in source:
+            if not _put(pages, stop, hits):
+                return
+    except Exception as e:
+        _put(pages, stop, e)
+    finally:
+        source.close()
+        _put(pages, stop, DONE)
+
+def sliced_pages(es, index, doc_type, body, fields, page_size, slices, scroll='1m'):
+    """
+    scroll slices of the search in parallel, one thread per slice, and
+    yield their pages as they arrive
+    at most 2 pages per slice are buffered, so memory stays flat and
+    workers wait for a slow consumer
+    needs ElasticSearch 5.0 or later
+    """
+    pages = Queue(maxsize=slices * 2)
+    stop = Event()
+    threads = [Thread(target=_scroll_slice,
+                      args=(es, index, doc_type, body, fields, page_size, scroll,
+                            i, slices, pages, stop),
+                      name='es-slice-{}'.format(i))
+               for i in range(slices)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        done = 0
+        while done < slices:
+            item = pages.get()
+            if item is DONE:
+                done += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,106 @@
+
+from datetime import date, datetime
+from decimal import Decimal
+from json import dumps as json_dumps, loads as json_loads
+from uuid import UUID
+
+from elasticsearch.exceptions import SerializationError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+def _default(data):
+    """
+    types JSON lacks, encoded as the client's JSONSerializer does
+    """
+    if isinstance(data, (date, datetime)):
+        return data.isoformat()
+    if isinstance(data, Decimal):
+        return float(data)
+    if isinstance(data, UUID):
+        return str(data)
+    raise TypeError('Unable to serialize {!r} (type: {})'.format(data, type(data)))
+
+def _stdlib_dumps(data):
+    return json_dumps(data, default=_default, ensure_ascii=False, separators=(',', ':'))
+
+def _orjson_dumps(data):
+    try:
+        return orjson.dumps(data, default=_default,
+                            option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    except TypeError:
+        # orjson.JSONEncodeError, ie. integers beyond 64 bits
+        return _stdlib_dumps(data)
+
+def _ujson_dumps(data):
+    try:
+        return ujson.dumps(data, ensure_ascii=False)
+    except (TypeError, OverflowError):
+        return _stdlib_dumps(data)
+
+def as_text(body):
+    """
+    pre-encoded bytes as str, for bodies joined by the bulk helpers
+    """
+    if isinstance(body, bytes):
+        return body.decode('utf-8')
+    return body
+
+BACKENDS = {'json': (_stdlib_dumps, json_loads),
+            'orjson': (_orjson_dumps, orjson.loads if orjson else None),
+            'ujson': (_ujson_dumps, ujson.loads if ujson else None)}
+
+class FastJSONSerializer:
+    """
+    JSON serializer of the ElasticSearch client, encoding requests and
+    decoding responses, str and bytes bodies are taken as JSON encoded by
+    the caller and sent as they are
+    dumps() returns str, the bulk and msearch helpers join bodies with
+    newlines and cannot mix in bytes
+    optional args:
+        backend = 'json', 'orjson' or 'ujson', if None orjson is tried
+                  first, pip install connectors[orjson], then json
+                  ujson has no hook for types JSON lacks and encodes dates
+                  its own way, use it for documents of plain JSON types
+    every backend encodes what json encodes: documents orjson rejects,
+    ie. integers beyond 64 bits, are encoded by json instead
+    """
+    mimetype = 'application/json'
+
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = 'orjson' if orjson is not None else 'json'
+        (self._dumps, self._loads) = BACKENDS[backend]
+        if self._loads is None:
+            raise ImportError('{} is not installed'.format(backend))
+        self.backend = backend
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.backend == self.backend
+
+    def __hash__(self):
+        return hash((type(self), self.backend))
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.backend)
+
+    def dumps(self, data):
+        if isinstance(data, (str, bytes)):
+            return data
+        try:
+            return self._dumps(data)
+        except (ValueError, TypeError) as e:
+            raise SerializationError(data, e)
+
+    def loads(self, s):
+        try:
+            return self._loads(s)
+        except (ValueError, TypeError) as e:
+            raise SerializationError(s, e)
@@ -0,0 +1,15 @@
+
+import pytest
+from elasticsearch.client import Elasticsearch
+
+from benchmarks.fakes import FakeClientPool
+from connectors.elasticsearch.my_elasticsearch import ESConnector
+from helpers import RecordingTransport
+
+@pytest.fixture
+def client():
+    return Elasticsearch(transport_class=RecordingTransport)
+
+@pytest.fixture
+def connector(client):
+    return ESConnector('127.0.0.1', local_env=True, pool=FakeClientPool(client))
@@ -0,0 +1,71 @@
+
+
+from json import dumps, loads
+
+from elasticsearch.serializer import JSONSerializer
+
+from benchmarks.fakes import hit
+
+def search_response(hits):
+    return {'took': 1,
+            'timed_out': False,
+            '_shards': {'total': 1, 'successful': 1, 'failed': 0},
+            'hits': {'total': len(hits), 'max_score': 1.0, 'hits': hits}}
+
+def bulk_actions(body):
+    """
+    (action, source) pairs of a newline delimited bulk body
+    """
+    lines = [loads(line) for line in body.splitlines() if line]
+    return list(zip(lines[::2], lines[1::2]))
+
+def bulk_reply(*statuses, indices=('bench',)):
+    """
+    answers the n-th bulk request with statuses[n] for every item, the
+    last status once they are used up, a status may also be a dict of
+    status by _id defaulting to 201, and lists indices as existing
+    """
+    statuses = list(statuses)
+
+    def reply(method, url, params, body):
+        if url == '/_alias':
+            return dict((name, {'aliases': {}}) for name in indices)
+        if not url.endswith('/_bulk'):
+            return {'acknowledged': True}
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        items = []
+        for action, _ in bulk_actions(body):
+            (op_type, meta) = list(action.items())[0]
+            code = status.get(meta['_id'], 201) if isinstance(status, dict) else status
+            items.append({op_type: dict(meta, status=code)})
+        return {'took': 1, 'errors': any(list(i.values())[0]['status'] >= 300 for i in items),
+                'items': items}
+    return reply
+
+class RecordingTransport:
+    """
+    transport of a real client recording every request as it would be
+    sent, query parameters escaped and body serialized, and answering
+    status 200 with reply(method, url, params, body), which returns a dict
+    """
+
+    def __init__(self, hosts, serializer=None, **kwargs):
+        self.serializer = serializer or JSONSerializer()
+        self.requests = []
+        self.reply = lambda method, url, params, body: search_response(
+            [hit(i, 2) for i in range(3)])
+
+    def perform_request(self, method, url, params=None, body=None):
+        if body is not None:
+            body = self.serializer.dumps(body)
+            if isinstance(body, bytes):
+                body = body.decode('utf-8')
+        params = dict((k, v.decode('utf-8') if isinstance(v, bytes) else v)
+                      for k, v in (params or {}).items())
+        params.pop('ignore', None)
+        params.pop('request_timeout', None)
+        self.requests.append((method, url, params, body))
+        return 200, self.serializer.loads(dumps(self.reply(method, url, params, body)))
+
+    def close(self):
+        pass
@@ -0,0 +1,87 @@
+
+from json import loads
+
+import pytest
+from elasticsearch.exceptions import NotFoundError
+
+from connectors.elasticsearch import aggregation as aggregation_module
+from connectors.elasticsearch.aggregation import BucketCollector, composite_sources
+from connectors.elasticsearch.error import ElasticSearchStreamError
+
+def bucket(country, n, **aggs):
+    return dict({'key': {'country': country}, 'doc_count': n}, **aggs)
+
+def pages_reply(*pages, after_key=True):
+    """
+    answers the n-th search with the buckets of pages[n]
+    """
+    pages = list(pages)
+
+    def reply(method, url, params, body):
+        buckets = pages.pop(0) if pages else []
+        result = {'buckets': buckets}
+        if buckets and after_key:
+            result['after_key'] = buckets[-1]['key']
+        return {'hits': {'total': 0, 'hits': []}, 'aggregations': {'buckets': result}}
+    return reply
+
+def bodies(client):
+    return [loads(body) for _, _, _, body in client.transport.requests]
+
+def test_composite_sources():
+    day = {'day': {'date_histogram': {'field': 'ts', 'interval': 'day'}}}
+    assert composite_sources(['country', day]) == [{'country': {'terms': {'field': 'country'}}}, day]
+
+@pytest.mark.parametrize('after_key', [True, False])
+def test_pages_are_requested_after_the_last_key(client, connector, after_key):
+    client.transport.reply = pages_reply([bucket('fr', 1), bucket('it', 2)], [bucket('uk', 3)],
+                                         after_key=after_key)
+    dsl = {'query': {'term': {'active': True}}}
+    buckets = list(connector.iter_buckets('bench', 'doc', ['country'], dsl=dsl, page_size=2))
+    assert [b['key']['country'] for b in buckets] == ['fr', 'it', 'uk']
+    (first, second) = bodies(client)
+    assert first == {'query': {'term': {'active': True}}, 'size': 0,
+                     'aggs': {'buckets': {'composite': {
+                         'size': 2, 'sources': [{'country': {'terms': {'field': 'country'}}}]}}}}
+    assert second['aggs']['buckets']['composite']['after'] == {'country': 'it'}
+    assert dsl == {'query': {'term': {'active': True}}}
+
+def test_full_last_page_needs_an_empty_one(client, connector):
+    client.transport.reply = pages_reply([bucket('fr', 1)])
+    assert len(list(connector.iter_buckets('bench', 'doc', ['country'], page_size=1))) == 1
+    assert len(client.transport.requests) == 2
+
+def test_stream_errors(client, connector):
+    def missing(method, url, params, body):
+        raise NotFoundError(404, 'index_not_found_exception', {})
+    client.transport.reply = missing
+    with pytest.raises(ElasticSearchStreamError) as e:
+        list(connector.iter_buckets('missing', 'doc', ['country']))
+    assert e.value.envelope['status_code'] == 3003
+
+def test_collector_builds_columns():
+    collector = BucketCollector(['country'], {'revenue': {}, 'price': {}})
+    collector.add([bucket('fr', 1, revenue={'value': 10.0})])
+    collector.add([bucket('it', 2, revenue={'value': 20.0},
+                          price={'avg': 5.0, 'max': 7, 'count': 2})])
+    assert collector.columns() == {'country': ['fr', 'it'], 'doc_count': [1, 2],
+                                   'revenue': [10.0, 20.0], 'price.avg': [None, 5.0],
+                                   'price.max': [None, 7], 'price.count': [None, 2]}
+
+def test_collector_arrays(monkeypatch):
+    numpy = pytest.importorskip('numpy')
+    collector = BucketCollector(['country'], arrays=True)
+    collector.add([bucket('fr', 1), bucket('it', 2)])
+    columns = collector.columns()
+    assert isinstance(columns['doc_count'], numpy.ndarray)
+    assert columns['country'] == ['fr', 'it']
+    monkeypatch.setattr(aggregation_module, 'numpy', None)
+    assert collector.columns()['doc_count'] == [1, 2]
+
+def test_aggregate_columns(client, connector):
+    client.transport.reply = pages_reply([bucket('fr', 1, revenue={'value': 3})])
+    response = connector.aggregate_columns('bench', 'doc', ['country'],
+                                           aggs={'revenue': {'sum': {'field': 'price'}}})
+    assert response['status_code'] == 3009
+    assert response['data'] == {'country': ['fr'], 'doc_count': [1], 'revenue': [3]}
+    assert bodies(client)[0]['aggs']['buckets']['aggs'] == {'revenue': {'sum': {'field': 'price'}}}
@@ -0,0 +1,65 @@
+
+from connectors.elasticsearch.buffer import merge
+from helpers import bulk_actions, bulk_reply
+
+def test_merge_applies_updates_in_order():
+    into = {'a': 1, 'nested': {'x': 1, 'y': 1}, 'tags': [1]}
+    update = {'nested': {'y': 2, 'z': {'deep': True}}, 'tags': [2], 'b': 2}
+    assert merge(into, update) == {'a': 1, 'b': 2, 'tags': [2],
+                                   'nested': {'x': 1, 'y': 2, 'z': {'deep': True}}}
+    update['nested']['z']['deep'] = False
+    assert into['nested']['z'] == {'deep': True}
+
+def test_updates_of_a_document_are_sent_once(client, connector):
+    client.transport.reply = bulk_reply(200)
+    connector.buffer_updates(window=60, retry_on_conflict=5)
+    fields = {'n': 1, 'nested': {'x': 1}}
+    for values in ({'doc': fields}, {'doc': {'nested': {'y': 2}}},
+                   {'doc': {'n': 3}}, {'doc': {'m': 1}}):
+        response = connector.update_document('bench', 'doc', 1, values)
+        assert response['status_code'] == 3012
+    connector.update_document('bench', 'doc', 2, {'doc': {'n': 2}})
+    connector.update_document('other', 'doc', 1, {'doc': {'n': 9}})
+    assert client.transport.requests == []
+    assert connector.flush_updates() == []
+    assert fields == {'n': 1, 'nested': {'x': 1}}
+    requests = [bulk_actions(body) for _, url, _, body in client.transport.requests]
+    assert requests == [
+        [({'update': {'_index': 'bench', '_type': 'doc', '_id': 1, '_retry_on_conflict': 5}},
+          {'doc': {'n': 3, 'nested': {'x': 1, 'y': 2}, 'm': 1}}),
+         ({'update': {'_index': 'bench', '_type': 'doc', '_id': 2, '_retry_on_conflict': 5}},
+          {'doc': {'n': 2}})],
+        [({'update': {'_index': 'other', '_type': 'doc', '_id': 1, '_retry_on_conflict': 5}},
+          {'doc': {'n': 9}})]]
+    stats = connector.update_buffer.stats()
+    assert (stats['updates'], stats['coalesced'], stats['sent'], stats['flushes']) == (6, 3, 3, 1)
+    connector.update_buffer.close()
+
+def test_other_updates_bypass_the_buffer(client, connector):
+    client.transport.reply = bulk_reply(200)
+    connector.buffer_updates(window=60)
+    response = connector.update_document('bench', 'doc', 1, {'script': 'ctx._source.n++'})
+    assert response['status_code'] == 3007
+    [(method, url, params, body)] = client.transport.requests
+    assert (method, url) == ('POST', '/bench/doc/1/_update')
+    connector.update_buffer.close()
+
+def test_failed_updates_are_reported_and_upserts_sent(client, connector):
+    client.transport.reply = bulk_reply({1: 404})
+    buffer = connector.buffer_updates(window=60, doc_as_upsert=True)
+    connector.update_document('bench', 'doc', 1, {'doc': {'n': 1}})
+    connector.update_document('bench', 'doc', 2, {'doc': {'n': 2}})
+    errors = connector.flush_updates()
+    assert [(e['doc_id'], e['status']) for e in errors] == [(1, 404)]
+    (action, source) = bulk_actions(client.transport.requests[0][3])[0]
+    assert source == {'doc': {'n': 1}, 'doc_as_upsert': True}
+    assert (buffer.stats()['sent'], buffer.stats()['failed']) == (1, 1)
+
+def test_closed_buffer_sends_updates_directly(client, connector):
+    client.transport.reply = bulk_reply(200)
+    buffer = connector.buffer_updates(window=60)
+    connector.update_document('bench', 'doc', 1, {'doc': {'n': 1}})
+    buffer.close()
+    assert len(client.transport.requests) == 1
+    assert not buffer.update('bench', 'doc', 2, {'n': 2})
+    assert connector.update_document('bench', 'doc', 2, {'doc': {'n': 2}})['status_code'] == 3007
@@ -0,0 +1,53 @@
+
+from helpers import bulk_actions, bulk_reply
+
+def bulk_requests(client):
+    return [r for r in client.transport.requests if r[1] == '/_bulk']
+
+def test_add_documents_sends_chunked_create_actions(client, connector):
+    client.transport.reply = bulk_reply(201)
+    documents = ((i, {'n': i}) for i in range(5))
+    response = connector.add_documents('bench', 'doc', documents, chunk_size=2,
+                                       thread_count=1)
+    assert response['status_code'] == 3010
+    assert response['data'] == {'indexed': 5, 'failed': 0, 'errors': []}
+    requests = bulk_requests(client)
+    assert [r[0] for r in requests] == ['POST'] * 3
+    actions = [a for r in requests for a in bulk_actions(r[3])]
+    assert actions[0] == ({'create': {'_index': 'bench', '_type': 'doc', '_id': 0}}, {'n': 0})
+    assert [source for _, source in actions] == [{'n': i} for i in range(5)]
+
+def test_add_documents_reports_failed_documents(client, connector):
+    client.transport.reply = bulk_reply({1: 409})
+    response = connector.add_documents('bench', 'doc', [(0, {}), (1, {})],
+                                       op_type='index')
+    assert response['data']['indexed'] == 1
+    assert response['data']['errors'] == [{'doc_id': 1, 'op_type': 'index',
+                                           'status': 409, 'error': 'None'}]
+    assert 'index' in bulk_actions(bulk_requests(client)[0][3])[0][0]
+
+def test_add_documents_creates_a_missing_index(client, connector):
+    client.transport.reply = bulk_reply(201, indices=())
+    connector.add_documents('new', 'doc', [(0, {'n': 0})])
+    (method, url, params, body) = client.transport.requests[1]
+    assert (method, url) == ('PUT', '/new')
+    assert bulk_requests(client)
+
+def test_pre_encoded_documents_are_sent_as_is(client, connector):
+    client.transport.reply = bulk_reply(201)
+    connector.add_documents('bench', 'doc', [(0, b'{"n": 0}')])
+    assert bulk_requests(client)[0][3].splitlines()[1] == '{"n": 0}'
+
+def test_update_documents_sends_retry_on_conflict(client, connector):
+    client.transport.reply = bulk_reply(200)
+    response = connector.update_documents('bench', 'doc', [(0, {'doc': {'n': 1}})],
+                                          retry_on_conflict=3)
+    assert response['data']['indexed'] == 1
+    [(action, source)] = bulk_actions(bulk_requests(client)[0][3])
+    assert action == {'update': {'_index': 'bench', '_type': 'doc', '_id': 0,
+                                 '_retry_on_conflict': 3}}
+    assert source == {'doc': {'n': 1}}
+    client.transport.requests.clear()
+    connector.update_documents('bench', 'doc', [(0, {'doc': {'n': 1}})])
+    [(action, source)] = bulk_actions(bulk_requests(client)[0][3])
+    assert '_retry_on_conflict' not in action['update']
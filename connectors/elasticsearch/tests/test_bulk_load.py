@@ -0,0 +1,69 @@
+
+from json import loads
+
+import pytest
+from elasticsearch.exceptions import TransportError
+
+from connectors.elasticsearch.error import ElasticSearchStreamError
+from helpers import bulk_reply
+
+TUNED = {'index.refresh_interval': '-1',
+         'index.number_of_replicas': 0,
+         'index.translog.durability': 'async',
+         'index.translog.flush_threshold_size': '1gb'}
+
+def settings_reply(indices):
+    """
+    answers get_settings with the flat settings of indices, a dict of
+    index name: settings, and every other request as bulk_reply does
+    """
+    reply = bulk_reply(201)
+
+    def settings_or_reply(method, url, params, body):
+        if method == 'GET' and url.endswith('/_settings'):
+            return dict((name, {'settings': settings}) for name, settings in indices.items())
+        return reply(method, url, params, body)
+    return settings_or_reply
+
+def sent(client):
+    return [(method, url, params, loads(body) if body else None)
+            for method, url, params, body in client.transport.requests]
+
+def test_index_is_tuned_then_restored(client, connector):
+    client.transport.reply = settings_reply(
+        {'events': {'index.refresh_interval': '30s', 'index.number_of_replicas': '2'}})
+    with connector.bulk_load('events'):
+        assert sent(client) == [
+            ('GET', '/events/_settings', {'flat_settings': 'true'}, None),
+            ('PUT', '/events/_settings', {}, TUNED)]
+    assert sent(client)[2:] == [
+        ('PUT', '/events/_settings', {}, {'index.refresh_interval': '30s',
+                                          'index.number_of_replicas': '2',
+                                          'index.translog.durability': 'request',
+                                          'index.translog.flush_threshold_size': '512mb'}),
+        ('POST', '/events/_refresh', {}, None)]
+
+def test_every_index_of_an_alias_is_restored_and_merged(client, connector):
+    client.transport.reply = settings_reply({'events-1': {}, 'events-2': {}})
+    with connector.bulk_load('events', force_merge=True, max_num_segments=2):
+        pass
+    requests = sent(client)[2:]
+    assert [(method, url) for method, url, _, _ in requests] == [
+        ('PUT', '/events-1/_settings'), ('PUT', '/events-2/_settings'),
+        ('POST', '/events/_refresh'), ('POST', '/events/_forcemerge')]
+    assert requests[-1][2] == {'max_num_segments': '2'}
+
+def test_index_is_restored_when_the_load_fails(client, connector):
+    client.transport.reply = settings_reply({'events': {}})
+    with pytest.raises(ValueError):
+        with connector.bulk_load('events'):
+            raise ValueError('bad document')
+    assert [url for _, url, _, _ in sent(client)][-1] == '/events/_refresh'
+
+def test_tuning_errors_raise_stream_errors(client, connector):
+    def fail(method, url, params, body):
+        raise TransportError(500, 'boom', {})
+    client.transport.reply = fail
+    with pytest.raises(ElasticSearchStreamError):
+        with connector.bulk_load('events'):
+            pass
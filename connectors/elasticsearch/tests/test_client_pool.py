@@ -0,0 +1,87 @@
+
+from threading import Event
+
+import pytest
+
+from connectors.elasticsearch import pool as pool_module
+from connectors.elasticsearch.my_elasticsearch import ESConnector
+from connectors.elasticsearch.pool import ClientPool
+from connectors.elasticsearch.serializer import FastJSONSerializer
+
+@pytest.fixture
+def pool():
+    pool = ClientPool()
+    yield pool
+    pool.shutdown_all()
+
+def connect(pool, **kwargs):
+    connector = ESConnector('127.0.0.1', local_env=True, pool=pool, **kwargs)
+    assert connector._connect() is None
+    return connector
+
+def test_connectors_of_one_cluster_share_a_client(pool):
+    (a, b) = (connect(pool), connect(pool))
+    assert a.es is b.es
+    stats = pool.stats()
+    assert (stats['live_clients'], stats['created'], stats['reused']) == (1, 1, 1)
+
+def test_equal_serializers_share_a_client(pool):
+    a = connect(pool, serializer=FastJSONSerializer('json'))
+    b = connect(pool, serializer=FastJSONSerializer('json'))
+    assert a.es is b.es
+
+def test_serializer_is_used_by_its_own_client(pool):
+    default = connect(pool)
+    stdlib = connect(pool, serializer=FastJSONSerializer('json'))
+    assert default.es is not stdlib.es
+    assert stdlib.es.transport.serializer is stdlib.serializer
+    assert default.es.transport.serializer is default.serializer
+
+def test_client_settings_are_part_of_the_key(pool):
+    assert connect(pool).es is not connect(pool, timeout=30).es
+    assert connect(pool).es is not connect(pool, maxsize=50).es
+
+def test_release_rebuilds_the_client(pool):
+    a = connect(pool)
+    client = a.es
+    a.close()
+    assert connect(pool).es is not client
+    assert pool.stats()['evicted'] == 1
+
+def test_health_check_evicts_unreachable_clients(pool, monkeypatch):
+    (a, b) = (connect(pool), connect(pool, timeout=30))
+    monkeypatch.setattr(a.es, 'ping', lambda **params: True)
+
+    def unreachable(**params):
+        raise ConnectionError('refused')
+    monkeypatch.setattr(b.es, 'ping', unreachable)
+    assert pool.health_check() == {a.pool_key: True, b.pool_key: False}
+    assert pool.stats()['live_clients'] == 1
+    assert connect(pool, timeout=30).es is not b.es
+
+def test_stats_describe_the_connection_pools(pool):
+    a = connect(pool)
+    nodes = pool.stats()['clients'][a.pool_key]
+    assert (nodes['live_nodes'], nodes['dead_nodes']) == (1, 0)
+
+def test_background_sniffs(pool, monkeypatch):
+    sniffed = Event()
+
+    class Transport:
+
+        def sniff_hosts(self):
+            sniffed.set()
+
+        def close(self):
+            pass
+
+    class Client:
+
+        def __init__(self, **settings):
+            self.transport = Transport()
+    monkeypatch.setattr(pool_module, 'Elasticsearch', Client)
+    key = ClientPool.key('127.0.0.1', 9200, True)
+    pool.acquire(key, {}, sniff_interval=0.001)
+    assert sniffed.wait(1)
+    pool.release(key)
+    assert pool.stats()['sniffs'] >= 1
@@ -0,0 +1,25 @@
+
+from benchmarks.fakes import hit
+from connectors.elasticsearch.hits import LazyHits, filter_paths, slim_hit, slim_response
+
+def test_filter_paths():
+    assert filter_paths(None, False) is None
+    assert filter_paths('took,hits.total', False) == 'took,hits.total'
+    assert filter_paths(['hits.total'], True) == 'hits.total,hits.hits._id,hits.hits._source'
+
+def test_slim_hit_keeps_id_and_fields():
+    assert slim_hit(hit(7, 2)) == {'_id': '7', 'field0': 'value 7 0', 'field1': 'value 7 1'}
+    assert slim_hit({'_id': '1'}) == {'_id': '1'}
+
+def test_lazy_hits_build_each_hit_once_when_read():
+    hits = LazyHits([hit(i, 1) for i in range(3)])
+    assert len(hits) == 3
+    assert hits._documents == [None, None, None]
+    assert hits[1] is hits[1]
+    assert hits._documents[0] is None
+    assert [h['_id'] for h in hits[::2]] == ['0', '2']
+    assert hits[-1]['_id'] == '2'
+
+def test_slim_response_of_filtered_out_hits():
+    assert slim_response({'hits': {'total': 0}}) == {'total': 0, 'hits': []}
+    assert list(slim_response({}, lazy=True)['hits']) == []
@@ -0,0 +1,59 @@
+
+from elasticsearch.exceptions import NotFoundError, RequestError
+
+from helpers import bulk_reply
+
+def requests(client):
+    return [(method, url) for method, url, _, _ in client.transport.requests]
+
+def test_indices_are_listed_once(client, connector):
+    client.transport.reply = bulk_reply(201)
+    for i in range(2):
+        assert connector.add_document('bench', 'doc', i, values={'n': i})['status_code'] == 3006
+    assert requests(client) == [('GET', '/_alias'),
+                                ('PUT', '/bench/doc/0'),
+                                ('PUT', '/bench/doc/1')]
+    assert client.transport.requests[1][2] == {'op_type': 'create'}
+
+def test_created_index_is_remembered(client, connector):
+    client.transport.reply = bulk_reply(201, indices=())
+    connector.add_document('new', 'doc', 0, values={})
+    connector.add_document('new', 'doc', 1, values={})
+    assert requests(client).count(('PUT', '/new')) == 1
+    body = client.transport.requests[1][3]
+    assert '"number_of_replicas": "0"' in body
+
+def test_index_created_meanwhile_counts_as_created(client, connector):
+    reply = bulk_reply(201, indices=())
+
+    def already_exists(method, url, params, body):
+        if (method, url) == ('PUT', '/new'):
+            raise RequestError(400, 'index_already_exists_exception', {})
+        return reply(method, url, params, body)
+    client.transport.reply = already_exists
+    assert connector.add_document('new', 'doc', 0, values={})['status_code'] == 3006
+    assert 'new' in connector._known_indices()
+
+def test_index_dropped_elsewhere_is_created_again(client, connector):
+    reply = bulk_reply(201)
+    missing = [True]
+
+    def dropped(method, url, params, body):
+        if url == '/bench/doc/0' and missing:
+            missing.pop()
+            raise NotFoundError(404, 'index_not_found_exception', {})
+        return reply(method, url, params, body)
+    client.transport.reply = dropped
+    assert connector.add_document('bench', 'doc', 0, values={})['status_code'] == 3006
+    assert requests(client)[1:] == [('PUT', '/bench/doc/0'),
+                                    ('PUT', '/bench'),
+                                    ('PUT', '/bench/doc/0')]
+
+def test_dropped_index_is_forgotten(client, connector):
+    client.transport.reply = bulk_reply(201)
+    connector.add_document('bench', 'doc', 0, values={})
+    connector.drop_index('bench')
+    connector.add_document('bench', 'doc', 1, values={})
+    assert requests(client)[2:] == [('DELETE', '/bench'),
+                                    ('PUT', '/bench'),
+                                    ('PUT', '/bench/doc/1')]
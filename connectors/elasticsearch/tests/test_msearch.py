@@ -0,0 +1,68 @@
+
+from json import loads
+from threading import Thread
+
+from benchmarks.fakes import hit
+from connectors.elasticsearch.coalesce import SearchCoalescer
+from helpers import search_response
+
+def msearch_reply(method, url, params, body):
+    """
+    one response per search, each hit carrying the index searched,
+    searches of index 'missing' fail
+    """
+    lines = [loads(line) for line in body.splitlines() if line]
+    responses = []
+    for header in lines[::2]:
+        if header['index'] == 'missing':
+            responses.append({'error': {'type': 'index_not_found_exception'}})
+        else:
+            responses.append(search_response([dict(hit(0, 1), _index=header['index'])]))
+    return {'responses': responses}
+
+def test_msearch_sends_one_request(client, connector):
+    client.transport.reply = msearch_reply
+    response = connector.msearch([('a', 'doc', {'query': {'match_all': {}}}, ['f']),
+                                  ('b', None, '{"size": 1}', None),
+                                  ('c', 'doc', b'{"size": 2}', ['f'])])
+    assert response['status_code'] == 3011
+    [(method, url, params, body)] = client.transport.requests
+    assert (url, params) == ('/_msearch', {})
+    assert [loads(line) for line in body.splitlines()] == [
+        {'index': 'a', 'type': 'doc'}, {'query': {'match_all': {}}, '_source': ['f']},
+        {'index': 'b'}, {'size': 1},
+        {'index': 'c', 'type': 'doc'}, {'size': 2, '_source': ['f']}]
+    assert [r['data']['hits']['hits'][0]['_index'] for r in response['data']] == ['a', 'b', 'c']
+
+def test_failed_search_does_not_fail_the_others(client, connector):
+    client.transport.reply = msearch_reply
+    response = connector.msearch([('missing', 'doc', None, None), ('a', 'doc', None, None)])
+    assert [r['status_code'] for r in response['data']] == [3003, 3009]
+
+def test_no_searches_send_nothing(client, connector):
+    assert connector.msearch([])['data'] == []
+    assert client.transport.requests == []
+
+def test_concurrent_searches_are_coalesced(client, connector):
+    client.transport.reply = msearch_reply
+    coalescer = SearchCoalescer(connector, window=1.0, max_batch=4)
+    responses = {}
+
+    def search(index):
+        responses[index] = coalescer.search(index, 'doc', None)
+    threads = [Thread(target=search, args=(str(i),)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(client.transport.requests) == 1
+    for index, response in responses.items():
+        assert response['data']['hits']['hits'][0]['_index'] == index
+    assert coalescer.stats() == {'searches': 4, 'requests': 1, 'mean_batch': 4.0}
+
+def test_lone_search_is_sent_after_the_window(client, connector):
+    client.transport.reply = msearch_reply
+    coalescer = SearchCoalescer(connector, window=0.001)
+    assert coalescer.search('a', 'doc')['status_code'] == 3009
+    assert coalescer.search('missing', 'doc')['status_code'] == 3003
+    assert coalescer.stats()['requests'] == 2
@@ -0,0 +1,108 @@
+
+from json import loads
+
+import pytest
+from elasticsearch.exceptions import TransportError
+
+from benchmarks.fakes import FakeClientPool, hit
+from connectors.cache import ResultCache
+from connectors.elasticsearch.my_elasticsearch import ESConnector
+from helpers import bulk_reply, search_response
+
+def test_search_sends_no_optional_params_by_default(client, connector):
+    for search in (connector.find_document, connector.search_documents):
+        response = search('bench', 'doc', {'query': {'match_all': {}}})
+        assert response['data']['hits']['total'] == 3
+        (method, url, params, body) = client.transport.requests[-1]
+        assert url == '/bench/doc/_search'
+        assert params == {}
+        assert loads(body) == {'query': {'match_all': {}}}
+
+def test_search_sends_fields_and_filter_path(client, connector):
+    connector.search_documents('bench', 'doc', None, ['field0'], filter_path=['took'])
+    params = client.transport.requests[-1][2]
+    assert params == {'_source': 'field0', 'filter_path': 'took'}
+
+def test_slim_search_returns_document_fields(client, connector):
+    response = connector.search_documents('bench', 'doc', None, slim=True)
+    assert response['status_code'] == 3009
+    assert response['data']['total'] == 3
+    assert response['data']['hits'][0] == {'_id': '0',
+                                           'field0': 'value 0 0',
+                                           'field1': 'value 0 1'}
+    params = client.transport.requests[-1][2]
+    assert '_source' not in params
+    assert params['filter_path'] == 'hits.total,hits.hits._id,hits.hits._source'
+
+def test_lazy_slim_search(client, connector):
+    response = connector.find_document('bench', 'doc', slim=True, lazy=True)
+    assert [h['_id'] for h in response['data']['hits']] == ['0', '1', '2']
+
+def test_slim_and_full_searches_are_cached_apart(client):
+    connector = ESConnector('127.0.0.1', local_env=True, pool=FakeClientPool(client),
+                            result_cache=ResultCache())
+    full = connector.search_documents('bench', 'doc', None)
+    slim = connector.search_documents('bench', 'doc', None, slim=True)
+    assert 'took' in full['data'] and 'took' not in slim['data']
+    assert connector.search_documents('bench', 'doc', None, slim=True) is slim
+    assert len(client.transport.requests) == 2
+
+def search_reply(reply):
+    """
+    answers searches with three hits and other requests with reply
+    """
+    def search_or_reply(method, url, params, body):
+        if url.endswith('/_search'):
+            return search_response([hit(i, 2) for i in range(3)])
+        return reply(method, url, params, body)
+    return search_or_reply
+
+def searches(client):
+    return len([r for r in client.transport.requests if r[1].endswith('/_search')])
+
+def test_cached_searches_are_invalidated_by_writes_to_their_index(client):
+    client.transport.reply = search_reply(bulk_reply(201, indices=('bench', 'other')))
+    connector = ESConnector('127.0.0.1', local_env=True, pool=FakeClientPool(client),
+                            result_cache=ResultCache())
+    dsl = {'query': {'term': {'n': 1}}}
+    first = connector.find_document('bench', 'doc', dsl)
+    assert connector.find_document('bench', 'doc', {'query': {'term': {'n': 1}}}) is first
+    connector.search_documents('bench,other', 'doc', None)
+    connector.search_documents('ben*', 'doc', None)
+    assert searches(client) == 3
+    connector.add_document('other', 'doc', 1, values={})
+    connector.find_document('bench', 'doc', dsl)
+    connector.search_documents('bench,other', 'doc', None)
+    connector.search_documents('ben*', 'doc', None)
+    assert searches(client) == 5
+    connector.update_document('bench', 'doc', 1, {'doc': {'n': 2}})
+    connector.find_document('bench', 'doc', dsl)
+    assert searches(client) == 6
+    assert connector.cache_stats()['hits'] == 2
+
+def test_failed_searches_are_not_cached(client):
+    def fail(method, url, params, body):
+        raise TransportError(500, 'boom', {})
+    client.transport.reply = fail
+    connector = ESConnector('127.0.0.1', local_env=True, pool=FakeClientPool(client),
+                            result_cache=ResultCache())
+    assert connector.find_document('bench', 'doc')['status_code'] != 3008
+    assert connector.cache_stats()['size'] == 0
+
+def test_searches_of_a_list_of_indices_are_cached(client):
+    client.transport.reply = search_reply(bulk_reply(201, indices=('a', 'b')))
+    connector = ESConnector('127.0.0.1', local_env=True, pool=FakeClientPool(client),
+                            result_cache=ResultCache())
+    first = connector.search_documents(['a', 'b'], ['doc'], None)
+    assert first['status_code'] == 3009
+    assert client.transport.requests[-1][1] == '/a,b/doc/_search'
+    assert connector.search_documents(['a', 'b'], ['doc'], None) is first
+    connector.add_document('b', 'doc', 1, values={})
+    assert connector.search_documents(['a', 'b'], ['doc'], None) is not first
+    assert searches(client) == 2
+
+def test_lazy_needs_slim(client, connector):
+    for search in (connector.find_document, connector.search_documents):
+        with pytest.raises(ValueError):
+            search('bench', 'doc', None, lazy=True)
+    assert client.transport.requests == []
@@ -0,0 +1,70 @@
+
+from benchmarks.fakes import FakeClientPool
+from connectors.cassandra.replicator import ESReplicator
+from connectors.elasticsearch.my_elasticsearch import ESConnector
+from helpers import bulk_actions, bulk_reply
+
+def replicator(client, **kwargs):
+    connector = ESConnector('127.0.0.1', local_env=True, pool=FakeClientPool(client))
+    kwargs.setdefault('flush_interval', 60)
+    return ESReplicator(connector, **kwargs)
+
+def test_latest_version_of_a_document_is_indexed_once(client):
+    client.transport.reply = bulk_reply(201)
+    es = replicator(client)
+    assert es.replicate('users', 'user', 1, {'name': 'a'})
+    assert es.replicate('users', 'user', 2, {'name': 'b'})
+    assert es.replicate('users', 'user', 1, {'name': 'c'})
+    es.flush()
+    [(method, url, params, body)] = client.transport.requests
+    assert (method, url) == ('POST', '/_bulk')
+    assert bulk_actions(body) == [
+        ({'index': {'_index': 'users', '_type': 'user', '_id': 2}}, {'name': 'b'}),
+        ({'index': {'_index': 'users', '_type': 'user', '_id': 1}}, {'name': 'c'})]
+    stats = es.stats()
+    assert (stats['queued'], stats['coalesced'], stats['indexed'], stats['pending']) == (3, 1, 2, 0)
+    es.close()
+
+def test_throttled_documents_are_retried(client):
+    client.transport.reply = bulk_reply(429, 201)
+    es = replicator(client)
+    es.replicate('users', 'user', 1, {'name': 'a'})
+    es.flush()
+    assert es.stats()['pending'] == 1 and es.stats()['retried'] == 1
+    es.flush()
+    assert es.stats()['indexed'] == 1 and es.stats()['pending'] == 0
+    es.close()
+
+def test_retries_are_bounded_and_bad_documents_dropped(client):
+    client.transport.reply = bulk_reply(503)
+    es = replicator(client, max_retries=2)
+    es.replicate('users', 'user', 1, {'name': 'a'})
+    es.close()
+    assert len(client.transport.requests) == 2
+    assert es.stats()['failed'] == 1
+    client.transport.reply = bulk_reply(400)
+    es = replicator(client)
+    es.replicate('users', 'user', 2, {'name': 'b'})
+    es.flush()
+    assert es.stats()['failed'] == 1 and es.stats()['pending'] == 0
+    es.close()
+
+def test_close_flushes_and_rejects_later_documents(client):
+    client.transport.reply = bulk_reply(201)
+    es = replicator(client)
+    es.replicate('users', 'user', 1, {'name': 'a'})
+    es.close()
+    assert es.stats()['indexed'] == 1
+    assert not es.replicate('users', 'user', 2, {'name': 'b'})
+    assert es.stats()['rejected'] == 1
+
+def test_full_queue(client):
+    client.transport.reply = bulk_reply(201)
+    es = replicator(client, max_queue=1, block_timeout=0.01)
+    es.replicate('users', 'user', 1, {'name': 'a'})
+    assert es.replicate('users', 'user', 1, {'name': 'b'})
+    assert not es.replicate('users', 'user', 2, {'name': 'c'}, block=False)
+    assert es.stats()['rejected'] == 0
+    assert not es.replicate('users', 'user', 2, {'name': 'c'})
+    assert es.stats()['rejected'] == 1
+    es.close()
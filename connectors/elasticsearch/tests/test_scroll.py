@@ -0,0 +1,55 @@
+
+from json import loads
+
+from benchmarks.fakes import hit
+from connectors.elasticsearch.scroll import scroll_pages, search_after_pages, search_params
+from helpers import search_response
+
+def test_search_params_leave_out_unset_parameters():
+    assert search_params() == {}
+    assert search_params(['a'], 'hits.hits') == {'_source': ['a'],
+                                                 'filter_path': 'hits.hits'}
+
+def scroll_reply(pages):
+    pages = list(pages)
+
+    def reply(method, url, params, body):
+        if method == 'DELETE':
+            return {}
+        hits = pages.pop(0) if pages else []
+        response = search_response(hits)
+        response['_scroll_id'] = 'scroll-1'
+        return response
+    return reply
+
+def test_scroll_pages_sends_no_source_by_default(client):
+    client.transport.reply = scroll_reply([[hit(0, 2), hit(1, 2)], [hit(2, 2)]])
+    pages = list(scroll_pages(client, 'bench', 'doc', None, None, 2))
+    assert [len(p) for p in pages] == [2, 1]
+    (method, url, params, body) = client.transport.requests[0]
+    assert url == '/bench/doc/_search'
+    assert params == {'scroll': '1m', 'size': '2'}
+    assert loads(body) == {'sort': ['_doc']}
+    assert client.transport.requests[-1][0] == 'DELETE'
+
+def test_scroll_pages_projects_fields(client):
+    client.transport.reply = scroll_reply([[hit(0, 2)]])
+    list(scroll_pages(client, 'bench', 'doc', None, ['field0', 'field1'], 2))
+    assert client.transport.requests[0][2]['_source'] == 'field0,field1'
+
+def test_search_after_pages(client):
+    first = [dict(hit(i, 2), sort=['doc#{}'.format(i)]) for i in range(2)]
+    pages = [first, [dict(hit(2, 2), sort=['doc#2'])]]
+    client.transport.reply = lambda method, url, params, body: search_response(pages.pop(0))
+    result = list(search_after_pages(client, 'bench', 'doc', None, None, 2))
+    assert [len(p) for p in result] == [2, 1]
+    ((_, _, params, body), (_, _, _, second)) = client.transport.requests
+    assert params == {}
+    assert loads(body) == {'sort': [{'_uid': 'asc'}], 'size': 2}
+    assert loads(second)['search_after'] == ['doc#1']
+
+def test_iter_documents_returns_sources(client, connector):
+    client.transport.reply = scroll_reply([[hit(0, 2), hit(1, 2)]])
+    documents = list(connector.iter_documents('bench', 'doc', page_size=2))
+    assert [d['_source']['field0'] for d in documents] == ['value 0 0', 'value 1 0']
+    assert '_source' not in client.transport.requests[0][2]
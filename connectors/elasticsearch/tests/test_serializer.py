@@ -0,0 +1,68 @@
+
+from datetime import date, datetime
+from decimal import Decimal
+from json import loads
+from uuid import UUID
+
+import pytest
+from elasticsearch.exceptions import SerializationError
+
+from benchmarks.fakes import FakeClientPool
+from connectors.elasticsearch import serializer as serializer_module
+from connectors.elasticsearch.my_elasticsearch import ESConnector
+from connectors.elasticsearch.serializer import FastJSONSerializer, as_text
+
+BACKENDS = ['json', 'orjson', 'ujson']
+
+@pytest.fixture(params=BACKENDS)
+def serializer(request):
+    if request.param != 'json':
+        pytest.importorskip(request.param)
+    return FastJSONSerializer(request.param)
+
+def test_round_trip(serializer):
+    data = {'name': 'é', 'n': [1, 2.5, None, True]}
+    assert loads(serializer.dumps(data)) == data
+    assert serializer.loads(serializer.dumps(data)) == data
+
+def test_pre_encoded_bodies_are_sent_as_is(serializer):
+    assert serializer.dumps('{"a": 1}') == '{"a": 1}'
+    assert serializer.dumps(b'{"a": 1}') == b'{"a": 1}'
+    assert as_text(b'{"a": 1}') == '{"a": 1}'
+
+@pytest.mark.parametrize('backend', ['json', 'orjson'])
+def test_types_json_lacks(backend):
+    if backend != 'json':
+        pytest.importorskip(backend)
+    data = {'d': date(2020, 1, 2), 't': datetime(2020, 1, 2, 3, 4, 5),
+            'x': Decimal('1.5'), 'id': UUID(int=1)}
+    assert loads(FastJSONSerializer(backend).dumps(data)) == {
+        'd': '2020-01-02', 't': '2020-01-02T03:04:05', 'x': 1.5, 'id': str(UUID(int=1))}
+
+def test_errors_raise_serialization_error(serializer):
+    with pytest.raises(SerializationError):
+        serializer.dumps({'a': object()})
+    with pytest.raises(SerializationError):
+        serializer.loads('{not json')
+
+def test_default_backend_and_missing_backend(monkeypatch):
+    assert FastJSONSerializer().backend == ('orjson' if serializer_module.orjson else 'json')
+    monkeypatch.setitem(serializer_module.BACKENDS, 'orjson', (None, None))
+    with pytest.raises(ImportError):
+        FastJSONSerializer('orjson')
+
+def test_serializers_compare_by_backend():
+    assert FastJSONSerializer('json') == FastJSONSerializer('json')
+    assert hash(FastJSONSerializer('json')) == hash(FastJSONSerializer('json'))
+    assert FastJSONSerializer('json') != 'json'
+    assert repr(FastJSONSerializer('json')) == "FastJSONSerializer('json')"
+
+def test_connector_sends_pre_encoded_dsl(client):
+    connector = ESConnector('127.0.0.1', local_env=True, pool=FakeClientPool(client),
+                            serializer=FastJSONSerializer('json'))
+    connector.search_documents('bench', 'doc', b'{"query":{"match_all":{}}}')
+    assert client.transport.requests[-1][3] == '{"query":{"match_all":{}}}'
+
+@pytest.mark.parametrize('data', [{1: 'a'}, {'n': 2 ** 70}, {'n': [2 ** 64, -2 ** 64]}])
+def test_backends_encode_what_json_encodes(serializer, data):
+    assert loads(serializer.dumps(data)) == loads(FastJSONSerializer('json').dumps(data))
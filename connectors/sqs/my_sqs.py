@@ -1,6 +1,6 @@
 
 from boto3 import resource
-from botocore.exception import ClientError
+from botocore.exceptions import ClientError
 from logging import getLogger
 from sys import exc_info
 from traceback import extract_tb
@@ -26,6 +26,8 @@ class SQSConnector:
         self.region = region
         self.access_key = access_key
         self.secret_key = secret_key
+        self.attributes = {}
+        self.mq = None
 
     def _connect(self):
         """
@@ -79,7 +81,7 @@ class SQSConnector:
         try:
             self.mq = self.sqs.create_queue(QueueName=queue,
                                             Attributes=self.attributes)
-            return SQSMessage.aqueue_created()
+            return SQSMessage.queue_created()
         except ClientError as e:
             if str(e).find('InvalidClientTokenId') >= 0:
                 return SQSError.credentials_expired(self.region,
@@ -87,11 +89,11 @@ class SQSConnector:
                                                     self.secret_key)
             elif str(e).find('SignatureDoesNotMatch') >= 0:
                 return SQSError.clock_skew(queue)
-        except QueueAlreadyExists as e:
-            err_msg = self._set_queue(queue)
-            if err_msg:
-                return err_msg
-            return SQSMessage.queue_created()
+            elif str(e).find('QueueAlreadyExists') >= 0:
+                err_msg = self._set_queue(queue)
+                if err_msg:
+                    return err_msg
+                return SQSMessage.queue_created()
 
     def validate_item(self, item):
         """
@@ -104,10 +106,10 @@ class SQSConnector:
             mandatory_components = ['body', 'metadata']
             for key in mandatory_components:
                 if key not in item:
-                    return Error.invalid_item(item)
+                    return SQSError.invalid_item(item)
             return
         else:
-            return Error.invalid_item(item)
+            return SQSError.invalid_item(item)
 
     def insert(self, queue, item):
         """
@@ -150,9 +152,11 @@ class SQSConnector:
         if err_msg:
             return err_msg
         try:
-            self.item = mq.receive_messages(MaxNumberOfMessages=1,
-                                            VisibilityTimeout=10
-                                            WaitTimeSeconds=10):
+            self.item = self.mq.receive_messages(MaxNumberOfMessages=1,
+                                                 VisibilityTimeout=10,
+                                                 WaitTimeSeconds=10)
+            if not self.item:
+                return SQSMessage.no_item_found()
             metadata = self.item[0].message_attributes.get('metadata')
             body = self.item[0].body
             self.item[0].delete()
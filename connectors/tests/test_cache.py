@@ -0,0 +1,59 @@
+
+from connectors import cache as cache_module
+from connectors.cache import ResultCache, freeze
+
+def test_freeze_is_hashable_and_order_insensitive():
+    a = freeze({'b': [1, {'c': 2}], 'a': {1, 2}})
+    b = freeze({'a': {2, 1}, 'b': [1, {'c': 2}]})
+    assert a == b and hash(a) == hash(b)
+    assert freeze([1, 2]) != freeze([2, 1])
+
+def test_get_put_and_lru_eviction():
+    cache = ResultCache(max_size=2)
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses'], stats['evictions']) == (2, 3, 2, 1)
+    assert stats['hit_rate'] == 0.6
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module, 'monotonic', lambda: now[0])
+    cache = ResultCache(ttl=10)
+    cache.put('a', 1, tags=['ks.t'])
+    now[0] = 109.9
+    assert cache.get('a') == 1
+    now[0] = 110.0
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+    assert cache._tags == {}
+
+def test_invalidate_drops_only_tagged_entries():
+    cache = ResultCache()
+    cache.put('a', 1, tags=['ks.t'])
+    cache.put('b', 2, tags=['ks.t', 'ks.u'])
+    cache.put('c', 3, tags=['ks.u'])
+    cache.invalidate('ks.t')
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (None, None, 3)
+    cache.invalidate('ks.missing')
+    assert cache.stats()['invalidations'] == 2
+
+def test_put_replaces_entry_and_its_tags():
+    cache = ResultCache()
+    cache.put('a', 1, tags=['ks.t'])
+    cache.put('a', 2, tags=['ks.u'])
+    cache.invalidate('ks.t')
+    assert cache.get('a') == 2
+
+def test_clear():
+    cache = ResultCache()
+    cache.put('a', 1, tags=['ks.t'])
+    cache.put('b', 2)
+    cache.clear()
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0 and cache.stats()['invalidations'] == 2
@@ -14,6 +14,11 @@ setup(
     url=None,
     packages=packages,
     include_package_data=True,
+    entry_points={
+        'console_scripts': [
+            'cql-bulk-load=connectors.cassandra.loader:main'
+        ]
+    },
     install_requires=[
         'boto3==1.2.2',
         'botocore==1.3.30',
@@ -22,5 +27,9 @@ setup(
         'ujson==1.33',
         'PyJWT==1.4.0',
         'PyYAML==3.11'
-    ]
+    ],
+    extras_require={
+        # fastest ElasticSearch serializer, see FastJSONSerializer
+        'orjson': ['orjson']
+    }
 )